@@ -1,6 +1,25 @@
 from .consumer import Consumer, consumer, MicroConsumer
-from .broker_types import Channel, Method, Properties
-from .producer import Producer
+from .consumer.listener import HandlerTimeout
+from .broker_types import Channel, Method, Properties, AckPolicy
+from .producer import Producer, RpcError, PublishError
+from .producer import FlowPolicy, Overflow
 from .decoder import Decoder, JSONDecoder
 from .encoder import Encoder, JSONEncoder
 from .events import event_handler
+from .packing import PackingPolicy
+from .cache import CachePolicy
+from .dedup import DedupPolicy, Backend
+from .retry import RetryPolicy
+from .ratelimit import RateLimit
+from .recycling import RecyclePolicy
+from .recording import RecordPolicy, Replayer, ReplayMode
+from .claimcheck import ClaimCheckPolicy, BlobStore, FileBlobStore
+
+
+def __getattr__(name):
+    # Deferred like rabbie.producer.AsyncProducer, so a plain `import rabbie` stays free of asyncio.
+    if name == "AsyncProducer":
+        from .producer import AsyncProducer
+
+        return AsyncProducer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,3 @@
+from .server import AdminServer, DEFAULT_SOCKET  # noqa: F401
+from .client import AdminClient  # noqa: F401
+from .admin_error import AdminError  # noqa: F401
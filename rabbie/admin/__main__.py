@@ -0,0 +1,79 @@
+import sys
+import argparse
+
+from .client import AdminClient
+from .admin_error import AdminError
+from .server import DEFAULT_SOCKET
+
+# How each kind of worker process is labelled in the status
+_KINDS = {"workers": "", "replacements": " (replacement)", "retiring": " (retiring)"}
+
+
+def _print_status(listeners):
+    for listener in listeners:
+        state = "paused" if listener["paused"] else "consuming"
+        print(
+            f"{listener['queue']} ({listener['function']}) {state}, prefetch {listener['prefetch_count']}"
+        )
+
+        for kind, label in _KINDS.items():
+            for worker in listener[kind]:
+                print(f"  {worker['pid']:>8}  {worker['status']}{label}")
+
+        print(f"  {listener['metrics'].get('messages', 0)} messages handled")
+
+        for route, counters in listener.get("routes", {}).items():
+            print(
+                f"  {route}: {counters['messages']} messages, {counters['failures']} failed"
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m rabbie.admin",
+        description="Inspect & tune a running consumer through its admin socket",
+    )
+    parser.add_argument(
+        "--socket", default=DEFAULT_SOCKET, help="The consumer's admin socket"
+    )
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="List listeners & the state of their workers")
+
+    scale = commands.add_parser("scale", help="Change the amount of workers")
+    scale.add_argument("queue")
+    scale.add_argument("workers", type=int)
+
+    prefetch = commands.add_parser("prefetch", help="Change the prefetch count")
+    prefetch.add_argument("queue")
+    prefetch.add_argument("count", type=int)
+
+    for command, help in (
+        ("pause", "Stop consuming, until resumed"),
+        ("resume", "Start consuming again"),
+        ("drain", "Finish held messages & stop the workers"),
+    ):
+        commands.add_parser(command, help=help).add_argument("queue")
+
+    args = parser.parse_args(argv)
+    client = AdminClient(args.socket)
+
+    try:
+        if args.command == "status":
+            _print_status(client.status())
+        elif args.command == "scale":
+            client.scale(args.queue, args.workers)
+        elif args.command == "prefetch":
+            client.set_prefetch(args.queue, args.count)
+        else:
+            getattr(client, args.command)(args.queue)
+    except (AdminError, OSError) as exc:
+        print(f"{args.command} failed: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
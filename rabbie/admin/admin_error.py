@@ -0,0 +1,4 @@
+class AdminError(Exception):
+    """
+    Raised by AdminClient when the consumer couldn't carry out a command.
+    """
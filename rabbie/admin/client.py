@@ -0,0 +1,97 @@
+import json
+import socket
+from typing import Any, Dict, List
+
+from .admin_error import AdminError
+from .server import DEFAULT_SOCKET
+
+
+class AdminClient:
+    """
+    AdminClient sends commands to a running consumer's admin socket, see AdminServer.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 10) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def request(self, command: str, **arguments) -> Any:
+        """Send a command & wait for its result
+
+        Args:
+            command (str): The command to carry out
+            **arguments: The command's arguments
+
+        Raises:
+            AdminError: If the consumer couldn't carry out the command
+
+        Returns:
+            Any: The command's result
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall(json.dumps({"command": command, **arguments}).encode() + b"\n")
+
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+
+        if not line:
+            raise AdminError("The consumer closed the connection without answering")
+
+        response = json.loads(line)
+
+        if "error" in response:
+            raise AdminError(response["error"])
+
+        return response["result"]
+
+    def status(self) -> List[Dict[str, Any]]:
+        """List every listener with the state of its workers
+
+        Returns:
+            List[Dict[str, Any]]: The status of each listener
+        """
+        return self.request("status")
+
+    def scale(self, queue: str, workers: int):
+        """Change the amount of workers consuming a queue
+
+        Args:
+            queue (str): The queue of the listener
+            workers (int): The new amount of workers
+        """
+        self.request("scale", queue=queue, workers=workers)
+
+    def set_prefetch(self, queue: str, count: int):
+        """Change the prefetch count of a listener's workers
+
+        Args:
+            queue (str): The queue of the listener
+            count (int): The new prefetch count, 0 for unlimited
+        """
+        self.request("prefetch", queue=queue, count=count)
+
+    def pause(self, queue: str):
+        """Stop a listener's workers consuming, until resumed
+
+        Args:
+            queue (str): The queue of the listener
+        """
+        self.request("pause", queue=queue)
+
+    def resume(self, queue: str):
+        """Start a paused listener's workers consuming again
+
+        Args:
+            queue (str): The queue of the listener
+        """
+        self.request("resume", queue=queue)
+
+    def drain(self, queue: str):
+        """Have a listener's workers finish what they hold and exit, until scaled up again
+
+        Args:
+            queue (str): The queue of the listener
+        """
+        self.request("drain", queue=queue)
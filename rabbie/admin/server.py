@@ -0,0 +1,121 @@
+import os
+import json
+import tempfile
+import threading
+import socketserver
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from ..logger import logger as log
+
+if TYPE_CHECKING:
+    from ..consumer import Consumer
+
+# Where the socket is created when no path is given, relative to the working directory
+DEFAULT_SOCKET = "rabbie.sock"
+
+
+class AdminServer:
+    """
+    AdminServer lets a running consumer be inspected & tuned over a Unix domain socket, without a restart.
+
+    Each request is a line of JSON naming a command & its arguments, such as
+    `{"command": "scale", "queue": "resize", "workers": 4}`, and is answered with a line of JSON holding
+    either its `result` or an `error`. See AdminClient, or `python -m rabbie.admin`.
+
+    Only the user running the consumer can connect to the socket.
+    """
+
+    def __init__(self, consumer: "Consumer", path: str = DEFAULT_SOCKET) -> None:
+        self.consumer = consumer
+        self.path = path
+
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+    def start(self):
+        """Create the socket, and answer requests on a background thread"""
+        # A socket left behind by a consumer that didn't exit cleanly would stop us binding
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        admin = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = admin.answer(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        # The socket is bound inside a directory only we can enter, and narrowed to the owner's permissions
+        # before being moved into place, so it's never reachable by others (nor is the process umask touched)
+        directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        bound = os.path.join(directory, "admin.sock")
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(bound, Handler)
+            os.chmod(bound, 0o600)
+            os.rename(bound, self.path)
+        finally:
+            if os.path.exists(bound):
+                os.unlink(bound)
+            os.rmdir(directory)
+
+        self._server.daemon_threads = True
+
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        log.info(f"Admin socket listening on {self.path}")
+
+    def stop(self):
+        """Stop answering requests, and remove the socket"""
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def answer(self, line: bytes) -> Dict[str, Any]:
+        """Carry out a request
+
+        Args:
+            line (bytes): The request, a line of JSON
+
+        Returns:
+            Dict[str, Any]: The response, with either a `result` or an `error`
+        """
+        try:
+            request = json.loads(line)
+            command = request.pop("command")
+        except (ValueError, KeyError, AttributeError, TypeError):
+            return {"error": "Requests must be a JSON object with a 'command'"}
+
+        handler = getattr(self, f"_command_{command}", None)
+
+        if handler is None:
+            return {"error": f"Unknown command '{command}'"}
+
+        # Anything the command raises goes back to the client, rather than dropping its connection
+        try:
+            return {"result": handler(**request)}
+        except Exception as exc:
+            return {"error": str(exc)}
+
+    def _command_status(self):
+        return self.consumer.status()
+
+    def _command_scale(self, queue: str, workers: int):
+        self.consumer.scale(queue, int(workers))
+
+    def _command_prefetch(self, queue: str, count: int):
+        self.consumer.set_prefetch(queue, int(count))
+
+    def _command_pause(self, queue: str):
+        self.consumer.pause(queue)
+
+    def _command_resume(self, queue: str):
+        self.consumer.resume(queue)
+
+    def _command_drain(self, queue: str):
+        self.consumer.drain(queue)
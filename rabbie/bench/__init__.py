@@ -0,0 +1,4 @@
+from .benchmark import Benchmark, BenchResult  # noqa: F401
+from .load_generator import LoadGenerator  # noqa: F401
+from .local_broker import LocalBroker  # noqa: F401
+from .worker_usage import WorkerUsage  # noqa: F401
@@ -0,0 +1,124 @@
+import sys
+import json
+import argparse
+import importlib
+from dataclasses import asdict
+
+from .benchmark import Benchmark
+from ..consumer import Consumer, MicroConsumer
+from ..encoder import AutoEncoder, JSONEncoder
+
+# The encoders published messages can be encoded with, raw sends the payload as it is
+_ENCODERS = {"auto": AutoEncoder(), "json": JSONEncoder(), "raw": None}
+
+
+def _settings(value: str):
+    return [int(setting) for setting in value.split(",")]
+
+
+def _load_consumer(spec: str) -> Consumer:
+    """Import the consumer named by 'module' or 'module:attribute'
+
+    Args:
+        spec (str): The module, and the consumer's name in it (defaults to 'consumer')
+
+    Returns:
+        Consumer: The consumer, micro consumers are merged into a new one
+    """
+    module, _, attribute = spec.partition(":")
+    found = getattr(importlib.import_module(module), attribute or "consumer")
+
+    if isinstance(found, MicroConsumer):
+        consumer = Consumer()
+        consumer.add_consumer(found)
+        return consumer
+
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m rabbie.bench",
+        description="Measure how many messages a listener sustains as its workers, prefetch count & publishers are swept",
+    )
+    parser.add_argument(
+        "consumer", help="The consumer to run, as 'module' or 'module:attribute'"
+    )
+    parser.add_argument(
+        "--queue", help="The queue of the listener to benchmark (defaults to the first)"
+    )
+    parser.add_argument(
+        "--workers", type=_settings, default=[1], help="Amounts of workers, e.g. 1,2,4"
+    )
+    parser.add_argument(
+        "--prefetch", type=_settings, default=[1], help="Prefetch counts, e.g. 1,10,100"
+    )
+    parser.add_argument(
+        "--publishers",
+        type=_settings,
+        default=[1],
+        help="Amounts of publisher processes",
+    )
+    parser.add_argument(
+        "--messages", type=int, default=10000, help="Messages published every run"
+    )
+    parser.add_argument(
+        "--size", type=int, default=128, help="Payload size before encoding, in bytes"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="Messages published per second (defaults to flat out)",
+    )
+    parser.add_argument("--encoder", choices=_ENCODERS, default="auto")
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run against a local stand-in for the broker, rather than the consumer's broker",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="Seconds a run may take"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    args = parser.parse_args(argv)
+    consumer = _load_consumer(args.consumer)
+
+    try:
+        queue = args.queue or consumer.listeners[0].details.queue_name
+
+        benchmark = Benchmark(
+            consumer,
+            queue,
+            messages=args.messages,
+            size=args.size,
+            rate=args.rate,
+            encoder=_ENCODERS[args.encoder],
+            local=args.local,
+            timeout=args.timeout,
+        )
+    except (ValueError, IndexError):
+        print(f"{args.consumer} has no listener for {args.queue}", file=sys.stderr)
+        return 1
+
+    results = benchmark.run(args.workers, args.prefetch, args.publishers)
+
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {**asdict(result), "throughput": result.throughput}
+                    for result in results
+                ],
+                indent=2,
+            )
+        )
+    else:
+        for result in results:
+            print(result)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
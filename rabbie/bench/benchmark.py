@@ -0,0 +1,267 @@
+import time
+from itertools import product
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .load_generator import LoadGenerator
+from .local_broker import LocalBroker
+from .worker_usage import WorkerUsage, sample
+from ..consumer.listener import Status
+from ..encoder import Encoder, AutoEncoder
+from ..metrics import LatencyHistogram
+from ..producer import Producer
+from ..producer.publisher import Publisher
+from ..logger import logger as log
+
+if TYPE_CHECKING:
+    from ..consumer import Consumer, Listener
+
+
+@dataclass
+class BenchResult:
+    """
+    How a listener coped with one benchmark run. Latencies are how long messages took from being
+    published to being handled, in seconds.
+    """
+
+    workers: int
+    prefetch: int
+    publishers: int
+    messages: int
+    elapsed: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    usage: List[WorkerUsage] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Messages handled per second"""
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.workers} workers, prefetch {self.prefetch}, {self.publishers} publishers: "
+            f"{self.messages} messages in {self.elapsed:.2f}s, {self.throughput:.1f}/s. "
+            f"Latency p50 {self.p50 * 1000:.2f}ms, p90 {self.p90 * 1000:.2f}ms, "
+            f"p99 {self.p99 * 1000:.2f}ms, max {self.max * 1000:.2f}ms"
+        ]
+
+        lines.extend(f"  {usage}" for usage in self.usage)
+
+        return "\n".join(lines)
+
+
+class Benchmark:
+    """
+    Benchmark measures how many messages a listener sustains, and how quickly it handles them, as its
+    amount of workers, prefetch count & publishers are swept.
+
+    Messages are published with a Producer to the broker the consumer connects to, or to a LocalBroker
+    standing in for it, at a target rate or as fast as possible.
+    """
+
+    def __init__(
+        self,
+        consumer: "Consumer",
+        queue: str,
+        messages: int = 10000,
+        size: int = 128,
+        rate: Optional[float] = None,
+        encoder: Optional[Encoder] = AutoEncoder(),
+        local: bool = False,
+        timeout: float = 60,
+    ) -> None:
+        """
+        Args:
+            consumer (Consumer): The consumer the listener belongs to
+            queue (str): The queue of the listener
+            messages (int, optional): The amount of messages published every run. Defaults to 10000.
+            size (int, optional): The size of each payload before encoding, in bytes. Defaults to 128.
+            rate (Optional[float], optional): Messages published per second. Defaults to None (as fast as possible).
+            encoder (Optional[Encoder], optional): The encoder for published messages. Defaults to AutoEncoder.
+            local (bool, optional): Run the listener's workers against a LocalBroker, rather than the broker. Defaults to False.
+            timeout (float, optional): Seconds a run may take before it's cut short. Defaults to 60.
+        """
+        self.consumer = consumer
+        self.queue = queue
+        self.messages = messages
+        self.size = size
+        self.rate = rate
+        self.encoder = encoder
+        self.local = local
+        self.timeout = timeout
+
+        self.listener: "Listener" = consumer._listeners_for(queue)[0]
+
+    def run(
+        self,
+        workers: Sequence[int] = (1,),
+        prefetch: Sequence[int] = (1,),
+        publishers: Sequence[int] = (1,),
+    ) -> List[BenchResult]:
+        """Run the listener with every combination of the settings given
+
+        Args:
+            workers (Sequence[int], optional): The amounts of workers to try. Defaults to (1,).
+            prefetch (Sequence[int], optional): The prefetch counts to try. Defaults to (1,).
+            publishers (Sequence[int], optional): The amounts of publisher processes to try. Defaults to (1,).
+
+        Returns:
+            List[BenchResult]: The result of each run
+        """
+        self.listener.latencies = LatencyHistogram()
+        settings = list(product(workers, prefetch, publishers))
+
+        if self.local:
+            return [self._run_local(*setting) for setting in settings]
+
+        return self._run_broker(settings)
+
+    def _run_local(self, workers: int, prefetch: int, publishers: int) -> BenchResult:
+        """Benchmark the listener against a LocalBroker, with fresh workers"""
+        broker = LocalBroker(self.listener, workers, prefetch)
+        processes = broker.start()
+
+        try:
+            return self._measure(
+                lambda: broker.connect(self.encoder),
+                [process.pid for process in processes],
+                (workers, prefetch, publishers),
+            )
+        finally:
+            broker.stop()
+
+    def _run_broker(self, settings: List[Tuple[int, int, int]]) -> List[BenchResult]:
+        """Benchmark the listener against the broker, starting the consumer once and tuning it between runs"""
+        workers, prefetch, _ = settings[0]
+
+        self.listener.details = replace(
+            self.listener.details, workers=workers, qos_prefetch_count=prefetch
+        )
+
+        self.consumer.start(halt=False)
+
+        parameters = self.consumer.connection_parameters
+        producer = Producer(
+            host=parameters.host,
+            port=parameters.port,
+            username=parameters.credentials.username,
+            password=parameters.credentials.password,
+            virtual_host=parameters.virtual_host,
+        )
+
+        def connect() -> Publisher:
+            publisher = producer.connect(
+                queue=self.queue,
+                encoder=self.encoder,
+                shards=self.listener.details.shards,
+            )
+            publisher.open()
+
+            return publisher
+
+        results = []
+
+        try:
+            for setting in settings:
+                self._tune(*setting[:2])
+
+                pids = [worker.pid for worker in self.listener.workers]
+                results.append(self._measure(connect, pids, setting))
+        finally:
+            self.consumer._stop_listeners()
+
+        return results
+
+    def _tune(self, workers: int, prefetch: int):
+        """Scale the running listener & change its prefetch count, then wait for its workers to settle"""
+        if workers != len(self.listener.workers):
+            self.consumer.scale(self.queue, workers)
+
+        if prefetch != self.listener.details.qos_prefetch_count:
+            self.consumer.set_prefetch(self.queue, prefetch)
+
+            # Idle workers pick up the prefetch count within a second
+            time.sleep(1.5)
+
+        while True:
+            status = self.consumer.status()
+            listener = next(s for s in status if s["queue"] == self.queue)
+
+            if (
+                len(listener["workers"]) == workers
+                and not listener["retiring"]
+                and all(
+                    w["status"] == Status.CONNECTED.name for w in listener["workers"]
+                )
+            ):
+                return
+
+            time.sleep(0.1)
+
+    def _measure(
+        self,
+        connect: Callable[[], Publisher],
+        pids: List[int],
+        setting: Tuple[int, int, int],
+    ) -> BenchResult:
+        """Publish a run's messages, and wait for the listener to handle them
+
+        Args:
+            connect (Callable[[], Publisher]): Opens a publisher to the listener's queue
+            pids (List[int]): The listener's worker processes
+            setting (Tuple[int, int, int]): The amount of workers, prefetch count & amount of publishers
+
+        Returns:
+            BenchResult: The result of the run
+        """
+        workers, prefetch, publishers = setting
+        latencies = self.listener.latencies
+        latencies.reset()
+
+        generator = LoadGenerator(self.messages, self.size, self.rate, publishers)
+        before: Dict[int, Tuple[float, int]] = {pid: sample(pid) for pid in pids}
+
+        log.info(
+            f"Benchmarking '{self.queue}' with {workers} workers, prefetch {prefetch} & {publishers} publishers"
+        )
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        processes = generator.start(connect)
+
+        while latencies.count < self.messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        elapsed = time.monotonic() - started
+
+        if latencies.count < self.messages:
+            log.warning(
+                f"[red]Only {latencies.count} of {self.messages} messages were handled within {self.timeout}s"
+            )
+
+        for process in processes:
+            process.join()
+
+        usage = []
+
+        for pid in pids:
+            start, end = before[pid], sample(pid)
+
+            if start is not None and end is not None:
+                usage.append(
+                    WorkerUsage(pid, (end[0] - start[0]) / elapsed * 100, end[1])
+                )
+
+        return BenchResult(
+            workers,
+            prefetch,
+            publishers,
+            latencies.count,
+            elapsed,
+            *latencies.percentiles(0.5, 0.9, 0.99),
+            latencies.max,
+            usage,
+        )
@@ -0,0 +1,89 @@
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from pika import BasicProperties as Properties
+
+from ..consumer.listener.local_route import SENT_HEADER
+from ..producer.publisher import Publisher
+
+if TYPE_CHECKING:
+    from multiprocess import Process
+
+
+class LoadGenerator:
+    """
+    LoadGenerator publishes the messages of a benchmark run from one or more publisher processes, at a
+    target rate or as fast as they can. Every message is stamped with when it was sent, so listeners can
+    record how long it took to be handled.
+    """
+
+    def __init__(
+        self,
+        messages: int,
+        size: int = 128,
+        rate: Optional[float] = None,
+        publishers: int = 1,
+    ) -> None:
+        """
+        Args:
+            messages (int): The amount of messages to publish, across every publisher
+            size (int, optional): The size of each payload before encoding, in bytes. Defaults to 128.
+            rate (Optional[float], optional): Messages per second, across every publisher. Defaults to None (as fast as possible).
+            publishers (int, optional): The amount of publisher processes. Defaults to 1.
+        """
+        self.messages = messages
+        self.size = size
+        self.rate = rate
+        self.publishers = publishers
+
+    def start(self, connect: Callable[[], Publisher]) -> List["Process"]:
+        """Start the publisher processes
+
+        Args:
+            connect (Callable[[], Publisher]): Opens a publisher to the listener's queue, called in each process
+
+        Returns:
+            List[Process]: The publisher processes, which exit once they've published their share
+        """
+        from multiprocess import Process
+
+        processes = []
+
+        for index in range(self.publishers):
+            process = Process(target=self._publish, args=(index, connect))
+            process.start()
+            processes.append(process)
+
+        return processes
+
+    def _publish(self, index: int, connect: Callable[[], Publisher]):
+        """Publish this process's share of the messages, paced to its share of the rate
+
+        Args:
+            index (int): The index of the publisher
+            connect (Callable[[], Publisher]): Opens a publisher to the listener's queue
+        """
+        # The first publishers take the remainder
+        share = self.messages // self.publishers + (
+            index < self.messages % self.publishers
+        )
+        interval = self.publishers / self.rate if self.rate else 0
+        payload = "x" * self.size
+
+        publisher = connect()
+        started = time.monotonic()
+
+        try:
+            for sent in range(share):
+                if interval:
+                    wait = started + sent * interval - time.monotonic()
+
+                    if wait > 0:
+                        time.sleep(wait)
+
+                publisher.publish(
+                    payload,
+                    properties=Properties(headers={SENT_HEADER: time.time_ns()}),
+                )
+        finally:
+            publisher.close()
@@ -0,0 +1,130 @@
+from typing import TYPE_CHECKING, List, Optional
+
+from pika.spec import Basic
+
+from ..encoder import Encoder
+from ..producer.publisher import Publisher
+from ..recording.replayer import _Sink
+
+if TYPE_CHECKING:
+    from multiprocess import Process
+    from ..consumer import Listener
+
+
+class _LocalPublisher(Publisher):
+    """
+    Publishes to a LocalBroker's queue instead of a broker. Messages are encoded & stamped exactly as
+    the Publisher would.
+    """
+
+    def __init__(self, broker: "LocalBroker", encoder: Optional[Encoder]) -> None:
+        super().__init__(connection=None, default_encoder=encoder)
+
+        self.broker = broker
+
+    def open(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def _basic_publish(self, exchange, routing_key, body, properties, mandatory):
+        # The broker only carries bytes, pika encodes strings on the way in
+        if isinstance(body, str):
+            body = body.encode()
+
+        self.broker._queue.put((properties, body))
+
+
+class LocalBroker:
+    """
+    LocalBroker stands in for the broker when benchmarking a listener without one.
+
+    Messages are handed to the workers through a queue in shared memory, which holds at most
+    workers × prefetch messages like the broker's window of unacknowledged messages. Each worker runs
+    messages through the listener's whole pipeline in a process of its own, dropping acknowledgements &
+    outputs.
+    """
+
+    def __init__(self, listener: "Listener", workers: int, prefetch: int) -> None:
+        """
+        Args:
+            listener (Listener): The listener to run
+            workers (int): The amount of worker processes
+            prefetch (int): Messages each worker may be sent ahead of handling them, 0 for unlimited
+        """
+        from multiprocess import Queue
+
+        self.listener = listener
+        self.workers = workers
+
+        self._queue = Queue(maxsize=workers * prefetch)
+        self._processes: List["Process"] = []
+
+    def connect(self, encoder: Optional[Encoder] = None) -> Publisher:
+        """Open a publisher to the workers, from any process
+
+        Args:
+            encoder (Optional[Encoder], optional): The encoder for published messages. Defaults to None.
+
+        Returns:
+            Publisher: The publisher
+        """
+        return _LocalPublisher(self, encoder)
+
+    def start(self) -> List["Process"]:
+        """Start the worker processes
+
+        Returns:
+            List[Process]: The workers
+        """
+        from multiprocess import Process
+
+        self.listener.prepare()
+
+        # The benchmark measures the listener, not its rate limit
+        self.listener._bucket = None
+
+        for index in range(self.workers):
+            # Set before forking, so the worker inherits its watchdog slot
+            self.listener._slot = index
+
+            process = Process(target=self._work)
+            process.start()
+            self._processes.append(process)
+
+        return self._processes
+
+    def stop(self):
+        """Stop the workers once they've handled every message already published"""
+        for _ in self._processes:
+            self._queue.put(None)
+
+        for process in self._processes:
+            process.join()
+
+        self._processes.clear()
+
+    def _work(self):
+        listener = self.listener
+        sink = _Sink()
+        delivery_tag = 0
+
+        while True:
+            message = self._queue.get()
+
+            if message is None:
+                return
+
+            properties, body = message
+            delivery_tag += 1
+
+            method = Basic.Deliver(
+                delivery_tag=delivery_tag, routing_key=listener.details.queue_name
+            )
+
+            listener.metrics.increment("messages")
+            listener._handle(sink, method, properties, body)
+
+            if listener.latencies is not None:
+                listener._record_latency(properties)
@@ -0,0 +1,45 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class WorkerUsage:
+    """
+    How hard a worker process worked during a benchmark run.
+    """
+
+    pid: int
+    # Share of one core the worker used, as a percentage
+    cpu: float
+    # The worker's resident memory at the end of the run, in bytes
+    rss: int
+
+    def __str__(self) -> str:
+        return f"{self.pid:>8}  cpu {self.cpu:5.1f}%  rss {self.rss / (1024 * 1024):.1f}MiB"
+
+
+def sample(pid: int) -> Optional[Tuple[float, int]]:
+    """Read the CPU time & resident memory of a process
+
+    Args:
+        pid (int): The process ID
+
+    Returns:
+        Optional[Tuple[float, int]]: Seconds of CPU time used so far and resident memory in bytes, None if
+        the process is gone (or this isn't Linux)
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # The command name may hold spaces, so split after it
+            fields = file.read().rsplit(")", 1)[1].split()
+
+        with open(f"/proc/{pid}/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    # utime & stime, the 14th & 15th fields, counting the pid & name dropped above
+    ticks = int(fields[11]) + int(fields[12])
+
+    return ticks / os.sysconf("SC_CLK_TCK"), pages * os.sysconf("SC_PAGE_SIZE")
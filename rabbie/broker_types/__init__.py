@@ -1,2 +1,4 @@
 from .relayed_types import *
-from .channel import Channel
+from .channel import Channel, RPC_ERROR_HEADER
+from .ack_coalescer import AckCoalescer, AckPolicy
+from .deadline import DEADLINE_HEADER, stamp, is_stale
@@ -0,0 +1,167 @@
+import time
+from dataclasses import dataclass
+from typing import Set
+
+from pika.adapters.blocking_connection import BlockingChannel, BlockingConnection
+
+
+@dataclass
+class AckPolicy:
+    """
+    This stores when coalesced acknowledgements are sent to the broker.
+
+    Whichever threshold is hit first triggers the flush.
+    """
+
+    # Flush once this many acknowledgements are waiting to be sent
+    max_pending: int = 100
+    # Flush once the oldest waiting acknowledgement has waited this many seconds
+    interval: float = 0.05
+
+
+class AckCoalescer:
+    """
+    AckCoalescer collects acknowledgements for a worker's channel and sends them in as few frames as possible.
+
+    Delivery tags are sequential per channel, so once every tag up to N has been acknowledged a single
+    `basic_ack(N, multiple=True)` covers them all. Tags acknowledged out of order are held back until the
+    gap before them is filled, or acknowledged individually if they are still waiting when a flush is due.
+
+    The broker closes the channel when a tag is settled twice, so a multiple acknowledgement never names a
+    tag that was already acknowledged individually or rejected. The ones below the tag it names are fine,
+    as it only covers tags that are still unsettled.
+    """
+
+    def __init__(
+        self,
+        channel: BlockingChannel,
+        connection: BlockingConnection,
+        policy: AckPolicy,
+    ) -> None:
+        self._channel = channel
+        self._connection = connection
+        self.policy = policy
+
+        # Every tag up to and including the floor has been acknowledged (or rejected)
+        self._floor = 0
+        # Every tag up to and including this one is settled with the broker
+        self._broker_floor = 0
+        # Tags above the floor that have completed, and tags above the broker floor settled on their own
+        self._done: Set[int] = set()
+        self._sent: Set[int] = set()
+
+        self._delivered = 0
+        self._pending = 0
+        self._pending_since = None
+
+        self._connection.call_later(self.policy.interval, self._on_timer)
+
+    def track(self, delivery_tag: int):
+        """Record a delivery, so acknowledging 'all outstanding messages' knows where to stop
+
+        Args:
+            delivery_tag (int): The delivery tag of the new message
+        """
+        self._delivered = max(self._delivered, delivery_tag)
+
+    def acknowledge(self, delivery_tag: int = 0, multiple: bool = False):
+        """Acknowledge a message, the acknowledgement is sent when the policy says so
+
+        Args:
+            delivery_tag (int): The delivery tag to acknowledge, 0 with multiple means all outstanding. Defaults to 0
+            multiple (bool): Acknowledge every message up to and including the delivery tag. Defaults to False
+        """
+        self._complete(delivery_tag, multiple)
+
+        self._pending += 1
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+        if (
+            self._pending >= self.policy.max_pending
+            or time.monotonic() - self._pending_since >= self.policy.interval
+        ):
+            self.flush()
+
+    def reject(
+        self, requeue: bool = True, delivery_tag: int = 0, multiple: bool = False
+    ):
+        """Reject a message straight away, sending any waiting acknowledgements first
+
+        Args:
+            requeue (bool): Should the message be requeued. Defaults to True
+            delivery_tag (int): The delivery tag to reject. Defaults to 0
+            multiple (bool): Reject every unsettled message up to and including the delivery tag. Defaults to False
+        """
+        self.flush()
+
+        self._channel.basic_nack(
+            delivery_tag=delivery_tag,
+            multiple=multiple,
+            requeue=requeue,
+        )
+
+        self._complete(delivery_tag, multiple)
+
+        # The rejected tags are settled with the broker now, so they must not be acknowledged later
+        if multiple:
+            self._broker_floor = max(self._broker_floor, self._floor)
+            self._forget_sent()
+        else:
+            self._sent.add(delivery_tag)
+
+    def flush(self):
+        """
+        Send every waiting acknowledgement to the broker.
+        """
+        if self._floor > self._broker_floor:
+            # The highest tag under the floor that's still unsettled, the ack covers every unsettled tag below it
+            highest = self._floor
+            while highest in self._sent:
+                highest -= 1
+
+            if highest > self._broker_floor:
+                self._channel.basic_ack(highest, multiple=True)
+
+            self._broker_floor = self._floor
+            self._forget_sent()
+
+        # Anything still waiting on an earlier tag is acknowledged on its own, rather than held indefinitely
+        for delivery_tag in sorted(self._done - self._sent):
+            self._channel.basic_ack(delivery_tag, multiple=False)
+            self._sent.add(delivery_tag)
+
+        self._pending = 0
+        self._pending_since = None
+
+    def _complete(self, delivery_tag: int, multiple: bool):
+        """Mark delivery tags as completed, and advance the floor as far as it can go
+
+        Args:
+            delivery_tag (int): The delivery tag that completed, 0 with multiple means all outstanding
+            multiple (bool): Every tag up to and including the delivery tag completed
+        """
+        if multiple:
+            self._floor = max(self._floor, delivery_tag or self._delivered)
+        else:
+            self._done.add(delivery_tag)
+
+        while self._floor + 1 in self._done:
+            self._floor += 1
+
+        # Forget about anything the floor now covers
+        self._done = {tag for tag in self._done if tag > self._floor}
+
+    def _forget_sent(self):
+        """Forget the tags settled on their own that the broker floor now covers"""
+        self._sent = {tag for tag in self._sent if tag > self._broker_floor}
+
+    def _on_timer(self):
+        """
+        Flush on an interval, so acknowledgements aren't left waiting when no more messages arrive.
+        """
+        if self._channel.is_open:
+            if self._pending:
+                self.flush()
+
+            self._connection.call_later(self.policy.interval, self._on_timer)
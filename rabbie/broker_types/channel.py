@@ -1,13 +1,26 @@
 from pika.adapters.blocking_connection import BlockingChannel
 from pika.spec import BasicProperties as Properties
 
+from typing import Optional
+
 from ..encoder import Encoder, AutoEncoder
+from .ack_coalescer import AckCoalescer
+
+# Header set on RPC replies when the handler raised, the value describes the exception
+RPC_ERROR_HEADER = "x-rabbie-error"
 
 
 class Channel:
-    def __init__(self, blocking_channel: BlockingChannel) -> None:
+    def __init__(
+        self,
+        blocking_channel: BlockingChannel,
+        coalescer: Optional[AckCoalescer] = None,
+    ) -> None:
         self._channel = blocking_channel
 
+        # When given, acknowledgements are batched by the coalescer rather than sent one by one
+        self._coalescer = coalescer
+
     def acknowledge(self, delivery_tag: int = 0, multiple: bool = False):
         """
         This function acknowledges the receipt of a message from a RabbitMQ channel.
@@ -20,6 +33,9 @@ class Channel:
         If set to True, all messages up to and including the delivery_tag will be acknowledged. If set to
         False, only the message with the specified delivery_tag will be acknowledged. Defaults to False
         """
+        if self._coalescer:
+            return self._coalescer.acknowledge(delivery_tag, multiple)
+
         self._channel.basic_ack(delivery_tag, multiple)
 
     def reject(
@@ -40,6 +56,9 @@ class Channel:
         True, all messages up to and including the specified delivery tag will be rejected. If set to False,
         only the message with the specified delivery tag will be rejected. Defaults to False
         """
+        if self._coalescer:
+            return self._coalescer.reject(requeue, delivery_tag, multiple)
+
         self._channel.basic_nack(
             delivery_tag=delivery_tag,
             multiple=multiple,
@@ -90,7 +109,43 @@ class Channel:
         self._channel.basic_publish(
             exchange=exchange or "",
             routing_key=queue,
-            body=str(body),
+            body=body if isinstance(body, bytes) else str(body),
             properties=properties,
             mandatory=mandatory,
         )
+
+    def reply(
+        self,
+        body,
+        properties: Properties,
+        encoder: Optional[Encoder] = AutoEncoder(),
+        error: Optional[str] = None,
+    ):
+        """
+        This function sends a reply to an RPC request, using the request's `reply_to` and `correlation_id`.
+
+        Args:
+          body: The reply body. None is sent as an empty body, so the caller still gets a reply.
+          properties (Properties): The properties of the request being replied to.
+          encoder (Encoder): The encoder to use when encoding the reply. Default is AutoEncoder
+          error (str): A description of the exception the handler raised, if it did. The caller's future
+        will raise it as an `RpcError`.
+        """
+        reply_properties = Properties(
+            correlation_id=properties.correlation_id,
+            headers={RPC_ERROR_HEADER: error} if error is not None else None,
+        )
+
+        if body is None:
+            body = b""
+        elif encoder:
+            body = encoder.encode(body)
+            reply_properties.content_type = encoder.content_type()
+
+        # Replies go straight to the reply queue, which must not be declared (especially for direct reply-to)
+        self._channel.basic_publish(
+            exchange="",
+            routing_key=properties.reply_to,
+            body=body,
+            properties=reply_properties,
+        )
@@ -0,0 +1,81 @@
+import time
+from copy import copy
+from typing import Optional
+
+from pika.spec import BasicProperties as Properties
+
+# Header holding when a message stops being useful, in milliseconds since the epoch
+DEADLINE_HEADER = "x-rabbie-deadline"
+
+
+def stamp(
+    properties: Optional[Properties], deadline: Optional[float] = None
+) -> Properties:
+    """Stamp a message with when it was sent, and optionally when it stops being useful
+
+    Anything already set on the properties is left alone. The stamp goes on a copy, as the caller may reuse
+    their properties for other messages.
+
+    Args:
+        properties (Optional[Properties]): The message properties, new ones are created if None
+        deadline (Optional[float], optional): Seconds the message stays useful for. Defaults to None (forever).
+
+    Returns:
+        Properties: The stamped properties
+    """
+    properties = copy(properties) if properties is not None else Properties()
+    now = time.time()
+
+    if properties.timestamp is None:
+        properties.timestamp = int(now)
+
+    if deadline is not None:
+        headers = dict(properties.headers or {})
+        headers.setdefault(DEADLINE_HEADER, int((now + deadline) * 1000))
+        properties.headers = headers
+
+    return properties
+
+
+def is_stale(
+    properties: Optional[Properties],
+    max_age: Optional[float] = None,
+    now: Optional[float] = None,
+) -> bool:
+    """Check whether a message is past its deadline, expiration or a maximum age
+
+    The AMQP timestamp only has a resolution of one second, so ages measured from it are rounded down to
+    never shed a message early.
+
+    Timestamps & deadlines come from the producer's clock and are compared against this host's, so any
+    skew between the two is added to (or taken off) every age. Hosts should keep their clocks in sync,
+    e.g. through NTP, and max ages should leave room for whatever skew remains.
+
+    Args:
+        properties (Optional[Properties]): The message properties
+        max_age (Optional[float], optional): The oldest a message can be, in seconds. Defaults to None.
+        now (Optional[float], optional): The current time since the epoch. Defaults to None (time.time()).
+
+    Returns:
+        bool: True if the message is stale
+    """
+    if properties is None:
+        return False
+
+    now = time.time() if now is None else now
+
+    deadline = (properties.headers or {}).get(DEADLINE_HEADER)
+
+    if deadline is not None and now * 1000 > deadline:
+        return True
+
+    if properties.timestamp is None:
+        return False
+
+    # The timestamp is truncated to the second, so the message may have been sent up to a second later
+    age = now - properties.timestamp - 1
+
+    if max_age is not None and age > max_age:
+        return True
+
+    return properties.expiration is not None and age * 1000 > int(properties.expiration)
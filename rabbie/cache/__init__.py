@@ -0,0 +1,8 @@
+from .cache_policy import CachePolicy  # noqa: F401
+from .result_cache import (
+    MISS,
+    cache_key,
+    create_cache,
+    LocalCache,
+    SharedCache,
+)  # noqa: F401
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CachePolicy:
+    """
+    This stores how a listener caches the output of its function.
+    """
+
+    # The most outputs held, the least recently used are evicted past this
+    max_entries: int = 1024
+    # Seconds an output stays valid for, None keeps it until evicted
+    ttl: Optional[float] = 60
+    # Share one cache between all of the listener's workers, rather than one per worker
+    shared: bool = False
+    # The largest encoded output the shared cache holds, anything bigger isn't cached
+    max_value_bytes: int = 4096
@@ -0,0 +1,221 @@
+import hashlib
+import math
+import struct
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from .cache_policy import CachePolicy
+
+# Returned by get() when there is nothing cached, as None is a valid cached output
+MISS = object()
+
+
+def cache_key(body: bytes, scope: Optional[bytes] = None) -> bytes:
+    """Get the cache key for a raw message body
+
+    Args:
+        body (bytes): The raw message body, before decoding
+        scope (Optional[bytes]): What else the output depends on, e.g. the route the message takes on a
+            routed listener. Defaults to None (only the body)
+
+    Returns:
+        bytes: A 16 byte digest of the body (and scope)
+    """
+    digest = hashlib.blake2b(body, digest_size=16)
+
+    if scope is not None:
+        digest.update(b"\0" + scope)
+
+    return digest.digest()
+
+
+class LocalCache:
+    """
+    LocalCache is an LRU cache of encoded outputs, private to a single worker.
+    """
+
+    def __init__(self, policy: CachePolicy) -> None:
+        self.policy = policy
+
+        # key -> (expires_at, encoded output)
+        self._entries: "OrderedDict[bytes, Tuple[float, Optional[bytes]]]" = (
+            OrderedDict()
+        )
+
+    def get(self, key: bytes) -> Union[Optional[bytes], object]:
+        """Get a cached output
+
+        Args:
+            key (bytes): The cache key
+
+        Returns:
+            Union[Optional[bytes], object]: The encoded output (None if the function returned nothing), or MISS
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return MISS
+
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return MISS
+
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: bytes, value: Optional[bytes]) -> bool:
+        """Cache an output
+
+        Args:
+            key (bytes): The cache key
+            value (Optional[bytes]): The encoded output, None if the function returned nothing
+
+        Returns:
+            bool: True if another entry was evicted to make room
+        """
+        self._entries[key] = (_expiry(self.policy), value)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.policy.max_entries:
+            self._entries.popitem(last=False)
+            return True
+
+        return False
+
+
+class SharedCache:
+    """
+    SharedCache is a cache of encoded outputs in shared memory, so every worker of a listener shares hits.
+
+    Entries live in fixed size slots, grouped into sets of `WAYS` slots. A key can only be stored in the
+    set its digest maps to, and the least recently used slot in that set is evicted to make room.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    WAYS = 4
+
+    # digest, expires_at, last_used, value length (-1 for None)
+    _HEADER = struct.Struct("<16sddi")
+
+    def __init__(self, policy: CachePolicy) -> None:
+        from multiprocess import Lock, RawArray
+
+        self.policy = policy
+
+        self._sets = max(1, math.ceil(policy.max_entries / self.WAYS))
+        self._slot_size = self._HEADER.size + policy.max_value_bytes
+
+        self._buffer = RawArray("B", self._sets * self.WAYS * self._slot_size)
+        self._lock = Lock()
+
+    def get(self, key: bytes) -> Union[Optional[bytes], object]:
+        """Get a cached output
+
+        Args:
+            key (bytes): The cache key
+
+        Returns:
+            Union[Optional[bytes], object]: The encoded output (None if the function returned nothing), or MISS
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            for offset in self._slots(key):
+                digest, expires_at, _, length = self._HEADER.unpack_from(
+                    self._buffer, offset
+                )
+
+                if digest != key:
+                    continue
+
+                if expires_at <= now:
+                    self._HEADER.pack_into(self._buffer, offset, bytes(16), 0, 0, 0)
+                    return MISS
+
+                self._HEADER.pack_into(
+                    self._buffer, offset, digest, expires_at, now, length
+                )
+
+                if length < 0:
+                    return None
+
+                start = offset + self._HEADER.size
+                return bytes(self._buffer[start : start + length])
+
+        return MISS
+
+    def set(self, key: bytes, value: Optional[bytes]) -> bool:
+        """Cache an output, outputs bigger than the policy's max_value_bytes are not cached
+
+        Args:
+            key (bytes): The cache key
+            value (Optional[bytes]): The encoded output, None if the function returned nothing
+
+        Returns:
+            bool: True if another entry was evicted to make room
+        """
+        if value is not None and len(value) > self.policy.max_value_bytes:
+            return False
+
+        now = time.monotonic()
+        evicted = False
+
+        with self._lock:
+            victim, victim_used = None, math.inf
+
+            for offset in self._slots(key):
+                digest, expires_at, last_used, _ = self._HEADER.unpack_from(
+                    self._buffer, offset
+                )
+
+                # Reuse this key's slot, or any empty/expired one
+                if digest == key or expires_at <= now:
+                    victim = offset
+                    evicted = False
+                    break
+
+                if last_used < victim_used:
+                    victim, victim_used = offset, last_used
+                    evicted = True
+
+            self._HEADER.pack_into(
+                self._buffer,
+                victim,
+                key,
+                _expiry(self.policy),
+                now,
+                -1 if value is None else len(value),
+            )
+
+            if value is not None:
+                start = victim + self._HEADER.size
+                self._buffer[start : start + len(value)] = value
+
+        return evicted
+
+    def _slots(self, key: bytes):
+        first = (int.from_bytes(key[:8], "little") % self._sets) * self.WAYS
+
+        return range(
+            first * self._slot_size,
+            (first + self.WAYS) * self._slot_size,
+            self._slot_size,
+        )
+
+
+def _expiry(policy: CachePolicy) -> float:
+    return time.monotonic() + policy.ttl if policy.ttl is not None else math.inf
+
+
+def create_cache(policy: CachePolicy) -> Union[LocalCache, SharedCache]:
+    """Create the cache a policy asks for
+
+    Args:
+        policy (CachePolicy): The cache policy
+
+    Returns:
+        Union[LocalCache, SharedCache]: The cache
+    """
+    return SharedCache(policy) if policy.shared else LocalCache(policy)
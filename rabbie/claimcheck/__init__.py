@@ -0,0 +1,3 @@
+from .blob_store import Blob, BlobStore, FileBlobStore  # noqa: F401
+from .claim_check_policy import ClaimCheckPolicy, DEFAULT_BLOB_PATH  # noqa: F401
+from .claim_check import CLAIM_HEADER, check_in, claim_of  # noqa: F401
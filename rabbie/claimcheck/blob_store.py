@@ -0,0 +1,144 @@
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+
+class Blob:
+    """
+    A payload taken out of a blob store, read through `view` without copying it.
+
+    Close it once done with, the view can't be used after that.
+    """
+
+    def __init__(self, buffer: Any, closer: Optional[Callable] = None) -> None:
+        """
+        Args:
+            buffer (Any): The payload, anything supporting the buffer protocol (bytes, an mmap)
+            closer (Optional[Callable], optional): Releases whatever the store holds open. Defaults to None.
+        """
+        self._buffer = buffer
+        self._closer = closer
+
+        self.view = memoryview(buffer)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def close(self):
+        """Release the view, and whatever the store holds open for it"""
+        self.view.release()
+
+        if self._closer is not None:
+            try:
+                self._closer()
+            except BufferError:
+                # The function kept a view of its own, the mapping is closed once that's collected
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BlobStore(ABC):
+    """
+    Where payloads too big to send through the broker are kept, see ClaimCheckPolicy.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Store a payload
+
+        Args:
+            data (bytes): The payload
+
+        Returns:
+            str: The reference the payload can be opened with
+        """
+        ...
+
+    @abstractmethod
+    def open(self, reference: str) -> Blob:
+        """Open a stored payload
+
+        Args:
+            reference (str): The reference put() returned
+
+        Raises:
+            KeyError: If there's no payload stored under the reference
+
+        Returns:
+            Blob: The payload
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, reference: str):
+        """Delete a stored payload, if it still exists
+
+        Args:
+            reference (str): The reference put() returned
+        """
+        ...
+
+
+# References are generated by put(), anything else could point outside the store's directory
+_REFERENCE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class FileBlobStore(BlobStore):
+    """
+    FileBlobStore keeps payloads as files in a directory, which producers & consumers on other machines can
+    share through a network filesystem.
+
+    Payloads are opened with a read-only memory map, so the function reads them straight from the page
+    cache rather than from a copy in memory.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, reference: str) -> str:
+        if not _REFERENCE.match(reference):
+            raise KeyError(reference)
+
+        return os.path.join(self.path, f"{reference}.blob")
+
+    def put(self, data: bytes) -> str:
+        reference = uuid.uuid4().hex
+        path = self._file(reference)
+
+        # Written under a temporary name, so a consumer can never open a partly written payload
+        with open(f"{path}.tmp", "wb") as file:
+            file.write(data)
+
+        os.replace(f"{path}.tmp", path)
+
+        return reference
+
+    def open(self, reference: str) -> Blob:
+        import mmap
+
+        try:
+            with open(self._file(reference), "rb") as file:
+                # Empty files can't be mapped
+                if not os.fstat(file.fileno()).st_size:
+                    return Blob(b"")
+
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise KeyError(reference) from None
+
+        return Blob(mapping, mapping.close)
+
+    def delete(self, reference: str):
+        try:
+            os.unlink(self._file(reference))
+        except (FileNotFoundError, KeyError):
+            pass
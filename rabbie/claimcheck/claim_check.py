@@ -0,0 +1,49 @@
+from copy import copy
+from typing import Optional, Tuple
+
+from pika.spec import BasicProperties as Properties
+
+from .claim_check_policy import ClaimCheckPolicy
+
+# Header carrying the reference of a payload kept in the blob store, the message body is left empty
+CLAIM_HEADER = "x-rabbie-claim"
+
+
+def check_in(
+    policy: ClaimCheckPolicy, body: bytes, properties: Optional[Properties]
+) -> Tuple[bytes, Optional[Properties]]:
+    """Move an encoded payload into the blob store if it's over the policy's threshold
+
+    Args:
+        policy (ClaimCheckPolicy): The claim check policy
+        body (bytes): The encoded payload
+        properties (Optional[Properties]): The message properties
+
+    Returns:
+        Tuple[bytes, Optional[Properties]]: The body & properties to publish
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    if len(body) <= policy.threshold:
+        return body, properties
+
+    reference = policy.store.put(body)
+
+    # The caller's properties may be reused for other messages, so the reference goes on a copy
+    properties = copy(properties) if properties is not None else Properties()
+    properties.headers = {**(properties.headers or {}), CLAIM_HEADER: reference}
+
+    return b"", properties
+
+
+def claim_of(properties: Optional[Properties]) -> Optional[str]:
+    """Get the reference of a message's payload in the blob store
+
+    Args:
+        properties (Optional[Properties]): The message properties
+
+    Returns:
+        Optional[str]: The reference, None if the payload is in the message
+    """
+    return (getattr(properties, "headers", None) or {}).get(CLAIM_HEADER)
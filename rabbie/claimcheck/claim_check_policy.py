@@ -0,0 +1,34 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from .blob_store import BlobStore, FileBlobStore
+
+# Where FileBlobStore keeps payloads when no store is given
+DEFAULT_BLOB_PATH = os.path.join(tempfile.gettempdir(), "rabbie-blobs")
+
+
+@dataclass
+class ClaimCheckPolicy:
+    """
+    This stores when payloads are kept in a blob store rather than sent through the broker, and where.
+
+    Producers & listeners must be given the same store.
+    """
+
+    # Payloads bigger than this many bytes (once encoded) are kept in the store
+    threshold: int = 1024 * 1024
+    # The store, a FileBlobStore at `path` when not given
+    store: Optional[BlobStore] = None
+    path: str = DEFAULT_BLOB_PATH
+    # Decode stored payloads like any other message, rather than handing the function a memoryview. This
+    # reads the whole payload into memory
+    decode: bool = False
+    # Delete a stored payload once the function has handled it. Turn this off when more than one queue
+    # receives the same messages
+    delete_after_ack: bool = True
+
+    def __post_init__(self):
+        if self.store is None:
+            self.store = FileBlobStore(self.path)
@@ -0,0 +1 @@
+from .cluster import Cluster, parse_endpoint  # noqa: F401
@@ -0,0 +1,182 @@
+import random
+import itertools
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pika
+from pika.connection import Parameters
+from pika.exceptions import AMQPConnectionError
+
+from ..logger import logger as log
+
+
+def parse_endpoint(endpoint: str, port: Optional[int]) -> Tuple[str, Optional[int]]:
+    """Split an endpoint into its host & port
+
+    Args:
+        endpoint (str): 'host', 'host:port', or '[ipv6]:port'
+        port (Optional[int]): The port to use when the endpoint doesn't have one
+
+    Returns:
+        Tuple[str, Optional[int]]: The host & port
+    """
+    if endpoint.startswith("["):
+        host, _, rest = endpoint[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else port
+
+    # A bare IPv6 address has more than one colon, and no port
+    if endpoint.count(":") == 1:
+        host, _, node_port = endpoint.partition(":")
+        return host, int(node_port)
+
+    return endpoint, port
+
+
+class Cluster:
+    """
+    Cluster holds the connection parameters of every node in a broker cluster, and decides which node each
+    connection prefers.
+
+    Connections are spread across the nodes, and fall back to the others (in turn) when their preferred node
+    can't be reached. Consumers of a queue whose leader node is known prefer that node instead, saving the
+    cluster a hop between nodes for every message.
+    """
+
+    def __init__(
+        self, nodes: Sequence[Parameters], leaders: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Create a cluster from the connection parameters of its nodes
+
+        Args:
+            nodes (Sequence[Parameters]): The connection parameters of each node
+            leaders (Optional[Dict[str, str]], optional): The node leading each queue, by queue name. Nodes
+        can be named by host, 'host:port' or RabbitMQ node name ('rabbit@host'). Defaults to None.
+        """
+        if not nodes:
+            raise ValueError("A cluster needs at least one node")
+
+        self.nodes = list(nodes)
+        self.leaders = dict(leaders or {})
+
+        # Where the next connection's rotation starts, random so separate processes spread out too
+        self._rotation = itertools.count(random.randrange(len(self.nodes)))
+
+    @classmethod
+    def from_endpoints(
+        cls,
+        endpoints: Iterable[str],
+        port: Optional[int] = None,
+        leaders: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> "Cluster":
+        """Create a cluster from 'host' or 'host:port' endpoints
+
+        Args:
+            endpoints (Iterable[str]): The endpoint of each node
+            port (Optional[int], optional): The port of endpoints without one. Defaults to None (AMQP's port).
+            leaders (Optional[Dict[str, str]], optional): The node leading each queue. Defaults to None.
+
+            Any other arguments are passed directly in to each node's connection parameters.
+
+        Returns:
+            Cluster: The cluster
+        """
+        nodes = []
+
+        for endpoint in endpoints:
+            host, node_port = parse_endpoint(endpoint, port)
+            nodes.append(
+                pika.ConnectionParameters(
+                    host=host,
+                    port=int(node_port or pika.ConnectionParameters.DEFAULT_PORT),
+                    **kwargs,
+                )
+            )
+
+        return cls(nodes, leaders)
+
+    def leader(self, queue: str) -> Optional[Parameters]:
+        """Get the node leading a queue
+
+        Args:
+            queue (str): The queue name
+
+        Returns:
+            Optional[Parameters]: The leader's connection parameters, None if it isn't known
+        """
+        leader = self.leaders.get(queue)
+
+        if leader is None:
+            return None
+
+        host, port = parse_endpoint(leader.rpartition("@")[2], None)
+
+        for node in self.nodes:
+            if node.host == host and port in (None, node.port):
+                return node
+
+        return None
+
+    def order(self, index: int, queue: Optional[str] = None) -> List[Parameters]:
+        """Get the order a connection tries the nodes in
+
+        Args:
+            index (int): The connection's index, consecutive connections prefer consecutive nodes
+            queue (Optional[str], optional): The queue the connection consumes, whose leader is preferred. Defaults to None.
+
+        Returns:
+            List[Parameters]: The nodes, most preferred first
+        """
+        start = index % len(self.nodes)
+        nodes = self.nodes[start:] + self.nodes[:start]
+
+        leader = self.leader(queue) if queue else None
+
+        if leader is not None:
+            nodes.remove(leader)
+            nodes.insert(0, leader)
+
+        return nodes
+
+    def next_order(self) -> List[Parameters]:
+        """Get the order the next connection of a pool tries the nodes in, rotating through them
+
+        Returns:
+            List[Parameters]: The nodes, most preferred first
+        """
+        return self.order(next(self._rotation))
+
+    def connect(
+        self,
+        index: int,
+        queue: Optional[str] = None,
+        avoid: Optional[Parameters] = None,
+    ) -> Tuple[pika.BlockingConnection, Parameters]:
+        """Connect to the first node that's reachable
+
+        Args:
+            index (int): The connection's index, see `order`
+            queue (Optional[str], optional): The queue the connection consumes. Defaults to None.
+            avoid (Optional[Parameters], optional): A node that just failed, only tried once the others have. Defaults to None.
+
+        Raises:
+            AMQPConnectionError: If no node could be reached
+
+        Returns:
+            Tuple[pika.BlockingConnection, Parameters]: The connection, and the node it's to
+        """
+        nodes = self.order(index, queue)
+
+        if avoid in nodes:
+            nodes.remove(avoid)
+            nodes.append(avoid)
+
+        error = None
+
+        for node in nodes:
+            try:
+                return pika.BlockingConnection(node), node
+            except AMQPConnectionError as exc:
+                log.debug(f"Couldn't connect to {node.host}:{node.port}: {exc!r}")
+                error = exc
+
+        raise error
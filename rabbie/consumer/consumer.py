@@ -1,20 +1,32 @@
+import signal
+import threading
 from functools import wraps
-from typing import Optional, List, Union, Callable
+from dataclasses import replace
+from typing import Optional, List, Union, Callable, Dict, Any
 import time
-from multiprocess import Manager
 
 import pika
 from pika.connection import Parameters
 
 from .microconsumer import MicroConsumer
 from ..connection import Details
-from .listener import Listener, ListenerDetails, Status
-
-from ..supervisor import Supervisor
+from .listener import Listener, ListenerDetails, Status, LocalRoute
+from .listener.placement import available_cores, pin, plan_placement
 
 from ..decoder import Decoder, AutoDecoder
 from ..encoder import Encoder, AutoEncoder
+from ..broker_types import AckPolicy
+from ..cache import CachePolicy
+from ..dedup import DedupPolicy
+from ..retry import RetryPolicy
+from ..ratelimit import RateLimit
+from ..recycling import RecyclePolicy
+from ..recording import RecordPolicy
+from ..claimcheck import ClaimCheckPolicy
+from ..routing import Route, Router
 from ..events import event_handler
+from ..cluster import Cluster
+from ..admin import AdminServer
 from ..logger import logger as log
 
 
@@ -38,6 +50,11 @@ class Consumer:
         password: Optional[str] = Details.PASSWORD,
         default_decoder: Optional[Decoder] = AutoDecoder(),
         connection_parameters: Optional[Parameters] = None,
+        local_routing: bool = False,
+        pin_workers: bool = False,
+        admin_socket: Optional[str] = None,
+        hosts: Optional[List[str]] = None,
+        queue_leaders: Optional[Dict[str, str]] = None,
         **kwargs,
     ):
         """Instantiate a new Consumer object with the given connection details.
@@ -49,6 +66,11 @@ class Consumer:
             password (Optional[str], optional): The authenticated password. Defaults to Details.PASSWORD.
             default_decoder (Optional[Decoder], optional): The default decoder for decoding messages. Defaults to AutoDecoder
             connection_parameters (Optional[ConnectionParameters]): Override the default connection parameters, helpful if using URLParams
+            local_routing (bool, optional): Hand a listener's output straight to the listener consuming its return_queue when both belong to this consumer, skipping the broker. Defaults to False.
+            pin_workers (bool, optional): Pin every worker to its own core, keeping a core apart for this process when there are enough, rather than letting workers float between cores. Defaults to False.
+            admin_socket (Optional[str], optional): Create a Unix domain socket at this path to inspect & tune the running listeners through, see `python -m rabbie.admin`. Defaults to None.
+            hosts (Optional[List[str]], optional): The nodes of a broker cluster, as 'host' or 'host:port', used instead of host. Workers are spread across the nodes, and fail over to the next node straight away when theirs is lost. Defaults to None.
+            queue_leaders (Optional[Dict[str, str]], optional): The node leading each queue, by queue name. Workers consuming a queue prefer its leader over being spread. Defaults to None.
 
             Any other arguments are passed directly in to the connection parameters.
         """
@@ -58,19 +80,46 @@ class Consumer:
         self._password = password
 
         self.default_decoder = default_decoder
+        self.local_routing = local_routing
+        self.pin_workers = pin_workers
+        self.admin_socket = admin_socket
+        self._admin: Optional[AdminServer] = None
+
+        # Read once, as pinning this process narrows what it reads afterwards
+        self._allowed_cores = available_cores()
 
         credentials = pika.PlainCredentials(self._username, self._password)
 
+        # Workers are spread across the nodes of a cluster, when given one
+        self.cluster = (
+            Cluster.from_endpoints(
+                hosts,
+                port=self._port,
+                leaders=queue_leaders,
+                credentials=credentials,
+                **kwargs,
+            )
+            if hosts
+            else None
+        )
+
         # Create the parameters for connection to the Queue
-        self.connection_parameters = connection_parameters or pika.ConnectionParameters(
-            port=self._port,
-            host=self._host,
-            credentials=credentials,
-            **kwargs,
+        self.connection_parameters = connection_parameters or (
+            self.cluster.nodes[0]
+            if self.cluster
+            else pika.ConnectionParameters(
+                port=self._port,
+                host=self._host,
+                credentials=credentials,
+                **kwargs,
+            )
         )
 
         self.listeners: List[Listener] = []
 
+        # Held while listeners are started, stopped, reloaded or supervised, as those happen on other threads
+        self._lock = threading.RLock()
+
     def listen(
         self,
         queue: str = Details.QUEUE_NAME,
@@ -87,6 +136,21 @@ class Consumer:
         durable_queue: bool = False,
         exclusive_queue: bool = False,
         auto_delete_queue: bool = False,
+        shards: int = 0,
+        packed_batch: bool = False,
+        ack_policy: Optional[AckPolicy] = None,
+        cache: Optional[CachePolicy] = None,
+        dedup: Optional[DedupPolicy] = None,
+        retry: Optional[RetryPolicy] = None,
+        max_age: Optional[float] = None,
+        shed_queue: Optional[str] = None,
+        shed: bool = False,
+        rate_limit: Optional[RateLimit] = None,
+        recycle: Optional[RecyclePolicy] = None,
+        timeout: Optional[float] = None,
+        drain_timeout: float = 30,
+        record: Optional[RecordPolicy] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
         # Must accept a single argument 'channel', to allow for any further manipulation that is not supported here
         configuration_callback: Callable = None,
     ):
@@ -97,6 +161,21 @@ class Consumer:
             workers (int, optional): The amount of workers to listen simultaneously. Defaults to 1.
             decoder (Optional[Decoder], optional): The decoder for this specific listener. Defaults to None.
             restart (bool, optional): Should we attempt to restart this listener if connection fails?. Defaults to True.
+            shards (int, optional): Spread the queue across this many physical queues ('queue.0'..'queue.N-1'). Defaults to 0 (unsharded).
+            packed_batch (bool, optional): Call the function once with a list of every message in a packed envelope, rather than once per message. Defaults to False.
+            ack_policy (Optional[AckPolicy], optional): Batch up acknowledgements made through `Channel.acknowledge`, only used when auto_acknowledge is False. Defaults to None.
+            cache (Optional[CachePolicy], optional): Cache the function's output against the raw message body, repeated bodies skip decoding and the function entirely. Only use this for functions that depend on nothing but the body. Defaults to None.
+            dedup (Optional[DedupPolicy], optional): Remember the message_id (or body) of every message the function processed successfully, and acknowledge redeliveries without calling it again. Messages without a message_id are always processed. Defaults to None.
+            retry (Optional[RetryPolicy], optional): When the function raises, republish the message to a delay queue that routes it back after an exponentially growing delay, and to a dead letter queue once out of attempts. RPC requests are not retried. Defaults to None.
+            max_age (Optional[float], optional): Acknowledge and drop messages older than this many seconds before they are decoded, going by their timestamp. Turns on `shed`. Defaults to None.
+            shed_queue (Optional[str], optional): Move dropped messages to this queue rather than discarding them. Turns on `shed`. Defaults to None.
+            shed (bool, optional): Acknowledge and drop messages past their deadline or expiration before they are decoded. Ages are measured against the producer's clock, so this assumes the hosts' clocks are in sync (e.g. through NTP). Defaults to False.
+            rate_limit (Optional[RateLimit], optional): Cap how often the function is called per second, shared by every worker. While over the limit, workers stop consuming and hand their messages back to the broker. Defaults to None.
+            recycle (Optional[RecyclePolicy], optional): Replace workers with fresh processes after they have handled a number of messages, grown past a memory ceiling or run for a while. Replacements connect before the old worker drains, so capacity never dips. Defaults to None.
+            timeout (Optional[float], optional): Interrupt the function with a HandlerTimeout once a call runs for this many seconds. The message is retried if there's a retry policy, otherwise requeued once. Workers stuck where they can't be interrupted are killed and replaced. Defaults to None.
+            drain_timeout (float, optional): Seconds workers are given to finish their current message when stopped, after they stop consuming & hand back messages they hadn't started on. Workers still running are then closed outright. Defaults to 30.
+            record (Optional[RecordPolicy], optional): Record every message consumed (raw body, properties & arrival time) to memory mapped segment files, to be fed back in later with a Replayer. Defaults to None.
+            claim_check (Optional[ClaimCheckPolicy], optional): Read payloads producers kept in the policy's blob store, handing the function a memoryview of the memory mapped payload, and delete them once handled. Defaults to None.
         """
 
         def decorator(function):
@@ -119,11 +198,36 @@ class Consumer:
                     configuration_callback=configuration_callback,
                     return_queue=return_queue,
                     encoder=encoder,
+                    shards=shards,
+                    packed_batch=packed_batch,
+                    ack_policy=ack_policy,
+                    cache=cache,
+                    dedup=dedup,
+                    retry=retry,
+                    max_age=max_age,
+                    shed_queue=shed_queue,
+                    shed=shed,
+                    rate_limit=rate_limit,
+                    recycle=recycle,
+                    timeout=timeout,
+                    drain_timeout=drain_timeout,
+                    record=record,
+                    claim_check=claim_check,
                 ),
             )
 
-            # Add the configured listener to the list of listeners to be called later
-            self.listeners.append(ls)
+            # A module being hot reloaded registers its listeners again, update those rather than duplicating them.
+            # That happens on the supervisor's thread, while the listeners are being supervised
+            with self._lock:
+                existing = self._find_listener(function, queue)
+                if existing:
+                    # Routes are registered separately, so they carry over
+                    existing.details = replace(
+                        ls.details, router=existing.details.router
+                    )
+                else:
+                    # Add the configured listener to the list of listeners to be called later
+                    self.listeners.append(ls)
 
             @wraps(function)
             def listener(*args, **kwargs):
@@ -133,6 +237,78 @@ class Consumer:
 
         return decorator
 
+    def _find_listener(self, function: Callable, queue: str) -> Optional[Listener]:
+        """Find the listener already registered for a function & queue
+
+        Args:
+            function (Callable): The listener's function
+            queue (str): The queue the listener consumes
+
+        Returns:
+            Optional[Listener]: The registered listener, if there is one
+        """
+        for listener in self.listeners:
+            callback = listener.details.callback
+
+            if listener.details.queue_name != queue:
+                continue
+
+            # A listener created for routes alone is taken over by the first function listening to its queue
+            if callback is None:
+                return listener
+
+            if (
+                function is not None
+                and callback.__module__ == function.__module__
+                and callback.__qualname__ == function.__qualname__
+            ):
+                return listener
+
+        return None
+
+    def route(
+        self,
+        queue: str = Details.QUEUE_NAME,
+        routing_key: Optional[str] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ):
+        """Handle the messages of a queue that match a routing key pattern and/or headers with this function
+
+        Routes share the workers & settings of the queue's listener, given through `listen`, whose function takes
+        every message no route matches. Without one, the listener is created with the default settings and
+        rejects messages no route matches.
+
+        Args:
+            queue (str, optional): The queue the messages arrive on. Defaults to Details.QUEUE_NAME.
+            routing_key (Optional[str], optional): A topic pattern the routing key must match, where '*' matches one word & '#' any amount. Defaults to None.
+            headers (Optional[Dict[str, Any]], optional): Headers the message must carry, with these exact values. Defaults to None.
+        """
+
+        def decorator(function):
+            # Reloaded modules register their routes again on the supervisor's thread, see `listen`
+            with self._lock:
+                listener = next(
+                    (ls for ls in self.listeners if ls.details.queue_name == queue),
+                    None,
+                )
+
+                if listener is None:
+                    self.listen(queue)(None)
+                    listener = self.listeners[-1]
+
+                if listener.details.router is None:
+                    listener.details.router = Router()
+
+                listener.details.router.add(Route(function, routing_key, headers))
+
+            @wraps(function)
+            def route(*args, **kwargs):
+                return function(*args, **kwargs)
+
+            return route
+
+        return decorator
+
     def add_consumer(self, consumer: Union["Consumer", MicroConsumer]):
         """Merge a consumer into this consumer, adds all registered listeners
         to this consumer
@@ -153,20 +329,22 @@ class Consumer:
         Start listening for messages across all the created listeners
 
         Args:
+          reload (bool): bool = False. Should listeners be restarted when the code they depend on changes?
           halt (bool): bool = True. Should calling this function halt the main thread?
         """
         log.info("Starting Service...")
 
-        # Temporarily disabling reloading
-        reload = False
-
         self._create_shared_registry()
 
         if reload:
+            # The supervisor pulls in watchdog, so only import it when reloading is asked for
+            from ..supervisor import Supervisor
+
             supervisor = Supervisor(
                 "./",
                 start_function=self._start_listeners,
                 stop_function=self._stop_listeners,
+                reload_function=self._reload_listeners,
             )
 
             supervisor.listen()
@@ -175,6 +353,12 @@ class Consumer:
 
         self._await_startup(self.shared_registry)
 
+        threading.Thread(target=self._supervise_listeners, daemon=True).start()
+
+        if self.admin_socket:
+            self._admin = AdminServer(self, self.admin_socket)
+            self._admin.start()
+
         event_handler._call("on_start")
 
         workers_amount = len(self.shared_registry.keys())
@@ -185,35 +369,307 @@ class Consumer:
 
         self._halt(halt)
 
+    def _supervise_listeners(self, interval: float = 1):
+        """Replace dead workers and recycle workers, forever. This runs on a background thread.
+
+        Args:
+            interval (float, optional): Seconds between checks. Defaults to 1.
+        """
+        while True:
+            time.sleep(interval)
+
+            with self._lock:
+                for listener in self.listeners:
+                    listener.supervise(self.shared_registry)
+
     def _create_shared_registry(self):
         """Create a shared registry for all workers to interact with.
 
         Note: This must be protected by __name__ == "__main__" check, ensure consumer.start() is protected
         or else an error will arise.
         """
+        from multiprocess import Manager
+
         # Create a manager instance so all workers can have a central registry
         manager = Manager()
         self.shared_registry = manager.dict()
 
     def _start_listeners(self):
         """Start all the listeners & their workers"""
-        workers_amount = sum(listener.details.workers for listener in self.listeners)
-        log.info(
-            f"Starting {len(self.listeners)} listeners ({workers_amount} {'worker' if workers_amount == 1 else 'workers'})"
+        with self._lock:
+            workers_amount = sum(
+                listener.details.workers for listener in self.listeners
+            )
+            log.info(
+                f"Starting {len(self.listeners)} listeners ({workers_amount} {'worker' if workers_amount == 1 else 'workers'})"
+            )
+            # Every listener's shared state must exist before any worker starts, as workers hand outputs between listeners
+            for listener in self.listeners:
+                listener.allowed_cores = self._allowed_cores
+                listener.prepare()
+
+            if self.local_routing:
+                self._link_local_routes()
+
+            if self.pin_workers:
+                self._place_workers()
+
+            if self.cluster:
+                self._spread_workers()
+
+            for listener in self.listeners:
+                listener.start(self.shared_registry)
+
+    def _place_workers(self):
+        """Decide which core every listener's workers are pinned to, and log the placement"""
+        parent, placement = plan_placement(
+            [listener.planned_workers() for listener in self.listeners],
+            cores=self._allowed_cores,
         )
+
+        if parent is not None:
+            pin(parent)
+            log.info(f"Pinned consumer to core {parent}")
+
+        for listener, cores in zip(self.listeners, placement):
+            listener.cores = cores
+            log.info(
+                f"Placing '{listener.details.queue_name}' workers on cores {listener.cores}"
+            )
+
+    def _spread_workers(self):
+        """Spread every listener's workers across the nodes of the cluster, carrying on from the last listener's"""
+        offset = 0
+
         for listener in self.listeners:
-            listener.start(self.shared_registry)
+            listener.cluster = self.cluster
+            listener.node_offset = offset
+            offset += listener.planned_workers()
 
-    def _stop_listeners(self):
-        """Stop all the currently running listeners & workers"""
-        workers_amount = sum(len(listener.workers) for listener in self.listeners)
         log.info(
-            f"[red]Stopping {len(self.listeners)} listeners ({workers_amount} {'worker' if workers_amount == 1 else 'workers'})"
+            f"Spreading {offset} workers across {len(self.cluster.nodes)} broker nodes"
         )
+
+    def _link_local_routes(self):
+        """Route each listener's output in-process to the listener consuming its return queue, if there is one"""
+        # Sharded queues are split across physical queues, batches expect lists, and routes need the routing key
+        # outputs aren't given, so none of them are handed to
+        targets = {
+            listener.details.queue_name: listener
+            for listener in self.listeners
+            if not listener.details.shards
+            and not listener.details.packed_batch
+            and listener.details.router is None
+        }
+
         for listener in self.listeners:
-            listener.stop()
+            target = targets.get(listener.details.return_queue)
+
+            if target is None or target is listener:
+                listener.local_route = None
+                continue
+
+            if (
+                listener.local_route is None
+                or listener.local_route.target is not target
+            ):
+                listener.local_route = LocalRoute(target)
+
+            log.debug(
+                f"Routing output of '{listener.details.queue_name}' to '{target.details.queue_name}' in-process"
+            )
 
-        event_handler._call("on_stop")
+    def _stop_listeners(self):
+        """Stop all the currently running listeners & workers"""
+        with self._lock:
+            workers_amount = sum(len(listener.workers) for listener in self.listeners)
+            log.info(
+                f"[red]Stopping {len(self.listeners)} listeners ({workers_amount} {'worker' if workers_amount == 1 else 'workers'})"
+            )
+            # Every listener drains at once, so stopping takes the longest drain timeout rather than their sum
+            for listener in self.listeners:
+                listener.begin_stop()
+
+            for listener in self.listeners:
+                listener.stop()
+
+            event_handler._call("on_stop")
+
+    def _reload_listeners(self, modules: List[str]) -> int:
+        """Restart the listeners whose functions live in reloaded modules, with the reloaded functions.
+
+        Every other listener's workers are left running, keeping their connections open.
+
+        Args:
+            modules (List[str]): The names of the reloaded modules
+
+        Returns:
+            int: The amount of listeners restarted
+        """
+        from ..supervisor import latest
+
+        with self._lock:
+            affected = [
+                listener
+                for listener in self.listeners
+                if any(
+                    function.__module__ in modules
+                    for function in self._functions_of(listener)
+                )
+            ]
+
+            # Workers routing outputs in-process hold their own copy of the target's function, so restart them too
+            affected += [
+                listener
+                for listener in self.listeners
+                if listener not in affected
+                and listener.local_route is not None
+                and listener.local_route.target in affected
+            ]
+
+            for listener in affected:
+                if listener.details.callback is not None:
+                    listener.details.callback = latest(listener.details.callback)
+
+                for route in getattr(listener.details.router, "routes", []):
+                    route.callback = latest(route.callback)
+
+                listener.restart(self.shared_registry)
+
+            return len(affected)
+
+    def _functions_of(self, listener: Listener) -> List[Callable]:
+        """Get the listener's function and the function of each of its routes
+
+        Args:
+            listener (Listener): The listener
+
+        Returns:
+            List[Callable]: The functions
+        """
+        functions = [
+            route.callback for route in getattr(listener.details.router, "routes", [])
+        ]
+
+        if listener.details.callback is not None:
+            functions.append(listener.details.callback)
+
+        return functions
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """Read the counters of every started listener, totalled across all of their workers
+
+        Returns:
+            Dict[str, Dict[str, int]]: The counters of each listener, keyed by queue name
+        """
+        return {
+            listener.details.queue_name: listener.metrics.snapshot()
+            for listener in self.listeners
+            if listener.metrics is not None
+        }
+
+    def route_metrics(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Read the counters of every route of the started listeners, totalled across all of their workers
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, int]]]: The counters of each route (and 'default'), keyed by queue name then route
+        """
+        return {
+            listener.details.queue_name: listener.route_metrics.snapshot()
+            for listener in self.listeners
+            if listener.route_metrics is not None
+        }
+
+    def _listeners_for(self, queue: str) -> List[Listener]:
+        """Find the listeners consuming a queue
+
+        Args:
+            queue (str): The queue name
+
+        Raises:
+            ValueError: If no listener consumes the queue
+
+        Returns:
+            List[Listener]: The listeners consuming the queue
+        """
+        listeners = [
+            listener
+            for listener in self.listeners
+            if listener.details.queue_name == queue
+        ]
+
+        if not listeners:
+            raise ValueError(f"No listener consumes '{queue}'")
+
+        return listeners
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Describe every listener & the state of each of its workers
+
+        Returns:
+            List[Dict[str, Any]]: The status of each listener
+        """
+        with self._lock:
+            return [
+                listener.status(self.shared_registry) for listener in self.listeners
+            ]
+
+    def scale(self, queue: str, workers: int):
+        """Change the amount of workers consuming a queue, without restarting the others
+
+        Args:
+            queue (str): The queue name
+            workers (int): The new amount of workers
+        """
+        with self._lock:
+            for listener in self._listeners_for(queue):
+                log.info(f"Scaling '{queue}' to {workers} workers")
+                listener.scale(workers, self.shared_registry)
+
+    def set_prefetch(self, queue: str, count: int):
+        """Change the prefetch count of the workers consuming a queue, while they're running
+
+        Args:
+            queue (str): The queue name
+            count (int): The new prefetch count, 0 for unlimited
+        """
+        with self._lock:
+            for listener in self._listeners_for(queue):
+                log.info(f"Changing the prefetch count of '{queue}' to {count}")
+                listener.set_prefetch(count)
+
+    def pause(self, queue: str):
+        """Stop the workers consuming a queue, until resumed
+
+        Args:
+            queue (str): The queue name
+        """
+        with self._lock:
+            for listener in self._listeners_for(queue):
+                log.info(f"Pausing '{queue}'")
+                listener.pause()
+
+    def resume(self, queue: str):
+        """Start the paused workers of a queue consuming again
+
+        Args:
+            queue (str): The queue name
+        """
+        with self._lock:
+            for listener in self._listeners_for(queue):
+                log.info(f"Resuming '{queue}'")
+                listener.resume()
+
+    def drain(self, queue: str):
+        """Have the workers consuming a queue finish what they hold and exit, until scaled up again
+
+        Args:
+            queue (str): The queue name
+        """
+        with self._lock:
+            for listener in self._listeners_for(queue):
+                log.info(f"Draining '{queue}'")
+                listener.drain(self.shared_registry)
 
     def _await_startup(self, registry):
         """Wait for all known listeners to be started, then continue."""
@@ -228,13 +684,28 @@ class Consumer:
         Args:
             halt (bool): Halt or not
         """
+        if not halt:
+            return
+
+        # Process managers stop the consumer with SIGTERM, which drains it just as Ctrl+C does
+        signal.signal(signal.SIGTERM, lambda sig, frame: self._exit())
+
         try:
-            while halt:
+            while True:
                 time.sleep(1)
         except KeyboardInterrupt:
-            log.info("Exiting gracefully...")
-            self._stop_listeners()
-            exit()
+            self._exit()
+
+    def _exit(self):
+        """Stop every listener, letting the workers drain, and the admin socket, then exit"""
+        log.info("Exiting gracefully...")
+        self._stop_listeners()
+
+        if self._admin is not None:
+            self._admin.stop()
+            self._admin = None
+
+        exit()
 
 
 consumer = Consumer(
@@ -1,3 +1,5 @@
 from .listener import Listener
 from .listener_details import ListenerDetails
 from .listener_status import Status
+from .local_route import LocalChannel, LocalRoute
+from .watchdog import HandlerTimeout
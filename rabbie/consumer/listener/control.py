@@ -0,0 +1,60 @@
+from typing import Optional
+
+# The slots of the control block
+_PREFETCH = 0
+_PAUSED = 1
+_WORKERS = 2
+
+
+class ListenerControl:
+    """
+    ListenerControl holds settings the consumer's process can change while a listener's workers are running,
+    in shared memory. Workers pick up changes between messages, and at least once a second while idle.
+
+    Only the consumer's process writes to it, so it needs no lock.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self, prefetch_count: int) -> None:
+        from multiprocess import RawArray
+
+        self._values = RawArray("q", [prefetch_count, 0, 0])
+
+    @property
+    def prefetch_count(self) -> int:
+        return self._values[_PREFETCH]
+
+    @prefetch_count.setter
+    def prefetch_count(self, count: int):
+        self._values[_PREFETCH] = count
+
+    @property
+    def paused(self) -> bool:
+        return bool(self._values[_PAUSED])
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._values[_PAUSED] = int(paused)
+
+    @property
+    def workers(self) -> int:
+        """The amount of workers the listener is running, 0 until started and once drained or stopped"""
+        return self._values[_WORKERS]
+
+    @workers.setter
+    def workers(self, workers: int):
+        self._values[_WORKERS] = workers
+
+    def prefetch_change(self, applied: int) -> Optional[int]:
+        """Check whether the prefetch count differs from the one a worker applied
+
+        Args:
+            applied (int): The prefetch count the worker's channel has
+
+        Returns:
+            Optional[int]: The prefetch count to apply, None if it hasn't changed
+        """
+        count = self.prefetch_count
+
+        return None if count == applied else count
@@ -0,0 +1,212 @@
+import os
+from typing import List
+
+import pika
+from pika.adapters.blocking_connection import BlockingChannel
+
+from .listener_status import Status
+from ...broker_types import Channel, Method, Properties
+from ...logger import logger as log
+
+
+class Draining:
+    """
+    Draining holds how a listener's worker stops consuming and hands messages back: pausing for the rate
+    limit or the admin socket, and draining before it exits.
+
+    It's mixed into Listener, and works on the worker state the listener sets up.
+    """
+
+    def _throttle(
+        self,
+        channel: BlockingChannel,
+        method: Method,
+        properties: Properties,
+        body: bytes,
+        calls: int = 1,
+    ) -> bool:
+        """Take tokens for the callback calls a message needs, pausing consumption if there aren't enough
+
+        While paused, messages are handed back to the broker (other consumers of the queue can take them)
+        rather than held here. Messages that were automatically acknowledged can't be handed back, so
+        they're held and handled once the pause is over.
+
+        Args:
+            channel (BlockingChannel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            body (bytes): The raw message body
+            calls (int, optional): How many times the message will call the callback. Defaults to 1.
+
+        Returns:
+            bool: True if the message was handed back (or held), and must not be handled now
+        """
+        if self._bucket is None:
+            return False
+
+        wait = self._bucket.acquire(calls)
+
+        if not wait:
+            return False
+
+        if self._paused_for is None:
+            self.metrics.increment("throttled")
+
+        self._pause(channel, wait)
+
+        if self.details.auto_ack:
+            self._held.appendleft((method, properties, body))
+        else:
+            Channel(channel, self._coalescer).reject(
+                requeue=True, delivery_tag=method.delivery_tag
+            )
+
+        return True
+
+    def _pause(self, channel: BlockingChannel, wait: float):
+        """Cancel every consumer on the channel, which ends `start_consuming`, see `_wait_out_pause`
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+            wait (float): Seconds to pause for
+        """
+        self._paused_for = max(self._paused_for or 0, wait)
+        self._cancel_consumers(channel)
+
+    def _cancel_consumers(self, channel: BlockingChannel):
+        """Cancel every consumer on the channel, which ends `start_consuming`
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+        """
+        for consumer_tag in list(self._consumer_queues):
+            # Pending manually acknowledged messages are rejected back to the queue, auto acknowledged ones returned
+            self._held.extend(channel.basic_cancel(consumer_tag))
+
+        self._consumer_queues.clear()
+
+    def _stop_consuming(self, channel: BlockingChannel):
+        """Stop consuming for good, handing the messages this worker was sent but hadn't started on back to
+        the broker
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+        """
+        if not self._consumer_queues or self._stopping:
+            return
+
+        # Messages pika has already received are still passed to `_callback` once the current one returns,
+        # which sets them aside. Cancel after that, so pika doesn't reject them one at a time
+        self._stopping = True
+        channel.connection.call_later(0, lambda: self._release(channel))
+
+    def _release(self, channel: BlockingChannel):
+        """Cancel every consumer, and hand the messages set aside back to the broker
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+        """
+        # Everything started has to be settled first, as the nack covers every earlier delivery tag too
+        if self._coalescer:
+            self._coalescer.flush()
+
+        self._cancel_consumers(channel)
+        self._stopping = False
+
+        if not self._set_aside:
+            return
+
+        # A multiple nack reaches every unsettled delivery below it, so it's only sent when the worker hasn't
+        # started a message on this channel. Otherwise failed messages without a retrier, and messages the
+        # callback holds on to, would be requeued too
+        if self._started_any:
+            for delivery_tag in self._set_aside:
+                channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        else:
+            channel.basic_nack(
+                delivery_tag=max(self._set_aside), multiple=True, requeue=True
+            )
+
+        self.metrics.increment("drain_released", len(self._set_aside))
+        self._set_aside.clear()
+
+    def _apply_control(self, channel: BlockingChannel):
+        """Pick up the prefetch count & pause set through the admin socket
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+        """
+        if self._control is None:
+            return
+
+        count = self._control.prefetch_change(self._prefetch)
+
+        if count is not None:
+            channel.basic_qos(
+                prefetch_count=count,
+                prefetch_size=self.details.qos_prefetch_size,
+                global_qos=self.details.global_qos,
+            )
+            self._prefetch = count
+            log.info(f"[{os.getpid()}] Prefetch count changed to {count}")
+
+        if self._control.paused and self._paused_for is None:
+            log.info(f"[{os.getpid()}] Paused")
+            self._pause(channel, 1)
+
+    def _wait_out_pause(
+        self,
+        connection: pika.BlockingConnection,
+        channel: BlockingChannel,
+        queues: List[str],
+    ):
+        """Sleep through a rate limit pause, handle any held messages, then start consuming again
+
+        Args:
+            connection (pika.BlockingConnection): The worker's connection
+            channel (BlockingChannel): The worker's channel
+            queues (List[str]): The queues to consume again
+        """
+        while self._paused_for is not None and not self._draining:
+            # Sleeping through the connection keeps heartbeats flowing
+            connection.sleep(self._paused_for)
+            self._paused_for = None
+
+            # Paused through the admin socket, so wait until resumed
+            if self._control is not None and self._control.paused:
+                self._paused_for = 1
+                continue
+
+            while self._held and self._paused_for is None:
+                self._handle(channel, *self._held.popleft())
+
+            if self._paused_for is None and not self._draining:
+                self._consume(channel, queues)
+
+    def _drain(self, connection: pika.BlockingConnection, channel: BlockingChannel):
+        """Handle any messages still held after consuming stopped, then close the connection
+
+        Args:
+            connection (pika.BlockingConnection): The worker's connection
+            channel (BlockingChannel): The worker's channel
+        """
+        self._change_status(self._registry, Status.DRAINING)
+
+        while self._held:
+            if self._paused_for is not None:
+                connection.sleep(self._paused_for)
+                self._paused_for = None
+
+            self._handle(channel, *self._held.popleft())
+
+        if self._coalescer:
+            self._coalescer.flush()
+
+        if self._recorder is not None:
+            self._recorder.close()
+
+        channel.close()
+        connection.close()
+
+        self._change_status(self._registry, Status.STOPPED)
+        log.info(f"[{os.getpid()}] Drained, exiting")
@@ -1,27 +1,57 @@
+import copy
 import os
 import sys
 import signal
 
-from multiprocess import Process
-from multiprocess.managers import DictProxy
-
 from inspect import signature
 import traceback
+from dataclasses import replace
 
-from typing import List, Any
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional, Tuple
 import time
+from collections import deque
 
 from .listener_details import ListenerDetails
 from .listener_status import Status
-from ...broker_types import Channel, Method, Properties
+from .watchdog import HandlerTimeout, Watchdog, KILL_GRACE, TIMEOUT_HEADER
+from .control import ListenerControl
+from .placement import available_cores, pin, usable_cores
+from .local_route import LocalRoute, LocalRouting, SENT_HEADER
+from .draining import Draining
+from .supervision import Supervision
+from ...broker_types import (
+    Channel,
+    Method,
+    Properties,
+    AckCoalescer,
+    AckPolicy,
+    is_stale,
+)
 from ...logger import logger as log
+from ...sharding import shard_name
+from ...packing import PackedChannel, PACKED_HEADER, is_packed, unpack
+from ...cache import MISS, cache_key, create_cache
+from ...dedup import create_index, dedup_key
+from ...metrics import ListenerMetrics, LatencyHistogram, RouteMetrics
+from ...retry import Retrier, ROUTING_KEY_HEADER, routing_key_of
+from ...ratelimit import TokenBucket
+from ...cluster import Cluster
+from ...recording import Recorder
+from ...claimcheck import claim_of
+from ...routing import DEFAULT_ROUTE
 
 import pika
+from pika.connection import Parameters
 from pika.exceptions import AMQPError
 from pika.adapters.blocking_connection import BlockingChannel
 
+if TYPE_CHECKING:
+    # multiprocess (and dill) are slow to import, they're only loaded once listeners start
+    from multiprocess import Process
+    from multiprocess.managers import DictProxy
+
 
-class Listener:
+class Listener(LocalRouting, Draining, Supervision):
     def __init__(
         self,
         details: ListenerDetails,
@@ -31,12 +61,85 @@ class Listener:
         self.details = details
 
         self.connection_parameters = connection_parameters
-        self.workers: List[Process] = []
+        self.workers: List["Process"] = []
+        self._worker_count = details.workers
+
+        # Each worker process coalesces the acknowledgements on its own channel
+        self._coalescer: Optional[AckCoalescer] = None
+
+        # Counters & caches shared by every worker, created in start() so the workers inherit them
+        self.metrics: Optional[ListenerMetrics] = None
+        self.route_metrics: Optional[RouteMetrics] = None
+        self._cache = None
+        self._dedup = None
+
+        # Each worker declares its own retry queues, and remembers which queue each consumer tag belongs to
+        self._retrier: Optional[Retrier] = None
+        self._consumer_queues = {}
+
+        # Shared by every worker, and the state of this worker while it's paused by the rate limit
+        self._bucket: Optional[TokenBucket] = None
+        self._paused_for: Optional[float] = None
+        self._held = deque()
+
+        # Parent side: replacements for workers being recycled (by index), and old workers left to drain
+        self._replacements: Dict[int, "Process"] = {}
+        self._retiring: List["Process"] = []
+        # The workers told to stop by begin_stop, and when their drain timeout runs out
+        self._stopping: Optional[Tuple[List["Process"], float]] = None
+
+        # Enforces the timeout, each worker process gets its own slot (by pid) to record its current call in
+        self._watchdog: Optional[Watchdog] = None
+        self._slot: Optional[int] = None
+        self._next_slot = 0
+        # How many calls are running in another listener's worker through run_local, which have no slot here
+        self._running_local = 0
+        self._slots: Dict[int, int] = {}
+
+        # Appends every message consumed to the record log, each worker writes its own segments
+        self._recorder: Optional[Recorder] = None
+
+        # Settings changed through the admin socket, and the prefetch count this worker's channel has
+        self._control: Optional[ListenerControl] = None
+        self._prefetch = details.qos_prefetch_count
+
+        # Worker side: what the recycle policy is checked against, and whether the worker is draining
+        self._registry: Optional["DictProxy"] = None
+        self._handled = 0
+        self._started_at = time.monotonic()
+        self._recycle_requested = False
+        self._draining = False
+
+        # While draining, the delivery tags of messages the worker was sent but won't start on, and whether
+        # any message was started on the worker's channel (which may still be unsettled)
+        self._set_aside: List[int] = []
+        self._started_any = False
+        self._stopping = False
+        self._terminating = False
+
+        # Set by the consumer when connecting to a cluster, and the offset that spreads this listener's workers
+        # across its nodes. Each worker remembers the node it's on, and the node it last lost
+        self.cluster: Optional[Cluster] = None
+        self.node_offset = 0
+        self._node: Optional[Parameters] = None
+        self._failed_node: Optional[Parameters] = None
+
+        # Set by the consumer when pinning workers, the core of each worker by index
+        self.cores: Optional[List[int]] = None
+
+        # Set by the consumer, the cores its process could run on before it pinned itself
+        self.allowed_cores: Optional[List[int]] = None
+
+        # Set by the consumer when its return queue is consumed by another of its listeners
+        self.local_route: Optional[LocalRoute] = None
+
+        # Set by a benchmark, how long each stamped message took from being sent to being handled
+        self.latencies: Optional[LatencyHistogram] = None
 
     def is_listening(self) -> bool:
         return all([worker.is_alive() for worker in self.workers])
 
-    def _change_status(self, registry: DictProxy, status: Status):
+    def _change_status(self, registry: "DictProxy", status: Status):
         """Change the status of the process we're inside of
 
         Args:
@@ -55,21 +158,322 @@ class Listener:
         """
         This function is called when a message is received on the queue.
         """
+        # Once draining, messages that were already on their way are set aside to be handed back, see `_stop_consuming`
+        if self._draining:
+            if self.details.auto_ack:
+                self._held.append((method, properties, body))
+            else:
+                self._set_aside.append(method.delivery_tag)
+
+            return
 
         log.info(
             f"[{os.getpid()}] Received new message on queue '{self.details.queue_name}'"
         )
+        self._started_any = True
+
+        if self._recorder is not None:
+            self._recorder.append(method.routing_key, properties, body)
+
+        if self._coalescer:
+            self._coalescer.track(method.delivery_tag)
+
+        if self.metrics:
+            self.metrics.increment("messages")
+            self._record_broker_hop(properties)
+
+        self._handle(channel, method, properties, body)
+
+        if self.latencies is not None:
+            self._record_latency(properties)
+
+        self._handled += 1
+        self._check_worker(channel)
+
+    def _handle(
+        self,
+        channel: BlockingChannel,
+        method: Method,
+        properties: Properties,
+        body: bytes,
+    ) -> Optional[bool]:
+        """Shed, deduplicate, serve from cache or dispatch a delivered message
+
+        Args:
+            channel (BlockingChannel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            body (bytes): The raw message body
+
+        Returns:
+            Optional[bool]: True if the callback succeeded, None if it wasn't called (or the message was packed)
+        """
+        # Results for stale messages are useless to whoever sent them, so don't spend time decoding them.
+        # Only listeners that opted in shed, as ages are measured against the producer's clock
+        if self.details.sheds and is_stale(properties, self.details.max_age):
+            self._shed(Channel(channel, self._coalescer), method, properties, body)
+            return
+
+        # Packed envelopes hold many messages, which are handed to the callback individually (or as a batch)
+        if is_packed(properties):
+            calls = (
+                1 if self.details.packed_batch else properties.headers[PACKED_HEADER]
+            )
+
+            if not self._throttle(channel, method, properties, body, calls):
+                self._dispatch_packed(channel, method, properties, body)
+            return
+
+        wrapped_channel = Channel(channel, self._coalescer)
+        message_key, output_key = None, None
+
+        # On routed listeners the same body can go to different functions, so keys are scoped by route
+        scope = (
+            self._route_scope(method, properties)
+            if self._dedup is not None or self._cache is not None
+            else None
+        )
+
+        # Payloads kept in the blob store are mapped, rather than carried in the message. The body is empty,
+        # so they're neither cached nor deduplicated by it
+        reference = claim_of(properties)
+
+        if reference is not None and self.details.claim_check:
+            if self._throttle(channel, method, properties, body):
+                return
+
+            return self._dispatch_claimed(
+                wrapped_channel, method, properties, body, reference
+            )
+
+        # Redeliveries of a message that was already processed are acknowledged without calling the callback
+        if self._dedup is not None:
+            message_key = dedup_key(properties, body, self.details.dedup.by_body, scope)
+
+            if message_key is not None and self._dedup.seen(message_key):
+                self.metrics.increment("duplicates")
+                self._settle(wrapped_channel, method)
+                return
+
+        # Outputs are cached against the raw body, so a hit skips decoding as well as the callback
+        if self._cache is not None:
+            output_key = cache_key(body, scope)
+            cached = self._cache.get(output_key)
+
+            if cached is not MISS:
+                self.metrics.increment("cache_hits")
+                self._send_output(wrapped_channel, properties, cached)
+                self._settle(wrapped_channel, method)
+                return
+
+            self.metrics.increment("cache_misses")
+
+        if self._throttle(channel, method, properties, body):
+            return
+
+        return self._dispatch(
+            wrapped_channel,
+            method,
+            properties,
+            self._decode(body),
+            raw=body,
+            cache_key=output_key,
+            dedup_key=message_key,
+        )
+
+    def _route_scope(self, method: Method, properties: Properties) -> Optional[bytes]:
+        """Get the function a message will be routed to, for scoping its cache & dedup keys
+
+        Args:
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+
+        Returns:
+            Optional[bytes]: The route's function (or the default route's), None on listeners without routes
+        """
+        router = self.details.router
+
+        if router is None:
+            return None
+
+        route = router.match(
+            routing_key_of(method, properties), getattr(properties, "headers", None)
+        )
+
+        if route is None:
+            return DEFAULT_ROUTE.encode("utf-8")
+
+        callback = router.routes[route].callback
+
+        return f"{callback.__module__}.{callback.__qualname__}".encode("utf-8")
+
+    def _consume(self, channel: BlockingChannel, queues: List[str]):
+        """Start consuming from each queue, remembering which queue each consumer tag belongs to
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+            queues (List[str]): The queues to consume
+        """
+        for queue in queues:
+            consumer_tag = channel.basic_consume(
+                queue=queue,
+                on_message_callback=self._callback,
+                auto_ack=self.details.auto_ack,
+            )
+            self._consumer_queues[consumer_tag] = queue
+
+    def _record_latency(self, properties: Properties):
+        """Record how long a stamped message took from being sent to being handled
+
+        Args:
+            properties (Properties): The message properties
+        """
+        sent = (getattr(properties, "headers", None) or {}).get(SENT_HEADER)
+
+        if sent is not None:
+            self.latencies.record(time.time_ns() - sent)
+
+    def _shed(
+        self, channel: Channel, method: Method, properties: Properties, body: bytes
+    ):
+        """Drop a stale message without calling the callback, moving it to the shed queue if there is one
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            body (bytes): The raw message body
+        """
+        self.metrics.increment("shed")
+
+        if self.details.shed_queue:
+            channel._channel.basic_publish(
+                exchange="",
+                routing_key=self.details.shed_queue,
+                body=body,
+                properties=properties,
+            )
+        elif self.details.claim_check and claim_of(properties):
+            self.details.claim_check.store.delete(claim_of(properties))
+
+        self._settle(channel, method)
+
+    def _dispatch_claimed(
+        self,
+        channel: Channel,
+        method: Method,
+        properties: Properties,
+        body: bytes,
+        reference: str,
+    ) -> bool:
+        """Run the callback with a payload from the blob store, deleting the payload once it succeeds
+
+        The callback is handed a memoryview of the payload (read straight from the store's memory map),
+        which can't be used once it returns. Payloads are only decoded when the policy asks for it.
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            body (bytes): The raw message body, empty
+            reference (str): The payload's reference in the blob store
+
+        Returns:
+            bool: True if the callback succeeded
+        """
+        policy = self.details.claim_check
+
+        try:
+            blob = policy.store.open(reference)
+        except KeyError:
+            log.error(
+                f"[{os.getpid()}] [red]Payload {reference} isn't in the blob store, dropping the message."
+            )
+            self.metrics.increment("claims_missing")
+            self._settle(channel, method)
+            return False
+
+        try:
+            payload = self._decode(bytes(blob.view)) if policy.decode else blob.view
 
-        # Run the configured Job in a new Process, pass the arguments down
+            # Failed messages are retried (or requeued) with the same reference, so the payload stays
+            succeeded = self._dispatch(channel, method, properties, payload, raw=body)
+        finally:
+            blob.close()
+
+        if succeeded and policy.delete_after_ack:
+            policy.store.delete(reference)
+
+        return succeeded
+
+    def _settle(self, channel: Channel, method: Method):
+        """Acknowledge a message that was handled without calling the callback
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+        """
+        if not self.details.auto_ack:
+            channel.acknowledge(method.delivery_tag)
+
+    def _decode(self, body: bytes) -> Any:
+        """Decode a message body with the configured decoder, if there is one
+
+        Args:
+            body (bytes): The raw message body
+
+        Returns:
+            Any: The decoded body
+        """
         if self.details.decoder:
-            body = self.details.decoder.decode(body)
+            return self.details.decoder.decode(body)
+
+        return body
+
+    def _dispatch(
+        self,
+        channel: Channel,
+        method: Method,
+        properties: Properties,
+        body: Any,
+        raw: Optional[bytes] = None,
+        cache_key: Optional[bytes] = None,
+        dedup_key: Optional[bytes] = None,
+    ) -> bool:
+        """Pick the callback (by route, on routed listeners), match the message to its parameters and run it
+
+        Args:
+            channel (Channel): The channel to hand to the callback
+            method (Method): The delivery method
+            properties (Properties): The message properties
+            body (Any): The decoded message body
+            raw (Optional[bytes]): The raw message body, republished if the callback fails. Defaults to None
+            cache_key (Optional[bytes]): Cache the output under this key. Defaults to None (don't cache)
+            dedup_key (Optional[bytes]): Remember the message as processed under this key. Defaults to None
+
+        Returns:
+            bool: True if the callback succeeded
+        """
+        callback = self.details.callback
+        route = None
+
+        # Routed listeners hand each message to the function of the route it matches
+        if self.details.router is not None:
+            route = self.details.router.match(
+                routing_key_of(method, properties), getattr(properties, "headers", None)
+            )
+
+            if route is not None:
+                callback = self.details.router.routes[route].callback
+
+        if callback is None:
+            return self._unrouted(channel, method)
 
         # Get the signature of the function
-        sig = signature(self.details.callback)
+        sig = signature(callback)
 
         all_arguments = {
-            # TODO: Wrap this channel in a custom channel, that provides utility functionality over acks, nacks, publishing, etc
-            Channel: Channel(channel),
+            Channel: channel,
             Method: method,
             Properties: properties,
         }
@@ -82,66 +486,455 @@ class Listener:
             for arg in sig.parameters.keys()
         }
 
+        started = time.perf_counter_ns()
+
         # Run the callback function safely, so if it errors, the listener won't stop
-        self._run_safely(self.details, Channel(channel), **arguments)
+        succeeded = self._run_safely(
+            self.details,
+            channel,
+            properties,
+            _method=method,
+            _raw=raw,
+            _cache_key=cache_key,
+            _dedup_key=dedup_key,
+            _callback=callback,
+            **arguments,
+        )
 
-    def _run_safely(
-        self, _details: ListenerDetails, _channel: Channel, *args, **kwargs
+        if self.route_metrics is not None:
+            self.route_metrics.record(
+                len(self.details.router.routes) if route is None else route,
+                succeeded,
+                time.perf_counter_ns() - started,
+            )
+
+        return succeeded
+
+    def _unrouted(self, channel: Channel, method: Method) -> bool:
+        """Reject a message no route matched, when the listener has no function of its own to take it
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+
+        Returns:
+            bool: Always False, the message wasn't handled
+        """
+        log.warning(
+            f"[{os.getpid()}] No route on '{self.details.queue_name}' matches routing key '{method.routing_key}', rejecting it"
+        )
+        self.metrics.increment("unrouted")
+
+        # Dead lettered, if the queue has a dead letter exchange
+        if not self.details.auto_ack:
+            channel.reject(requeue=False, delivery_tag=method.delivery_tag)
+
+        return False
+
+    def _dispatch_packed(
+        self,
+        channel: BlockingChannel,
+        method: Method,
+        properties: Properties,
+        body: bytes,
     ):
+        """Unpack an envelope and run the callback once per inner message, or once with the whole batch.
+
+        The envelope is a single delivery, so it is acknowledged (or rejected) once after every inner
+        message has been handled, see `PackedChannel`.
+
+        Args:
+            channel (BlockingChannel): The channel the envelope arrived on
+            method (Method): The delivery method of the envelope
+            properties (Properties): The properties of the envelope
+            body (bytes): The envelope body
+        """
+        bodies = unpack(body)
+
+        if self.details.packed_batch:
+            packed_channel = PackedChannel(
+                channel, method.delivery_tag, 1, self._coalescer
+            )
+            self._dispatch(
+                packed_channel,
+                method,
+                properties,
+                [self._decode(inner) for inner in bodies],
+                raw=body,
+            )
+        else:
+            packed_channel = PackedChannel(
+                channel, method.delivery_tag, len(bodies), self._coalescer
+            )
+            for inner in bodies:
+                self._dispatch(
+                    packed_channel,
+                    method,
+                    properties,
+                    self._decode(inner),
+                    raw=inner,
+                )
+
+        if not self.details.auto_ack:
+            packed_channel.settle()
+
+    def _run_safely(
+        self,
+        _details: ListenerDetails,
+        _channel: Channel,
+        _properties: Properties,
+        *args,
+        _method: Optional[Method] = None,
+        _raw: Optional[bytes] = None,
+        _cache_key: Optional[bytes] = None,
+        _dedup_key: Optional[bytes] = None,
+        _callback: Optional[Callable] = None,
+        **kwargs,
+    ) -> bool:
         """
         This function runs a callback function safely, whilst still printing any tracebacks.
+
+        If the message is an RPC request (it has a `reply_to`), the output is sent back to the caller
+        instead of the return queue, and any exception is reported back to the caller too. Otherwise a
+        failed message is retried later (or dead lettered) when the listener has a retry policy.
+
+        Returns True if the callback succeeded.
         """
+        is_rpc = _properties is not None and _properties.reply_to is not None
+        callback = _callback or _details.callback
+
         try:
             # Call the function, and keep it's output incase it requires repushing to the channel
-            output = _details.callback(*args, **kwargs)
-
-            # If there was data returned, we want to send this data back to the message broker
-            if output is not None:
-                # Use specified encoder and send back to same queue
-                _channel.publish(
-                    body=output,
-                    queue=self.details.return_queue or self.details.queue_name,
-                    encoder=self.details.encoder,
-                )
-        except Exception:
+            if self._watchdog is not None:
+                # The slot belongs to one of this listener's own workers, which in-process calls aren't running in
+                slot = None if self._running_local else self._slot
+
+                with self._watchdog.deadline(slot):
+                    output = callback(*args, **kwargs)
+            else:
+                output = callback(*args, **kwargs)
+            handed_off = self._hand_off(_channel, _properties, output)
+
+            # Outputs handed to the next listener in-process skip encoding, unless they're being cached
+            if not handed_off or _cache_key is not None:
+                encoded = self._encode_output(output)
+
+                if _cache_key is not None and self._cache.set(_cache_key, encoded):
+                    self.metrics.increment("cache_evictions")
+
+                if not handed_off:
+                    self._send_output(_channel, _properties, encoded)
+
+            # Only a message that was processed successfully counts, so a failure can be retried
+            if _dedup_key is not None:
+                self._dedup.add(_dedup_key)
+
+            return True
+        except Exception as exc:
             traceback.print_exc()
 
-    def _start_worker(self, index: int, registry: DictProxy):
+            timed_out = isinstance(exc, HandlerTimeout)
+
+            if timed_out:
+                self.metrics.increment("timeouts")
+
+            if is_rpc:
+                _channel.reply(None, _properties, error=repr(exc))
+
+                # The caller has its answer, so the request is done with rather than left holding a prefetch slot
+                if _method is not None and not self.details.auto_ack:
+                    _channel.acknowledge(_method.delivery_tag)
+            elif self._retrier is not None and _raw is not None:
+                self._retry(_channel, _method, _properties, _raw, exc)
+            elif timed_out and _method is not None and not self.details.auto_ack:
+                self._requeue_timed_out(_channel, _method, _properties, _raw)
+
+            return False
+
+    def _retry(
+        self,
+        channel: Channel,
+        method: Method,
+        properties: Properties,
+        raw: bytes,
+        error: Exception,
+    ):
+        """Hand a failed message to the retrier, and acknowledge the delivery it came from
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            raw (bytes): The raw body of the message that failed
+            error (Exception): What the callback raised
+        """
+        queue = self._consumer_queues.get(method.consumer_tag, self.details.queue_name)
+
+        try:
+            retried = self._retrier.retry(
+                queue,
+                properties,
+                raw,
+                error,
+                packed=self.details.packed_batch and is_packed(properties),
+                routing_key=method.routing_key,
+            )
+        except AMQPError as exc:
+            log.error(
+                f"[{os.getpid()}] [red]Couldn't schedule a retry ({exc!r}), requeuing the message."
+            )
+
+            if not self.details.auto_ack:
+                channel.reject(requeue=True, delivery_tag=method.delivery_tag)
+            return
+
+        self.metrics.increment("retries" if retried else "dead_lettered")
+
+        # The message now lives on in the retry (or dead letter) queue, so this delivery is done with
+        self._settle(channel, method)
+
+    def _requeue_timed_out(
+        self,
+        channel: Channel,
+        method: Method,
+        properties: Properties,
+        raw: Optional[bytes],
+    ):
+        """Give a message that timed out one more go, rather than holding it (and a prefetch slot) forever
+
+        The broker's redelivered flag is also set by a worker dying or a connection dropping, so the
+        message is republished to the back of its queue counting its timeouts in a header instead. A
+        message that times out again is rejected, and dead lettered if the queue has a dead letter exchange.
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            method (Method): The delivery method of the message
+            properties (Properties): The properties of the message
+            raw (Optional[bytes]): The raw body of the message, None if it didn't come from the broker
+        """
+        headers = dict(getattr(properties, "headers", None) or {})
+        timeouts = int(headers.get(TIMEOUT_HEADER, 0))
+
+        if timeouts > 0 or raw is None:
+            channel.reject(requeue=False, delivery_tag=method.delivery_tag)
+            return
+
+        # A single message out of an envelope is requeued on its own
+        if not (self.details.packed_batch and is_packed(properties)):
+            headers.pop(PACKED_HEADER, None)
+
+        headers[TIMEOUT_HEADER] = timeouts + 1
+        headers.setdefault(ROUTING_KEY_HEADER, method.routing_key)
+
+        properties = copy.copy(properties) if properties else Properties()
+        properties.headers = headers
+
+        queue = self._consumer_queues.get(method.consumer_tag, self.details.queue_name)
+        channel._channel.basic_publish(
+            exchange="", routing_key=queue, body=raw, properties=properties
+        )
+
+        self._settle(channel, method)
+
+    def _encode_output(self, output: Any) -> Optional[bytes]:
+        """Encode the callback's output with the configured encoder
+
+        Args:
+            output (Any): The callback's output
+
+        Returns:
+            Optional[bytes]: The encoded output, None if the callback returned nothing
+        """
+        if output is None:
+            return None
+
+        if self.details.encoder:
+            output = self.details.encoder.encode(output)
+
+        if isinstance(output, bytes):
+            return output
+
+        return str(output).encode("utf-8")
+
+    def _send_output(
+        self, channel: Channel, properties: Properties, encoded: Optional[bytes]
+    ):
+        """Send an encoded output back to the RPC caller, or on to the return queue
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            properties (Properties): The properties of the message
+            encoded (Optional[bytes]): The encoded output, None if the callback returned nothing
+        """
+        if properties is not None and properties.reply_to is not None:
+            channel.reply(encoded, properties, encoder=None)
+
+        # If there was data returned, we want to send this data back to the message broker
+        elif encoded is not None:
+            channel.publish(
+                body=encoded,
+                queue=self.details.return_queue or self.details.queue_name,
+                # Stamped so the listener receiving it can measure the broker hop local routing saves
+                properties=Properties(headers={SENT_HEADER: time.time_ns()})
+                if self.local_route
+                else None,
+                encoder=None,
+            )
+
+    def _coalesce_policy(self) -> AckPolicy:
+        """Get the acknowledgement policy for a worker's coalescer.
+
+        The broker stops delivering once prefetch_count messages are unacknowledged, so acknowledgements
+        must never be held back until more than that are waiting.
+
+        Returns:
+            AckPolicy: The policy to coalesce with
+        """
+        policy = self.details.ack_policy
+
+        if self.details.qos_prefetch_count:
+            return replace(
+                policy,
+                max_pending=min(policy.max_pending, self.details.qos_prefetch_count),
+            )
+
+        return policy
+
+    def _worker_queues(self, index: int) -> List[str]:
+        """Get the physical queues a worker should consume from.
+
+        Shards are dealt out to workers round-robin, so every shard is consumed even when there are
+        fewer workers than shards, and workers share shards when there are more workers than shards.
+
+        Args:
+            index (int): The index of the worker
+
+        Returns:
+            List[str]: The queue names to consume from
+        """
+        if not self.details.shards:
+            return [self.details.queue_name]
+
+        if self._worker_count >= self.details.shards:
+            return [shard_name(self.details.queue_name, index % self.details.shards)]
+
+        return [
+            shard_name(self.details.queue_name, shard)
+            for shard in range(index, self.details.shards, self._worker_count)
+        ]
+
+    def _pin_worker(self, index: int):
+        """Pin this worker process to the core the consumer placed it on
+
+        Args:
+            index (int): The index of the worker
+        """
+        core = self.cores[index % len(self.cores)]
+
+        # Reconnecting workers are already pinned
+        if available_cores() == [core]:
+            return
+
+        pin(core)
+        log.info(f"[{os.getpid()}] Pinned to core {core}")
+
+    def _get_max_workers(self) -> int:
+        """Get the amount of workers to start when none were asked for, one per usable core
+
+        Returns:
+            int: The amount of workers
+        """
+        return usable_cores(self.allowed_cores)
+
+    def planned_workers(self) -> int:
+        """Get the amount of workers start() will run
+
+        Returns:
+            int: The amount of workers
+        """
+        return self.details.workers or self._get_max_workers()
+
+    def _start_worker(self, index: int, registry: "DictProxy"):
         # TODO: Change this function, it's ugly, (change to worker.py Worker class, encapsulate all Worker requirements in there)
+        if self.cores:
+            self._pin_worker(index)
+
+        # Ctrl+C reaches the whole process group. The consumer drains its workers with SIGTERM, so they
+        # mustn't be interrupted mid-message, nor run the consumer's own SIGTERM handler before setting theirs
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        self._registry = registry
+
         try:
+            queues = self._worker_queues(index)
+
             # Create a BlockingConnection into the queue
-            connection = pika.BlockingConnection(self.connection_parameters)
+            connection = self._connect(index, queues)
 
             # Open a channel to receive messages through
             channel = connection.channel()
 
-            channel.queue_declare(
-                queue=self.details.queue_name,
-                passive=self.details.queue_passive,
-                durable=self.details.queue_passive,
-                exclusive=self.details.queue_exclusive,
-                auto_delete=self.details.queue_auto_delete,
-            )
+            for queue in queues:
+                channel.queue_declare(
+                    queue=queue,
+                    passive=self.details.queue_passive,
+                    durable=self.details.queue_passive,
+                    exclusive=self.details.queue_exclusive,
+                    auto_delete=self.details.queue_auto_delete,
+                )
+
+            # The prefetch count may have been changed through the admin socket since the listener started
+            if self._control is not None:
+                self._prefetch = self._control.prefetch_count
 
             channel.basic_qos(
-                prefetch_count=self.details.qos_prefetch_count,
+                prefetch_count=self._prefetch,
                 prefetch_size=self.details.qos_prefetch_size,
                 global_qos=self.details.global_qos,
             )
 
-            channel.basic_consume(
-                queue=self.details.queue_name,
-                on_message_callback=self._callback,
-                auto_ack=self.details.auto_ack,
-            )
+            if self.details.shed_queue:
+                channel.queue_declare(
+                    self.details.shed_queue, durable=self.details.queue_durable
+                )
+
+            if self.details.retry:
+                # Retries are confirmed on a channel of their own, rather than slowing every publish down
+                self._retrier = Retrier(
+                    connection.channel(),
+                    self.details.queue_name,
+                    self.details.retry,
+                    durable=self.details.queue_durable,
+                )
+
+                for queue in queues:
+                    self._retrier.declare(queue)
+
+            self._started_any = False
+            self._consume(channel, queues)
+
+            # Manual acknowledgements can be batched up to cut down on the frames sent to the broker
+            if self.details.ack_policy and not self.details.auto_ack:
+                self._coalescer = AckCoalescer(
+                    channel, connection, self._coalesce_policy()
+                )
 
             # Allow for manipulation of channel before we start consuming incase we missed anything to do with configuration
             if self.details.configuration_callback:
                 self.details.configuration_callback(channel)
 
-            # Create a signal handler to close the connection when we receive a SIGINT
+            # SIGTERM drains the worker: it stops consuming, finishes its current message and exits. A second
+            # SIGTERM (sent by `stop` once the drain timeout passes) closes the connection there & then
             def handle_sigterm(sig, frame):
-                log.debug("Gracefully closing connection...")
+                if not self._terminating:
+                    log.debug("Draining before closing connection...")
+                    self._terminating = self._draining = True
+                    return
+
+                log.debug("Closing connection...")
+                if self._coalescer:
+                    self._coalescer.flush()
                 channel.close()
                 connection.close()
                 sys.exit(0)
@@ -149,6 +942,12 @@ class Listener:
             # Register the signal handler for SIGTERM
             signal.signal(signal.SIGTERM, handle_sigterm)
 
+            # SIGUSR1 asks the worker to drain too, used when recycling & scaling down
+            signal.signal(
+                signal.SIGUSR1, lambda sig, frame: setattr(self, "_draining", True)
+            )
+            self._schedule_check(connection, channel)
+
             # Only log that we've 're'connected if the worker was previously down.
             if registry[os.getpid()] == Status.DISCONNECTED:
                 log.info(f"[{os.getpid()}] [green]Reconnected to broker.")
@@ -157,17 +956,31 @@ class Listener:
             self._change_status(registry, Status.CONNECTED)
 
             log.info(
-                f"[{os.getpid()}] [green]Listening to [bold cyan]{self.details.queue_name}[/bold cyan]"
+                f"[{os.getpid()}] [green]Listening to [bold cyan]{', '.join(queues)}[/bold cyan]"
             )
 
+            # Workers started while the listener is paused stop consuming straight away
+            self._apply_control(channel)
+
             # TODO: Use this instead for more control of what variables to pass?
             # for method, properties, body in channel.consume(self.details.queue_name):
             #     self._callback(channel, method, properties, body)
 
             channel.start_consuming()
 
+            # Consumers are cancelled while rate limited, which ends start_consuming early
+            while self._paused_for is not None and not self._draining:
+                self._wait_out_pause(connection, channel, queues)
+                channel.start_consuming()
+
+            if self._draining:
+                self._drain(connection, channel)
+
         except AMQPError:
             if self.details.restart:
+                # Fail over to another node straight away, only waiting once none of them could be reached
+                failing_over = self._fail_over()
+
                 if registry[os.getpid()] != Status.DISCONNECTED:
                     log.error(
                         f"[{os.getpid()}] [red]Connection to broker failed. Worker will reconnect when possible."
@@ -176,38 +989,286 @@ class Listener:
                     # Set the status of this process to failed.
                     self._change_status(registry, Status.DISCONNECTED)
 
-                time.sleep(2)
+                if not failing_over:
+                    time.sleep(2)
+
                 self._start_worker(index, registry)
 
+    def _connect(self, index: int, queues: List[str]) -> pika.BlockingConnection:
+        """Connect to the broker, to the node the consumer spread this worker onto when there are several
+
+        Args:
+            index (int): The index of the worker
+            queues (List[str]): The queues the worker consumes
+
+        Returns:
+            pika.BlockingConnection: The connection
+        """
+        # Consumers don't survive their connection, so forget any from a connection that was lost
+        self._consumer_queues.clear()
+
+        if self.cluster is None:
+            return pika.BlockingConnection(self.connection_parameters)
+
+        connection, self._node = self.cluster.connect(
+            self.node_offset + index, queue=queues[0], avoid=self._failed_node
+        )
+        self._failed_node = None
+
+        log.info(
+            f"[{os.getpid()}] Connected to node {self._node.host}:{self._node.port}"
+        )
+
+        return connection
+
+    def _fail_over(self) -> bool:
+        """After losing the connection, have the next attempt try the other nodes before this one
+
+        Returns:
+            bool: True if there are other nodes to try
+        """
+        if self.cluster is None or len(self.cluster.nodes) < 2 or self._node is None:
+            return False
+
+        log.warning(
+            f"[{os.getpid()}] [red]Lost node {self._node.host}:{self._node.port}, failing over."
+        )
+        self._failed_node, self._node = self._node, None
+
+        return True
+
+    def begin_stop(self):
+        """
+        This function tells all workers to finish their current message and exit, without waiting for them.
+
+        `stop` then waits out the drain timeout, counted from here, so many listeners can drain at once.
+        """
+        processes = [*self.workers, *self._replacements.values(), *self._retiring]
+
+        for worker in processes:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+        self._stopping = (processes, time.monotonic() + self.details.drain_timeout)
+
     def stop(self):
         """
-        This function stops all workers by killing them.
+        This function stops all workers, letting each finish its current message first.
+
+        Workers still running after the drain timeout are closed outright, and killed if that doesn't work
+        either. The broker requeues whatever they held.
         """
-        for worker in self.workers:
-            # Kill the thread
+        if self._stopping is None:
+            self.begin_stop()
+
+        processes, deadline = self._stopping
+        self._stopping = None
+
+        for worker in processes:
+            worker.join(max(deadline - time.monotonic(), 0))
+
+        for worker in processes:
+            if not worker.is_alive():
+                continue
+
+            log.warning(
+                f"[{worker.pid}] [red]Worker for '{self.details.queue_name}' didn't drain in time, closing it."
+            )
             os.kill(worker.pid, signal.SIGTERM)
+            worker.join(KILL_GRACE)
+
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGKILL)
+                worker.join()
+
+        # Forget the stopped workers, so supervision doesn't bring them back
+        self.workers.clear()
+        if self._control is not None:
+            self._control.workers = 0
+        self._replacements.clear()
+        self._retiring.clear()
+
+    def restart(self, registry: "DictProxy"):
+        """
+        This function replaces all workers with new ones, picking up any changes to the listener's details.
+
+        Args:
+          registry (DictProxy): The shared registry
+        """
+        stopped = [
+            worker.pid
+            for worker in [*self.workers, *self._replacements.values(), *self._retiring]
+        ]
+
+        self.stop()
 
-            # Wait for the process to finish
-            worker.join()
+        for pid in stopped:
+            registry.pop(pid, None)
 
-    def start(self, registry: DictProxy):
+        self.start(registry)
+
+    def prepare(self):
+        """
+        This function creates the listener's shared state, which must exist before any worker that could use
+        it is started. Workers of other listeners hand outputs to this listener through it too.
+        """
+        if self.metrics is None:
+            self.metrics = ListenerMetrics()
+
+        if self._bucket is None and self.details.rate_limit:
+            self._bucket = TokenBucket(self.details.rate_limit)
+
+        if self._watchdog is None and self.details.timeout:
+            self._watchdog = Watchdog(self.details.timeout)
+
+        if self._control is None:
+            self._control = ListenerControl(self.details.qos_prefetch_count)
+
+        if self._recorder is None and self.details.record:
+            self._recorder = Recorder(self.details.record, self.details.queue_name)
+
+        # Hot reloading can add & remove routes, which the counters must follow
+        router = self.details.router
+
+        if router is not None and (
+            self.route_metrics is None or self.route_metrics.names != router.names
+        ):
+            self.route_metrics = RouteMetrics(router.names)
+
+    def start(self, registry: "DictProxy"):
         """
         Execute each consumer in a new process in a PoolExecutor
 
         Args:
           workers (int): The amount of workers to start.
         """
+        # If an amount of workers has been passed in, use that, else, use the amount of usable cores.
+        workers = self.planned_workers()
+        self._worker_count = workers
+
+        self.prepare()
 
-        # If an amount of workers has been passed in, use that, else, use the maximum amount of CPUs.
-        workers = self.details.workers or self._get_max_workers()
+        # A fresh cache every start, as the function (and so its outputs) may have been reloaded
+        self._cache = create_cache(self.details.cache) if self.details.cache else None
+
+        if self._dedup is None and self.details.dedup:
+            self._dedup = create_index(self.details.dedup)
 
         self.workers.clear()
 
         for i in range(workers):
-            p = Process(target=self._start_worker, args=(i, registry))
-            p.start()
+            self.workers.append(self._spawn(i, registry))
+
+        self._control.workers = workers
+
+    def scale(self, workers: int, registry: "DictProxy"):
+        """
+        This function changes the amount of workers while they're running. Workers are added alongside the
+        current ones, and removed workers drain rather than dropping what they hold.
+
+        Sharded listeners deal shards out by the amount of workers, so every worker is restarted instead.
+
+        Args:
+          workers (int): The new amount of workers
+          registry (DictProxy): The shared registry
+        """
+        if workers < 1:
+            raise ValueError("A listener needs at least 1 worker")
+
+        self.details = replace(self.details, workers=workers)
+
+        if self.details.shards:
+            self.restart(registry)
+            return
+
+        self._worker_count = workers
+
+        while len(self.workers) > workers:
+            index = len(self.workers) - 1
+
+            replacement = self._replacements.pop(index, None)
+            if replacement is not None:
+                self._retire(replacement, registry)
+
+            self._retire(self.workers.pop(), registry)
+
+        for index in range(len(self.workers), workers):
+            self.workers.append(self._spawn(index, registry))
+
+        self._control.workers = workers
+
+    def set_prefetch(self, count: int):
+        """
+        This function changes the prefetch count of every worker's channel while they're running.
+
+        Args:
+          count (int): The new prefetch count, 0 for unlimited
+        """
+        if count < 0:
+            raise ValueError("The prefetch count can't be negative")
+
+        self.details = replace(self.details, qos_prefetch_count=count)
+        self._control.prefetch_count = count
 
-            # Add the process ID to the registry
-            registry[p.pid] = Status.STARTING
+    def pause(self):
+        """
+        This function stops every worker consuming, until resumed. Messages they were sent but hadn't
+        started on are handed back to the broker.
+        """
+        self._control.paused = True
+
+    def resume(self):
+        """
+        This function starts every paused worker consuming again.
+        """
+        self._control.paused = False
+
+    def drain(self, registry: "DictProxy"):
+        """
+        This function tells every worker to stop consuming, finish what it holds and exit, leaving the
+        listener without workers until it's scaled up again.
+
+        Args:
+          registry (DictProxy): The shared registry
+        """
+        for worker in [*self.workers, *self._replacements.values()]:
+            self._retire(worker, registry)
+
+        self.workers.clear()
+        self._replacements.clear()
+        self._control.workers = 0
+
+    def status(self, registry: "DictProxy") -> Dict[str, Any]:
+        """
+        This function describes the listener & the state of each of its workers.
 
-            self.workers.append(p)
+        Args:
+          registry (DictProxy): The shared registry
+
+        Returns:
+          Dict[str, Any]: The listener's queue, function, settings and workers
+        """
+
+        def describe(worker: "Process") -> Dict[str, Any]:
+            status = registry.get(worker.pid)
+
+            return {
+                "pid": worker.pid,
+                "status": status.name if status is not None else "UNKNOWN",
+            }
+
+        callback = self.details.callback
+
+        return {
+            "queue": self.details.queue_name,
+            "function": f"{callback.__module__}.{callback.__qualname__}"
+            if callback is not None
+            else "routes only",
+            "prefetch_count": self.details.qos_prefetch_count,
+            "paused": bool(self._control and self._control.paused),
+            "workers": [describe(worker) for worker in self.workers],
+            "replacements": [describe(p) for p in self._replacements.values()],
+            "retiring": [describe(worker) for worker in self._retiring],
+            "metrics": self.metrics.snapshot() if self.metrics else {},
+            "routes": self.route_metrics.snapshot() if self.route_metrics else {},
+        }
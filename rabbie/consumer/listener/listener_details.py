@@ -3,6 +3,15 @@ from dataclasses import dataclass
 
 from ...decoder import Decoder
 from ...encoder import Encoder
+from ...broker_types import AckPolicy
+from ...cache import CachePolicy
+from ...dedup import DedupPolicy
+from ...retry import RetryPolicy
+from ...ratelimit import RateLimit
+from ...recycling import RecyclePolicy
+from ...recording import RecordPolicy
+from ...claimcheck import ClaimCheckPolicy
+from ...routing import Router
 
 
 @dataclass
@@ -11,7 +20,8 @@ class ListenerDetails:
     This stores the static details of a listener.
     """
 
-    callback: Callable
+    # None when the listener only has routes, see `router`
+    callback: Optional[Callable]
     queue_name: str
     queue_passive: bool
     queue_durable: bool
@@ -29,3 +39,54 @@ class ListenerDetails:
     # Configuration settings for auto-publishing
     return_queue: Optional[str]
     encoder: Optional[Encoder]
+
+    # Split the queue across this many physical queues ('queue.0'..'queue.N-1'), 0 disables sharding
+    shards: int = 0
+
+    # Hand the callback every message of a packed envelope as one list, rather than one call per message
+    packed_batch: bool = False
+
+    # Coalesce manual acknowledgements into as few broker frames as possible
+    ack_policy: Optional[AckPolicy] = None
+
+    # Cache the function's output against the raw message body
+    cache: Optional[CachePolicy] = None
+
+    # Acknowledge messages that were already processed without calling the function again
+    dedup: Optional[DedupPolicy] = None
+
+    # Retry messages whose function raised after a delay, dead lettering them once out of attempts
+    retry: Optional[RetryPolicy] = None
+
+    # Drop messages older than this many seconds (or past their deadline) without decoding them
+    max_age: Optional[float] = None
+    # Move dropped messages here rather than discarding them
+    shed_queue: Optional[str] = None
+    # Drop messages past their deadline or expiration, implied by max_age & shed_queue
+    shed: bool = False
+
+    # Cap how often the function is called, across every worker
+    rate_limit: Optional[RateLimit] = None
+
+    # Replace workers with fresh processes after a number of messages, memory use or age
+    recycle: Optional[RecyclePolicy] = None
+
+    # Interrupt the function once a call runs for this many seconds
+    timeout: Optional[float] = None
+
+    # Seconds workers are given to finish their current message when stopped, before being closed outright
+    drain_timeout: float = 30
+
+    # Record every message consumed to a local log, to be replayed later
+    record: Optional[RecordPolicy] = None
+
+    # Read payloads kept in a blob store by producers, rather than sent through the broker
+    claim_check: Optional[ClaimCheckPolicy] = None
+
+    # Hand messages to the function of the route they match, the callback takes any that match none
+    router: Optional[Router] = None
+
+    @property
+    def sheds(self) -> bool:
+        """Whether stale messages are dropped, which only listeners asking for it do"""
+        return self.shed or self.max_age is not None or bool(self.shed_queue)
@@ -6,3 +6,7 @@ class Status(Enum):
     CONNECTED = 1
     STOPPED = 2
     DISCONNECTED = 3
+    # The worker is due to be recycled, and waiting for its replacement to connect
+    RECYCLING = 4
+    # The worker has stopped consuming, and is finishing what it holds before exiting
+    DRAINING = 5
@@ -0,0 +1,182 @@
+import time
+from typing import TYPE_CHECKING, Any
+
+from pika.adapters.blocking_connection import BlockingChannel
+
+from ...broker_types import Channel, Method, Properties
+
+if TYPE_CHECKING:
+    from .listener import Listener
+
+# Header stamped on outputs published to a queue this consumer also listens to, in nanoseconds since the epoch
+SENT_HEADER = "x-rabbie-sent-ns"
+
+# The longest chain of listeners handed an output in-process, before falling back to the broker
+MAX_LOCAL_HOPS = 8
+
+
+class LocalChannel(Channel):
+    """
+    LocalChannel is handed to handlers for outputs that were handed over in-process, rather than delivered
+    by the broker.
+
+    There is no delivery to settle, so acknowledgements are dropped. Rejecting with `requeue=True` marks
+    the output to be published to the broker instead, so it is redelivered as it would have been.
+    """
+
+    def __init__(self, blocking_channel: BlockingChannel, depth: int) -> None:
+        super().__init__(blocking_channel)
+
+        # How many in-process hops away from a broker delivery this is
+        self.depth = depth
+        self.requeued = False
+
+    def acknowledge(self, delivery_tag: int = 0, multiple: bool = False):
+        pass
+
+    def reject(
+        self, requeue: bool = True, delivery_tag: int = 0, multiple: bool = False
+    ):
+        self.requeued = self.requeued or requeue
+
+
+class LocalRoute:
+    """
+    LocalRoute links a listener to the listener consuming its return queue, within the same consumer.
+
+    Outputs are handed to the target's function in the worker that produced them, skipping the encode,
+    broker round trip & decode. A shared count of the hand-offs in progress caps how many of the
+    consumer's workers can be busy running the target at once, at the amount of workers the target has
+    right now (so following it as it's scaled), past which outputs go through the broker.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self, target: "Listener") -> None:
+        from multiprocess import Value
+
+        self.target = target
+
+        self._in_flight = Value("i", 0)
+
+    @property
+    def max_in_flight(self) -> int:
+        """The most hand-offs that can be in progress at once"""
+        return self.target._control.workers
+
+    def acquire(self) -> bool:
+        """Reserve a hand-off, if the target isn't saturated
+
+        Returns:
+            bool: True if the output can be handed over in-process
+        """
+        with self._in_flight.get_lock():
+            if self._in_flight.value >= self.max_in_flight:
+                return False
+
+            self._in_flight.value += 1
+            return True
+
+    def release(self):
+        """Release a hand-off reserved with acquire()"""
+        with self._in_flight.get_lock():
+            self._in_flight.value -= 1
+
+
+class LocalRouting:
+    """
+    LocalRouting holds how a listener hands its outputs to the listener consuming its return queue, and
+    takes outputs handed to it, see LocalRoute.
+
+    It's mixed into Listener, and works on the state the listener sets up.
+    """
+
+    def _record_broker_hop(self, properties: Properties):
+        """Count how long a message stamped by another of the consumer's listeners spent in the broker
+
+        Args:
+            properties (Properties): The message properties
+        """
+        sent = (getattr(properties, "headers", None) or {}).get(SENT_HEADER)
+
+        if sent is not None:
+            self.metrics.increment("broker_hops")
+            self.metrics.increment("broker_hop_ns", max(0, time.time_ns() - sent))
+
+    def run_local(self, channel: Channel, body: Any, depth: int, sent: int) -> bool:
+        """Run the callback with an output handed over in-process by another listener
+
+        Args:
+            channel (Channel): The channel of the worker handing the output over
+            body (Any): The output, exactly as the other listener's function returned it
+            depth (int): How many in-process hops this output has taken
+            sent (int): When the output was handed over, from `time.perf_counter_ns()`
+
+        Returns:
+            bool: False if the callback failed (or requeued), and the output should go through the broker
+        """
+        # A paused or drained listener isn't taking messages, so neither does it take outputs
+        if self._control.paused or not self._control.workers:
+            return False
+
+        # Outputs that would break the rate limit go through the broker, to be taken when there are tokens
+        if self._bucket is not None and self._bucket.acquire():
+            return False
+
+        local_channel = LocalChannel(channel._channel, depth)
+
+        self.metrics.increment("messages")
+        self.metrics.increment("local_hops")
+        self.metrics.increment("local_hop_ns", time.perf_counter_ns() - sent)
+
+        self._running_local += 1
+
+        try:
+            succeeded = self._dispatch(
+                local_channel,
+                Method(delivery_tag=0, routing_key=self.details.queue_name),
+                Properties(headers={}),
+                body,
+            )
+        finally:
+            self._running_local -= 1
+
+        return succeeded and not local_channel.requeued
+
+    def _hand_off(self, channel: Channel, properties: Properties, output: Any) -> bool:
+        """Hand an output straight to the listener consuming the return queue, if it's one of ours
+
+        Args:
+            channel (Channel): The channel the message arrived on
+            properties (Properties): The properties of the message
+            output (Any): The callback's output
+
+        Returns:
+            bool: True if the output was handled in-process, False if it should go through the broker
+        """
+        route = self.local_route
+
+        if route is None or output is None:
+            return False
+
+        if properties is not None and properties.reply_to is not None:
+            return False
+
+        depth = getattr(channel, "depth", 0)
+
+        # Long (or cyclic) chains, and a saturated target, go through the broker instead
+        if depth >= MAX_LOCAL_HOPS or not route.acquire():
+            self.metrics.increment("local_fallbacks")
+            return False
+
+        try:
+            handled = route.target.run_local(
+                channel, output, depth + 1, time.perf_counter_ns()
+            )
+        finally:
+            route.release()
+
+        if not handled:
+            self.metrics.increment("local_fallbacks")
+
+        return handled
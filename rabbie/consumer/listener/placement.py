@@ -0,0 +1,108 @@
+import math
+import os
+from typing import List, Optional, Tuple
+
+# Where the CPU quota of the process's cgroup can be read from, for cgroup v2 & v1 respectively
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def available_cores() -> List[int]:
+    """Get the cores this process is allowed to run on
+
+    Returns:
+        List[int]: The core ids, in order
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_quota() -> Optional[float]:
+    """Get the CPU quota of the process's cgroup, as set by container runtimes (e.g. `docker --cpus`)
+
+    Returns:
+        Optional[float]: The amount of cores worth of time the process can use, None if unlimited
+    """
+    try:
+        with open(CGROUP_V2_CPU_MAX) as file:
+            quota, period = file.read().split()
+
+        if quota == "max":
+            return None
+
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_QUOTA) as quota, open(CGROUP_V1_PERIOD) as period:
+            quota, period = int(quota.read()), int(period.read())
+
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def usable_cores(cores: Optional[List[int]] = None) -> int:
+    """Get how many cores' worth of work this process can actually get done at once
+
+    This is the amount of cores it's allowed to run on, capped by its cgroup's CPU quota.
+
+    Args:
+        cores (Optional[List[int]], optional): The cores it's allowed to run on. Defaults to reading them.
+
+    Returns:
+        int: The amount of cores, at least 1
+    """
+    cores = len(cores if cores is not None else available_cores())
+    quota = cpu_quota()
+
+    if quota is not None:
+        cores = min(cores, math.ceil(quota))
+
+    return max(1, cores)
+
+
+def plan_placement(
+    workers: List[int], cores: Optional[List[int]] = None
+) -> Tuple[Optional[int], List[List[int]]]:
+    """Give every worker its own core, keeping one core apart for the consumer's own process
+
+    The consumer's process runs the registry, file watching and the dispatch of work between workers, so
+    it gets the first core to itself when there are enough cores to go around. Workers are dealt the
+    remaining cores in turn, sharing cores only once there are more workers than cores.
+
+    Args:
+        workers (List[int]): The amount of workers of each listener
+        cores (Optional[List[int]], optional): The cores to place them on. Defaults to reading them.
+
+    Returns:
+        Tuple[Optional[int], List[List[int]]]: The consumer's core (None to leave it unpinned), and the
+        core of each listener's workers
+    """
+    cores = cores if cores is not None else available_cores()
+    total = sum(workers)
+
+    parent = None
+    if len(cores) > total and len(cores) > 1:
+        parent, cores = cores[0], cores[1:]
+
+    placement, index = [], 0
+    for amount in workers:
+        placement.append([cores[(index + i) % len(cores)] for i in range(amount)])
+        index += amount
+
+    return parent, placement
+
+
+def pin(core: int):
+    """Pin the current process to a single core
+
+    Args:
+        core (int): The core id
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
@@ -0,0 +1,175 @@
+import os
+import time
+import signal
+from typing import TYPE_CHECKING
+
+import pika
+from pika.adapters.blocking_connection import BlockingChannel
+
+from .listener_status import Status
+from ...logger import logger as log
+from ...recycling import current_rss
+
+if TYPE_CHECKING:
+    from multiprocess import Process
+    from multiprocess.managers import DictProxy
+
+
+class Supervision:
+    """
+    Supervision holds how a listener's workers are started, recycled, retired and replaced when they die or
+    get stuck, and how each worker asks to be recycled.
+
+    It's mixed into Listener, and works on the worker state the listener sets up.
+    """
+
+    def _check_worker(self, channel: BlockingChannel):
+        """Between messages, stop consuming if draining, or ask to be recycled if the recycle policy is due
+
+        Args:
+            channel (BlockingChannel): The worker's channel
+        """
+        if self._draining:
+            self._stop_consuming(channel)
+            return
+
+        self._apply_control(channel)
+
+        if self._recycle_requested or not self.details.recycle:
+            return
+
+        reason = self.details.recycle.reason(
+            self._handled, current_rss(), time.monotonic() - self._started_at
+        )
+
+        if reason:
+            # The consumer starts a replacement, and tells this worker to drain once it has connected
+            log.info(f"[{os.getpid()}] Recycling worker, {reason}")
+            self._recycle_requested = True
+            self._change_status(self._registry, Status.RECYCLING)
+
+    def _schedule_check(
+        self, connection: pika.BlockingConnection, channel: BlockingChannel
+    ):
+        """Check the worker every second, so idle workers still recycle & drain
+
+        Args:
+            connection (pika.BlockingConnection): The worker's connection
+            channel (BlockingChannel): The worker's channel
+        """
+
+        def check():
+            self._check_worker(channel)
+
+            if not self._draining:
+                self._schedule_check(connection, channel)
+
+        connection.call_later(1, check)
+
+    def _spawn(self, index: int, registry: "DictProxy") -> "Process":
+        """Start a worker process
+
+        Args:
+            index (int): The index of the worker
+            registry (DictProxy): The shared registry
+
+        Returns:
+            Process: The started worker
+        """
+        from multiprocess import Process
+
+        # Set before forking, so the worker inherits its slot
+        self._slot, self._next_slot = self._next_slot, self._next_slot + 1
+
+        p = Process(target=self._start_worker, args=(index, registry))
+        p.start()
+
+        # Add the process ID to the registry
+        registry[p.pid] = Status.STARTING
+        self._slots[p.pid] = self._slot
+
+        return p
+
+    def _retire(self, worker: "Process", registry: "DictProxy"):
+        """Tell a worker to stop consuming, finish what it holds and exit. Supervision reaps it once gone.
+
+        Args:
+            worker (Process): The worker to retire
+            registry (DictProxy): The shared registry
+        """
+        # Only connected workers are consuming (and have the SIGUSR1 handler set up), stop any others outright
+        if registry.get(worker.pid) in (Status.CONNECTED, Status.RECYCLING):
+            os.kill(worker.pid, signal.SIGUSR1)
+        elif worker.is_alive():
+            os.kill(worker.pid, signal.SIGTERM)
+
+        self._retiring.append(worker)
+
+    def _kill_if_stuck(self, worker: "Process") -> bool:
+        slot = self._slots.get(worker.pid)
+
+        if self._watchdog is None or slot is None or not self._watchdog.overdue(slot):
+            return False
+
+        log.warning(
+            f"[{worker.pid}] [red]Worker for '{self.details.queue_name}' is stuck past its timeout, killing it."
+        )
+        self.metrics.increment("timeout_kills")
+        self._watchdog.clear(slot)
+
+        os.kill(worker.pid, signal.SIGKILL)
+        worker.join()
+
+        return True
+
+    def supervise(self, registry: "DictProxy"):
+        """
+        This function replaces workers that died, and recycles workers that asked to be. Call it regularly.
+
+        A recycled worker keeps consuming until its replacement has connected, and is then told to drain
+        (SIGUSR1), so the listener never has fewer workers consuming than it should.
+
+        Args:
+          registry (DictProxy): The shared registry
+        """
+        for index, worker in enumerate(self.workers):
+            replacement = self._replacements.get(index)
+
+            if replacement is not None:
+                if registry.get(replacement.pid) == Status.CONNECTED:
+                    os.kill(worker.pid, signal.SIGUSR1)
+
+                    self._retiring.append(worker)
+                    self.workers[index] = replacement
+                    del self._replacements[index]
+                elif not replacement.is_alive():
+                    # Try again on the next check, the old worker keeps consuming meanwhile
+                    registry.pop(replacement.pid, None)
+                    del self._replacements[index]
+
+                continue
+
+            # A worker stuck past its timeout couldn't be interrupted, so kill it. The broker requeues what it held
+            killed = self._kill_if_stuck(worker)
+
+            if not worker.is_alive():
+                registry.pop(worker.pid, None)
+                self._slots.pop(worker.pid, None)
+
+                if self.details.restart or killed:
+                    log.warning(
+                        f"[{worker.pid}] [red]Worker for '{self.details.queue_name}' exited unexpectedly ({worker.exitcode}), restarting."
+                    )
+                    self.workers[index] = self._spawn(index, registry)
+
+                continue
+
+            if registry.get(worker.pid) == Status.RECYCLING:
+                self._replacements[index] = self._spawn(index, registry)
+
+        for worker in list(self._retiring):
+            if not worker.is_alive():
+                worker.join()
+                registry.pop(worker.pid, None)
+                self._slots.pop(worker.pid, None)
+                self._retiring.remove(worker)
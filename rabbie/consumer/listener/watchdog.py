@@ -0,0 +1,93 @@
+import signal
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# The most worker processes a listener can track at once, slots are reused as workers come and go
+WATCHDOG_SLOTS = 1024
+
+# Seconds past the timeout before a worker that couldn't be interrupted is killed
+KILL_GRACE = 5
+
+# Header counting how many times a message timed out, as listeners without a retry policy give it one more go
+TIMEOUT_HEADER = "x-rabbie-timeouts"
+
+
+class HandlerTimeout(Exception):
+    """
+    Raised inside a listener's function when it runs for longer than the listener's timeout.
+    """
+
+
+class Watchdog:
+    """
+    Watchdog enforces a listener's timeout on each call of its function.
+
+    Inside the worker an interval timer raises HandlerTimeout in the function once the timeout passes,
+    which interrupts Python code & blocking socket calls alike. Each worker also records when its current
+    call started in a slot of shared memory, so the consumer's process can spot a worker stuck where it
+    can't be interrupted (inside C code, or a function swallowing the exception) and kill it.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        from multiprocess import RawArray
+
+        self.timeout = timeout
+
+        # When each worker's current call started (time.monotonic(), which is system wide), 0 while idle
+        self._started = RawArray("d", WATCHDOG_SLOTS)
+
+    @contextmanager
+    def deadline(self, slot: Optional[int]):
+        """Run the body under the timeout
+
+        If an interval timer is already running (the function set its own), the body runs without one.
+
+        Args:
+            slot (Optional[int]): The worker's slot, None if it doesn't have one
+        """
+        if signal.getitimer(signal.ITIMER_REAL)[0] > 0:
+            yield
+            return
+
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+
+        if slot is not None:
+            self._started[slot % WATCHDOG_SLOTS] = time.monotonic()
+
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+            if slot is not None:
+                self._started[slot % WATCHDOG_SLOTS] = 0
+
+    def overdue(self, slot: int) -> bool:
+        """Check whether a worker has been stuck in a call for longer than the timeout & grace period
+
+        Args:
+            slot (int): The worker's slot
+
+        Returns:
+            bool: True if the worker should be killed
+        """
+        started = self._started[slot % WATCHDOG_SLOTS]
+
+        return bool(started) and time.monotonic() - started > self.timeout + KILL_GRACE
+
+    def clear(self, slot: int):
+        """Forget a worker's call, once the worker is gone
+
+        Args:
+            slot (int): The worker's slot
+        """
+        self._started[slot % WATCHDOG_SLOTS] = 0
+
+
+def _raise_timeout(sig, frame):
+    raise HandlerTimeout("The listener's function ran for longer than its timeout")
@@ -1,4 +1,4 @@
-from typing import Optional, List, Callable
+from typing import Any, Dict, Optional, List, Callable
 
 from functools import wraps
 
@@ -8,6 +8,15 @@ from .listener import Listener, ListenerDetails
 from ..connection import Details
 from ..decoder import Decoder, AutoDecoder
 from ..encoder import Encoder, AutoEncoder
+from ..broker_types import AckPolicy
+from ..cache import CachePolicy
+from ..dedup import DedupPolicy
+from ..retry import RetryPolicy
+from ..ratelimit import RateLimit
+from ..recycling import RecyclePolicy
+from ..recording import RecordPolicy
+from ..claimcheck import ClaimCheckPolicy
+from ..routing import Route, Router
 
 
 class MicroConsumer:
@@ -40,6 +49,21 @@ class MicroConsumer:
         durable_queue: bool = False,
         exclusive_queue: bool = False,
         auto_delete_queue: bool = False,
+        shards: int = 0,
+        packed_batch: bool = False,
+        ack_policy: Optional[AckPolicy] = None,
+        cache: Optional[CachePolicy] = None,
+        dedup: Optional[DedupPolicy] = None,
+        retry: Optional[RetryPolicy] = None,
+        max_age: Optional[float] = None,
+        shed_queue: Optional[str] = None,
+        shed: bool = False,
+        rate_limit: Optional[RateLimit] = None,
+        recycle: Optional[RecyclePolicy] = None,
+        timeout: Optional[float] = None,
+        drain_timeout: float = 30,
+        record: Optional[RecordPolicy] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
         # Must accept a single argument 'channel', to allow for any further manipulation that is not supported here
         configuration_callback: Callable = None,
     ):
@@ -50,6 +74,8 @@ class MicroConsumer:
             workers (int, optional): The amount of workers to listen simultaneously. Defaults to 1.
             decoder (Optional[Decoder], optional): The decoder for this specific listener. Defaults to None.
             restart (bool, optional): Should we attempt to restart this listener if connection fails?. Defaults to True.
+
+        Every other argument is described in `Consumer.listen`.
         """
 
         def decorator(function):
@@ -70,8 +96,42 @@ class MicroConsumer:
                 configuration_callback=configuration_callback,
                 return_queue=return_queue,
                 encoder=encoder,
+                shards=shards,
+                packed_batch=packed_batch,
+                ack_policy=ack_policy,
+                cache=cache,
+                dedup=dedup,
+                retry=retry,
+                max_age=max_age,
+                shed_queue=shed_queue,
+                shed=shed,
+                rate_limit=rate_limit,
+                recycle=recycle,
+                timeout=timeout,
+                drain_timeout=drain_timeout,
+                record=record,
+                claim_check=claim_check,
             )
 
+            # A module being hot reloaded registers its listeners again, replace those rather than duplicating them.
+            # Details created for routes alone are taken over by the first function listening to their queue
+            replaced = [
+                details
+                for details in self._listener_details
+                if details.queue_name == queue
+                and (
+                    details.callback is None
+                    or function is not None
+                    and details.callback.__module__ == function.__module__
+                    and details.callback.__qualname__ == function.__qualname__
+                )
+            ]
+
+            # Routes are registered separately, so they carry over
+            for details in replaced:
+                ls.router = ls.router or details.router
+                self._listener_details.remove(details)
+
             # Add the listener details to ListenerDetails list
             self._listener_details.append(ls)
 
@@ -83,6 +143,38 @@ class MicroConsumer:
 
         return decorator
 
+    def route(
+        self,
+        queue: str = Details.QUEUE_NAME,
+        routing_key: Optional[str] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ):
+        """Handle the messages of a queue that match a routing key pattern and/or headers with this function,
+        see `Consumer.route`
+        """
+
+        def decorator(function):
+            details = next(
+                (ls for ls in self._listener_details if ls.queue_name == queue), None
+            )
+
+            if details is None:
+                self.listen(queue)(None)
+                details = self._listener_details[-1]
+
+            if details.router is None:
+                details.router = Router()
+
+            details.router.add(Route(function, routing_key, headers))
+
+            @wraps(function)
+            def route(*args, **kwargs):
+                return function(*args, **kwargs)
+
+            return route
+
+        return decorator
+
     def _build_listeners(
         self, connection_details: ConnectionParameters
     ) -> List[Listener]:
@@ -0,0 +1,2 @@
+from .dedup_policy import Backend, DedupPolicy  # noqa: F401
+from .dedup_index import dedup_key, create_index, DedupIndex  # noqa: F401
@@ -0,0 +1,319 @@
+import hashlib
+import math
+import os
+import struct
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from ..broker_types import Properties
+from .dedup_policy import Backend, DedupPolicy
+
+
+def dedup_key(
+    properties: Properties, body: bytes, by_body: bool, scope: Optional[bytes] = None
+) -> Optional[bytes]:
+    """Get the key a message is deduplicated on
+
+    Args:
+        properties (Properties): The message properties
+        body (bytes): The raw message body
+        by_body (bool): Key on the body, rather than the message_id
+        scope (Optional[bytes]): Where else the message is deduplicated within, e.g. the route it takes on
+            a routed listener. Defaults to None (the whole listener)
+
+    Returns:
+        Optional[bytes]: A 16 byte digest, None if the message has no message_id to key on
+    """
+    if by_body:
+        digest = hashlib.blake2b(body, digest_size=16, person=b"body")
+    else:
+        message_id = getattr(properties, "message_id", None)
+
+        if not message_id:
+            return None
+
+        digest = hashlib.blake2b(
+            str(message_id).encode("utf-8"), digest_size=16, person=b"message_id"
+        )
+
+    if scope is not None:
+        digest.update(b"\0" + scope)
+
+    return digest.digest()
+
+
+class DedupIndex:
+    """
+    DedupIndex remembers the keys of processed messages for a time window, in a fixed amount of memory.
+
+    Keys go into a Bloom filter split into two generations, each covering half the window. When the
+    current generation is half a window old the older one is cleared and takes its place, so a key is
+    remembered for between half and all of the window. The most recent keys are also kept exactly, in
+    sets of `WAYS` slots, so a filter match can be confirmed without any chance of a false positive.
+
+    The index lives in one flat buffer, so the same layout works in process memory, shared memory or a
+    memory mapped file.
+    """
+
+    WAYS = 4
+
+    _MAGIC = b"RBDX"
+    _VERSION = 1
+
+    # magic, version, filter bits, hashes, exact sets, current generation, generation started at
+    _HEADER = struct.Struct("<4sIQIIId")
+    # digest, seen_at
+    _SLOT = struct.Struct("<16sd")
+
+    def __init__(self, policy: DedupPolicy, shared: bool = False) -> None:
+        self.policy = policy
+        self._layout()
+
+        if shared:
+            from multiprocess import Lock, RawArray
+
+            self._buffer = RawArray("B", self.size)
+            self._lock = Lock()
+        else:
+            self._buffer = bytearray(self.size)
+            self._lock = nullcontext()
+
+        self._initialise()
+
+    def seen(self, key: bytes) -> bool:
+        """Check whether a message has already been processed
+
+        Args:
+            key (bytes): The message's dedup key
+
+        Returns:
+            bool: True if the message is a duplicate
+        """
+        now = time.time()
+
+        with self._locked():
+            self._rotate(now)
+            indexes = list(self._indexes(key))
+
+            # Not in either generation of the filter means this is definitely a new message
+            if not any(
+                self._filter_contains(generation, indexes) for generation in (0, 1)
+            ):
+                return False
+
+            for offset in self._slots_for(key):
+                digest, seen_at = self._SLOT.unpack_from(self._buffer, offset)
+
+                if digest == key and now - seen_at < self.policy.window:
+                    return True
+
+            return self.policy.trust_filter
+
+    def add(self, key: bytes):
+        """Remember that a message has been processed
+
+        Args:
+            key (bytes): The message's dedup key
+        """
+        now = time.time()
+
+        with self._locked():
+            current = self._rotate(now)
+            start = self._filters + current * self._generation_size
+
+            for index in self._indexes(key):
+                self._buffer[start + (index >> 3)] |= 1 << (index & 7)
+
+            victim, victim_seen = None, math.inf
+
+            for offset in self._slots_for(key):
+                digest, seen_at = self._SLOT.unpack_from(self._buffer, offset)
+
+                # Reuse this key's slot, or any empty/expired one
+                if digest == key or now - seen_at >= self.policy.window:
+                    victim = offset
+                    break
+
+                if seen_at < victim_seen:
+                    victim, victim_seen = offset, seen_at
+
+            self._SLOT.pack_into(self._buffer, victim, key, now)
+
+    def _locked(self):
+        return self._lock
+
+    def _layout(self):
+        """Size the filter so a full window of keys stays under the false positive rate"""
+        capacity = max(1, self.policy.capacity)
+
+        self._bits = max(
+            8,
+            math.ceil(
+                -capacity
+                * math.log(self.policy.false_positive_rate)
+                / (math.log(2) ** 2)
+            ),
+        )
+        self._hashes = max(1, round(self._bits / capacity * math.log(2)))
+        self._sets = max(1, math.ceil(self.policy.recent / self.WAYS))
+
+        self._generation_size = math.ceil(self._bits / 8)
+        self._filters = self._HEADER.size
+        self._slots = self._filters + 2 * self._generation_size
+        self.size = self._slots + self._sets * self.WAYS * self._SLOT.size
+
+    def _initialise(self):
+        """Lay out an empty index, unless the buffer already holds one with the same shape"""
+        magic, version, bits, hashes, sets, _, _ = self._HEADER.unpack_from(
+            self._buffer, 0
+        )
+
+        if (magic, version, bits, hashes, sets) == (
+            self._MAGIC,
+            self._VERSION,
+            self._bits,
+            self._hashes,
+            self._sets,
+        ):
+            return
+
+        self._buffer[0 : self.size] = bytes(self.size)
+        self._write_header(0, time.time())
+
+    def _write_header(self, current: int, started: float):
+        self._HEADER.pack_into(
+            self._buffer,
+            0,
+            self._MAGIC,
+            self._VERSION,
+            self._bits,
+            self._hashes,
+            self._sets,
+            current,
+            started,
+        )
+
+    def _rotate(self, now: float) -> int:
+        """Retire the older filter generation once the current one covers half the window
+
+        Returns:
+            int: The current generation
+        """
+        current, started = self._HEADER.unpack_from(self._buffer, 0)[5:]
+        age = now - started
+
+        if age >= self.policy.window:
+            self._clear(0)
+            self._clear(1)
+            self._write_header(current, now)
+        elif age >= self.policy.window / 2:
+            current = 1 - current
+            self._clear(current)
+            self._write_header(current, now)
+
+        return current
+
+    def _clear(self, generation: int):
+        start = self._filters + generation * self._generation_size
+        self._buffer[start : start + self._generation_size] = bytes(
+            self._generation_size
+        )
+
+    def _filter_contains(self, generation: int, indexes) -> bool:
+        start = self._filters + generation * self._generation_size
+
+        return all(
+            self._buffer[start + (index >> 3)] & (1 << (index & 7)) for index in indexes
+        )
+
+    def _indexes(self, key: bytes) -> Iterator[int]:
+        # Double hashing, both halves of the digest give every bit index the filter needs
+        first = int.from_bytes(key[:8], "little")
+        second = int.from_bytes(key[8:], "little") | 1
+
+        for i in range(self._hashes):
+            yield (first + i * second) % self._bits
+
+    def _slots_for(self, key: bytes):
+        first = (int.from_bytes(key[8:], "little") % self._sets) * self.WAYS
+
+        return range(
+            self._slots + first * self._SLOT.size,
+            self._slots + (first + self.WAYS) * self._SLOT.size,
+            self._SLOT.size,
+        )
+
+
+class DiskDedupIndex(DedupIndex):
+    """
+    DiskDedupIndex keeps a DedupIndex in a memory mapped file, so it is shared by every worker and
+    survives restarts.
+
+    Each process maps the file for itself on first use, and holds an exclusive `flock` on it while
+    reading or writing, so separate consumers can share a file too.
+    """
+
+    def __init__(self, policy: DedupPolicy) -> None:
+        if not policy.path:
+            raise ValueError("Backend.DISK needs a path to keep its index in")
+
+        self.policy = policy
+        self._layout()
+
+        self._buffer = None
+        self._pid = None
+        self._fd = None
+
+        directory = os.path.dirname(os.path.abspath(policy.path))
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        import fcntl
+
+        self._open()
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _open(self):
+        import fcntl
+        import mmap
+
+        # A forked worker shares its parent's file description (and so its lock), so map the file again
+        if self._pid == os.getpid():
+            return
+
+        self._fd = os.open(self.policy.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != self.size:
+                os.ftruncate(self._fd, self.size)
+
+            self._buffer = mmap.mmap(self._fd, self.size)
+            self._pid = os.getpid()
+            self._initialise()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def create_index(policy: DedupPolicy) -> DedupIndex:
+    """Create the index a policy asks for
+
+    This must be called in the parent before the workers are started, so shared indexes are inherited.
+
+    Args:
+        policy (DedupPolicy): The dedup policy
+
+    Returns:
+        DedupIndex: The index
+    """
+    if policy.backend is Backend.DISK:
+        return DiskDedupIndex(policy)
+
+    return DedupIndex(policy, shared=policy.backend is Backend.SHARED)
@@ -0,0 +1,36 @@
+from enum import Enum
+from dataclasses import dataclass
+from typing import Optional
+
+
+class Backend(Enum):
+    # A private index per worker, lost when the worker exits
+    LOCAL = 0
+    # One index in shared memory for every worker of the listener
+    SHARED = 1
+    # One index in a memory mapped file, shared by every worker and kept across restarts
+    DISK = 2
+
+
+@dataclass
+class DedupPolicy:
+    """
+    This stores how a listener spots messages it has already processed.
+    """
+
+    # Where the index lives
+    backend: Backend = Backend.LOCAL
+    # Seconds a processed message is remembered for
+    window: float = 3600
+    # Roughly how many messages arrive within a window, which sizes the filter
+    capacity: int = 100_000
+    # The chance of a new message being mistaken for a processed one
+    false_positive_rate: float = 1e-6
+    # How many of the most recent messages are remembered exactly
+    recent: int = 4096
+    # Treat a filter match as a duplicate even when it isn't in the exact recent set
+    trust_filter: bool = True
+    # Key messages on a hash of their body, rather than their message_id
+    by_body: bool = False
+    # The file Backend.DISK keeps its index in
+    path: Optional[str] = None
@@ -1,5 +1,4 @@
 import logging
-from rich.logging import RichHandler
 
 
 class RabbieLogger(logging.Logger):
@@ -7,6 +6,18 @@ class RabbieLogger(logging.Logger):
         super().__init__(name)
         self.setLevel(logging.INFO)  # Set the minimum level for logging
 
+        self._handler_installed = False
+
+    def handle(self, record):
+        # Rich is slow to import, so only pull it in once something is actually logged
+        if not self._handler_installed:
+            self._install_handler()
+
+        super().handle(record)
+
+    def _install_handler(self):
+        from rich.logging import RichHandler
+
         # Create a handler and set its level
         handler = RichHandler(markup=True)
         handler.setLevel(logging.INFO)
@@ -17,6 +28,7 @@ class RabbieLogger(logging.Logger):
 
         # Add the handler to the logger
         self.addHandler(handler)
+        self._handler_installed = True
 
 
 logger = RabbieLogger(__name__)
@@ -0,0 +1,3 @@
+from .listener_metrics import ListenerMetrics, COUNTERS  # noqa: F401
+from .latency_histogram import LatencyHistogram  # noqa: F401
+from .route_metrics import RouteMetrics, ROUTE_COUNTERS  # noqa: F401
@@ -0,0 +1,94 @@
+import math
+from typing import List
+
+# Buckets per doubling of latency, each bucket is ~9% wider than the last
+_PER_DOUBLING = 8
+# Covers latencies up to 2^40ns (~18 minutes), anything longer lands in the last bucket
+_BUCKETS = 40 * _PER_DOUBLING
+
+# The slots after the buckets
+_COUNT = _BUCKETS
+_MAX = _BUCKETS + 1
+
+
+class LatencyHistogram:
+    """
+    LatencyHistogram counts latencies into logarithmic buckets in shared memory, so every worker process
+    records into the same histogram and the parent process can read percentiles from it.
+
+    Percentiles are the upper bound of the bucket they fall in, so they're never under-reported by more
+    than a bucket's width.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self) -> None:
+        from multiprocess import Array
+
+        self._values = Array("q", _BUCKETS + 2)
+
+    def record(self, nanoseconds: int):
+        """Count a latency
+
+        Args:
+            nanoseconds (int): The latency, in nanoseconds
+        """
+        nanoseconds = max(1, nanoseconds)
+        bucket = min(_BUCKETS - 1, int(math.log2(nanoseconds) * _PER_DOUBLING))
+
+        with self._values.get_lock():
+            self._values[bucket] += 1
+            self._values[_COUNT] += 1
+
+            if nanoseconds > self._values[_MAX]:
+                self._values[_MAX] = nanoseconds
+
+    def reset(self):
+        """Forget every latency recorded so far"""
+        with self._values.get_lock():
+            for index in range(len(self._values)):
+                self._values[index] = 0
+
+    @property
+    def count(self) -> int:
+        """The amount of latencies recorded"""
+        return self._values[_COUNT]
+
+    @property
+    def max(self) -> float:
+        """The longest latency recorded, in seconds"""
+        return self._values[_MAX] / 1e9
+
+    def percentiles(self, *percentiles: float) -> List[float]:
+        """Read percentiles of the latencies recorded so far
+
+        Args:
+            percentiles (float): Each percentile to read, between 0 and 1
+
+        Returns:
+            List[float]: The latency at each percentile, in seconds (0 if nothing was recorded)
+        """
+        with self._values.get_lock():
+            buckets = self._values[:_BUCKETS]
+            count = self._values[_COUNT]
+            longest = self._values[_MAX]
+
+        results = []
+
+        for percentile in percentiles:
+            if not count:
+                results.append(0.0)
+                continue
+
+            rank = max(1, math.ceil(count * percentile))
+            seen = 0
+
+            for bucket, amount in enumerate(buckets):
+                seen += amount
+
+                if seen >= rank:
+                    upper = 2 ** ((bucket + 1) / _PER_DOUBLING)
+                    results.append(min(upper, longest) / 1e9)
+                    break
+
+        return results
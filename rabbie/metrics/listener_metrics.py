@@ -0,0 +1,59 @@
+from typing import Dict
+
+# Every counter a listener keeps, each is a slot in shared memory
+COUNTERS = [
+    "messages",
+    "cache_hits",
+    "cache_misses",
+    "cache_evictions",
+    "duplicates",
+    "retries",
+    "dead_lettered",
+    "local_hops",
+    "local_hop_ns",
+    "local_fallbacks",
+    "broker_hops",
+    "broker_hop_ns",
+    "shed",
+    "throttled",
+    "timeouts",
+    "timeout_kills",
+    "drain_released",
+    "claims_missing",
+    "unrouted",
+]
+
+_INDEX = {name: index for index, name in enumerate(COUNTERS)}
+
+
+class ListenerMetrics:
+    """
+    ListenerMetrics holds a listener's counters in shared memory, so every worker process adds to the same
+    totals and the parent process can read them.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self) -> None:
+        from multiprocess import Array
+
+        self._values = Array("q", len(COUNTERS))
+
+    def increment(self, name: str, amount: int = 1):
+        """Add to a counter
+
+        Args:
+            name (str): The name of the counter, one of COUNTERS
+            amount (int, optional): How much to add. Defaults to 1.
+        """
+        with self._values.get_lock():
+            self._values[_INDEX[name]] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """Read every counter
+
+        Returns:
+            Dict[str, int]: The current value of each counter
+        """
+        with self._values.get_lock():
+            return dict(zip(COUNTERS, self._values[:]))
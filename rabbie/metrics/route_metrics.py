@@ -0,0 +1,57 @@
+from typing import Dict, List
+
+# The counters kept for every route
+ROUTE_COUNTERS = ["messages", "failures", "handled_ns"]
+
+
+class RouteMetrics:
+    """
+    RouteMetrics holds the counters of each of a listener's routes in shared memory, so every worker process
+    adds to the same totals and the parent process can read them.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self, names: List[str]) -> None:
+        from multiprocess import Array
+
+        self.names = names
+        self._values = Array("q", len(names) * len(ROUTE_COUNTERS))
+
+    def record(self, route: int, succeeded: bool, nanoseconds: int):
+        """Count a message a route's function handled
+
+        Args:
+            route (int): The index of the route
+            succeeded (bool): Whether the function succeeded
+            nanoseconds (int): How long the function took
+        """
+        offset = route * len(ROUTE_COUNTERS)
+
+        with self._values.get_lock():
+            self._values[offset] += 1
+            self._values[offset + 1] += not succeeded
+            self._values[offset + 2] += nanoseconds
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Read the counters of every route
+
+        Returns:
+            Dict[str, Dict[str, int]]: The counters of each route, keyed by its name
+        """
+        with self._values.get_lock():
+            values = self._values[:]
+
+        width = len(ROUTE_COUNTERS)
+        snapshot: Dict[str, Dict[str, int]] = {}
+
+        # A function with several routes (stacked decorators) is reported once, summing them
+        for index, name in enumerate(self.names):
+            counters = snapshot.setdefault(name, dict.fromkeys(ROUTE_COUNTERS, 0))
+
+            for counter, value in zip(
+                ROUTE_COUNTERS, values[index * width : (index + 1) * width]
+            ):
+                counters[counter] += value
+
+        return snapshot
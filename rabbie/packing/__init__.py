@@ -0,0 +1,9 @@
+from .packing import (  # noqa: F401
+    PackingPolicy,
+    PACKED_HEADER,
+    PACKED_CONTENT_TYPE,
+    pack,
+    unpack,
+    is_packed,
+)
+from .packed_channel import PackedChannel  # noqa: F401
@@ -0,0 +1,58 @@
+from typing import Optional
+
+from pika.adapters.blocking_connection import BlockingChannel
+
+from ..broker_types import Channel, AckCoalescer
+
+
+class PackedChannel(Channel):
+    """
+    PackedChannel is handed to handlers for messages that arrived inside a packed envelope.
+
+    The envelope is a single delivery, so acknowledging or rejecting it once per inner message would
+    fail. Instead acknowledgements for the envelope's delivery tag are counted, and the envelope is
+    settled once when `settle()` is called after every inner message has been handled:
+
+    - If any inner message was rejected, the whole envelope is rejected (honouring that requeue flag)
+    - If every inner message was acknowledged, the envelope is acknowledged
+    - Otherwise the envelope is left unacknowledged, as a single message would be
+    """
+
+    def __init__(
+        self,
+        blocking_channel: BlockingChannel,
+        delivery_tag: int,
+        expected: int,
+        coalescer: Optional[AckCoalescer] = None,
+    ) -> None:
+        super().__init__(blocking_channel, coalescer)
+
+        self._delivery_tag = delivery_tag
+        self._expected = expected
+
+        self._acknowledged = 0
+        self._requeue = None
+
+    def acknowledge(self, delivery_tag: int = 0, multiple: bool = False):
+        if delivery_tag != self._delivery_tag:
+            return super().acknowledge(delivery_tag, multiple)
+
+        self._acknowledged += 1
+
+    def reject(
+        self, requeue: bool = True, delivery_tag: int = 0, multiple: bool = False
+    ):
+        if delivery_tag != self._delivery_tag:
+            return super().reject(requeue, delivery_tag, multiple)
+
+        # Only requeue the envelope if every rejection asked for it
+        self._requeue = requeue if self._requeue is None else self._requeue and requeue
+
+    def settle(self):
+        """
+        Acknowledge or reject the envelope depending on how its inner messages were handled.
+        """
+        if self._requeue is not None:
+            super().reject(self._requeue, self._delivery_tag)
+        elif self._acknowledged >= self._expected:
+            super().acknowledge(self._delivery_tag)
@@ -0,0 +1,89 @@
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+from ..broker_types import Properties
+
+# Header set on envelope messages, the value is the amount of messages packed inside
+PACKED_HEADER = "x-rabbie-packed"
+# The content type of envelope messages, whose bodies only listeners that unpack them can read
+PACKED_CONTENT_TYPE = "application/x-rabbie-packed"
+
+# Each packed message is prefixed with its length as an unsigned 32 bit big-endian int
+_LENGTH = struct.Struct(">I")
+
+
+@dataclass
+class PackingPolicy:
+    """
+    This stores when a packing Publisher should flush its buffered messages as one envelope.
+
+    Whichever threshold is hit first triggers the flush.
+    """
+
+    # Flush once this many messages are buffered for a queue
+    max_messages: int = 100
+    # Flush once the buffered bodies for a queue reach this many bytes
+    max_bytes: int = 64 * 1024
+    # Flush once the oldest buffered message has waited this many seconds
+    linger: float = 0.05
+
+
+def pack(bodies: List[Union[str, bytes]]) -> bytes:
+    """Pack multiple message bodies into one envelope body
+
+    Args:
+        bodies (List[Union[str, bytes]]): The encoded message bodies
+
+    Returns:
+        bytes: The envelope body
+    """
+    envelope = bytearray()
+
+    for body in bodies:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        envelope += _LENGTH.pack(len(body))
+        envelope += body
+
+    return bytes(envelope)
+
+
+def unpack(envelope: bytes) -> List[bytes]:
+    """Unpack an envelope body back into the message bodies it holds
+
+    Args:
+        envelope (bytes): The envelope body
+
+    Returns:
+        List[bytes]: The message bodies, in the order they were published
+    """
+    view = memoryview(envelope)
+    bodies = []
+    offset = 0
+
+    while offset < len(view):
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+
+        bodies.append(bytes(view[offset : offset + length]))
+        offset += length
+
+    return bodies
+
+
+def is_packed(properties: Optional[Properties]) -> bool:
+    """Check whether a delivery is a packed envelope
+
+    Args:
+        properties (Optional[Properties]): The properties of the delivery
+
+    Returns:
+        bool: True if the delivery holds packed messages
+    """
+    return bool(
+        properties is not None
+        and properties.headers
+        and properties.headers.get(PACKED_HEADER)
+    )
@@ -1 +1,13 @@
 from .producer import Producer  # noqa: F401
+from .publish_error import PublishError  # noqa: F401
+from .rpc import RpcError  # noqa: F401
+from .flow import FlowPolicy, Overflow, FlowStats  # noqa: F401
+
+
+def __getattr__(name):
+    # AsyncProducer pulls in asyncio & pika's asyncio adapter, so only import it on first use.
+    if name == "AsyncProducer":
+        from .async_producer import AsyncProducer
+
+        return AsyncProducer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
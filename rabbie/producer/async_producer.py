@@ -0,0 +1,198 @@
+import asyncio
+from typing import Any, List, Optional
+
+import pika
+from pika import BasicProperties as Properties
+
+from ..connection import Details
+from ..decoder import Decoder, AutoDecoder
+from ..encoder import Encoder, AutoEncoder
+from ..cluster import Cluster
+from ..claimcheck import ClaimCheckPolicy
+from .publisher import AsyncPublisher
+
+
+class AsyncProducer:
+    """
+    AsyncProducer is the asyncio counterpart to Producer, publishing without blocking the event loop.
+
+    This can be instantiated once, and called multiple times without worry.
+    """
+
+    def __init__(
+        self,
+        *,
+        # All parameters below must be passed in as KW args
+        host: Optional[str] = Details.HOST,
+        port: Optional[str] = Details.PORT,
+        username: Optional[str] = Details.USERNAME,
+        password: Optional[str] = Details.PASSWORD,
+        encoder: Optional[Encoder] = AutoEncoder(),
+        confirm: bool = True,
+        max_in_flight: int = 1000,
+        deadline: Optional[float] = None,
+        hosts: Optional[List[str]] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
+        **kwargs,
+    ):
+        """
+        This is a constructor function that holds the details needed to connect to a RabbitMQ queue.
+
+        Args:
+          host (Optional[str]): The hostname or IP address of the RabbitMQ server to connect to.
+          port (Optional[str]): The port number used to connect to the RabbitMQ server.
+          username (Optional[str]): The username used for authentication when connecting to the queue.
+          password (Optional[str]): The password used for authentication when connecting to the queue.
+          encoder (Optional[Encoder]): The default encoder for messages sent to the queue. It defaults to
+        an `AutoEncoder` instance.
+          confirm (bool): Use publisher confirms, so each publish returns a future resolved once the broker
+        has taken responsibility for the message. Defaults to True
+          max_in_flight (int): The most messages that can be awaiting confirmation at once, publishing
+        waits for room once this is reached. Defaults to 1000
+          deadline (Optional[float]): Seconds every published message stays useful for, listeners drop
+        messages that arrive later than this. Defaults to None (no deadline).
+          hosts (Optional[List[str]]): The nodes of a broker cluster, as 'host' or 'host:port', used instead
+        of host. Each connection prefers the next node in turn, so a pool of producers is balanced across
+        the cluster, and fails over to the other nodes when its node can't be reached. Defaults to None.
+          claim_check (Optional[ClaimCheckPolicy]): Keep payloads bigger than the policy's threshold in a
+        blob store, sending only a reference to them through the broker. Listeners must be given the same
+        policy. Defaults to None.
+
+        Any other arguments are passed directly in to the connection parameters.
+        """
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+
+        self.encoder = encoder
+        self.confirm = confirm
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.claim_check = claim_check
+
+        credentials = pika.PlainCredentials(self._username, self._password)
+
+        # Connections are balanced across the nodes of a cluster, when given one
+        self.cluster = (
+            Cluster.from_endpoints(
+                hosts, port=self._port, credentials=credentials, **kwargs
+            )
+            if hosts
+            else None
+        )
+
+        # Create the parameters for connection to the Queue
+        self.connection_parameters = (
+            self.cluster.nodes[0]
+            if self.cluster
+            else pika.ConnectionParameters(
+                port=self._port,
+                host=self._host,
+                credentials=credentials,
+                **kwargs,
+            )
+        )
+
+        # The RPC publisher is only opened on the first RPC call
+        self._rpc_publisher: AsyncPublisher = None
+        # Held while the RPC connection opens, so concurrent first calls share one. Created on first use, as it
+        # must belong to the running event loop
+        self._rpc_lock: Optional[asyncio.Lock] = None
+
+    def connect(
+        self,
+        queue: str = None,
+        exchange: str = None,
+        encoder: Encoder = None,
+        shards: int = 0,
+    ) -> AsyncPublisher:
+        """
+        Connect to a message broker. This does NOT open a connection, unless you are using a context manager.
+
+        You should always use this function like: `async with producer.connect() as channel:`
+
+        Args:
+          queue (str): The name of the default queue to use for publishing messages.
+          exchange (str): The default exchange to use for publishing messages.
+          encoder (Encoder): The encoder for messages being published. If not specified, the Producer's
+        encoder is used.
+          shards (int): The amount of shards the default queue is split across, this should match the
+        `shards` given to the listener. Defaults to 0 (unsharded).
+
+        Returns:
+          An AsyncPublisher object is being returned.
+        """
+        return AsyncPublisher(
+            connection_parameters=(
+                self.cluster.next_order()
+                if self.cluster
+                else self.connection_parameters
+            ),
+            default_queue=queue,
+            default_exchange=exchange,
+            default_encoder=encoder or self.encoder,
+            shards=shards,
+            confirm=self.confirm,
+            max_in_flight=self.max_in_flight,
+            deadline=self.deadline,
+            claim_check=self.claim_check,
+        )
+
+    async def rpc(
+        self,
+        body: Any,
+        queue: str,
+        exchange: str = None,
+        timeout: Optional[float] = 30,
+        encoder: Encoder = None,
+        decoder: Optional[Decoder] = AutoDecoder(),
+        properties: Properties = None,
+    ) -> Any:
+        """
+        Call a listener and wait for its reply. The listener's return value is sent back as the reply.
+
+        Every call shares one connection using RabbitMQ's direct reply-to, so any number of calls can be
+        in flight at once.
+
+        Args:
+          body (Any): The request body, encoded with the given encoder.
+          queue (str): The queue of the listener to call.
+          exchange (str): The exchange to publish the request to. Defaults to the default exchange.
+          timeout (Optional[float]): Seconds to wait for a reply before raising asyncio.TimeoutError.
+        Defaults to 30, None waits forever.
+          encoder (Encoder): The encoder for the request body. Defaults to the Producer's encoder.
+          decoder (Optional[Decoder]): The decoder for the reply body. Defaults to AutoDecoder, None leaves
+        the reply as bytes.
+          properties (Properties): Any extra properties to send with the request.
+
+        Returns:
+          The decoded reply. If the listener raised, an `RpcError` is raised.
+        """
+        if self._rpc_publisher is None:
+            if self._rpc_lock is None:
+                self._rpc_lock = asyncio.Lock()
+
+            async with self._rpc_lock:
+                if self._rpc_publisher is None:
+                    publisher = self.connect()
+                    await publisher.open()
+                    self._rpc_publisher = publisher
+
+        return await self._rpc_publisher.rpc(
+            body,
+            queue=queue,
+            exchange=exchange,
+            timeout=timeout,
+            encoder=encoder,
+            decoder=decoder,
+            properties=properties,
+        )
+
+    async def close(self):
+        """
+        Close the RPC connection, if one was opened.
+        """
+        if self._rpc_publisher is not None:
+            await self._rpc_publisher.close()
+            self._rpc_publisher = None
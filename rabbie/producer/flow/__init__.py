@@ -0,0 +1,3 @@
+from .flow_policy import FlowPolicy, Overflow  # noqa: F401
+from .publish_buffer import PublishBuffer  # noqa: F401
+from .flow_controller import FlowController, FlowStats  # noqa: F401
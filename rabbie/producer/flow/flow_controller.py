@@ -0,0 +1,169 @@
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import pika
+
+from .flow_policy import FlowPolicy, Overflow
+from .publish_buffer import PublishBuffer, Message
+from ..publish_error import PublishError
+from ...logger import logger as log
+
+
+@dataclass
+class FlowStats:
+    """
+    A snapshot of a Publisher's flow control.
+    """
+
+    # Messages waiting to be published, including those spilled to disk
+    buffered: int
+    # Body bytes waiting in memory
+    buffered_bytes: int
+    # Messages waiting on disk
+    spilled: int
+    # Messages discarded by Overflow.DROP_OLDEST
+    dropped: int
+    # Is the broker blocking publishers right now
+    blocked: bool
+    # Total seconds the broker has blocked publishers for
+    blocked_seconds: float
+
+
+class FlowController:
+    """
+    FlowController sits in front of a blocking channel's publishing, so a broker memory or disk alarm
+    fills a bounded local buffer instead of hanging the caller inside `basic_publish`.
+
+    The broker's `connection.blocked` & `connection.unblocked` notifications are tracked, and buffered
+    messages are drained in order as soon as publishing is allowed again.
+    """
+
+    def __init__(
+        self,
+        connection: pika.BlockingConnection,
+        policy: FlowPolicy,
+        send: Callable[[str, str, bytes, object, bool], None],
+    ) -> None:
+        self.connection = connection
+        self.policy = policy
+
+        # Actually publishes a message to the broker
+        self._send = send
+
+        self.buffer = PublishBuffer(policy)
+
+        self.blocked = False
+        self._blocked_since = None
+        self._blocked_seconds = 0.0
+
+        self.connection.add_on_connection_blocked_callback(self._on_blocked)
+        self.connection.add_on_connection_unblocked_callback(self._on_unblocked)
+
+    @property
+    def stats(self) -> FlowStats:
+        blocked_seconds = self._blocked_seconds
+        if self._blocked_since is not None:
+            blocked_seconds += time.monotonic() - self._blocked_since
+
+        return FlowStats(
+            buffered=len(self.buffer),
+            buffered_bytes=self.buffer.bytes,
+            spilled=self.buffer.spilled,
+            dropped=self.buffer.dropped,
+            blocked=self.blocked,
+            blocked_seconds=blocked_seconds,
+        )
+
+    def publish(self, *message):
+        """Publish a message, or buffer it if the broker is blocking publishers
+
+        Args:
+            message: (exchange, routing_key, body, properties, mandatory)
+        """
+        self.drain()
+
+        if not self.blocked and not len(self.buffer):
+            self._send(*message)
+            return
+
+        if self.buffer.full():
+            if self.policy.overflow == Overflow.BLOCK:
+                self._wait_for_room()
+            elif self.policy.overflow == Overflow.DROP_OLDEST:
+                while self.buffer.full():
+                    self.buffer.drop_oldest()
+
+        self.buffer.append(message)
+
+    def drain(self):
+        """
+        Publish buffered messages until the buffer is empty or the broker blocks us again.
+        """
+        # Blocked & unblocked notifications are only delivered while pika is processing events
+        self.connection.process_data_events(time_limit=0)
+
+        while len(self.buffer) and not self.blocked:
+            self._send(*self.buffer.popleft())
+
+    def close(self):
+        """
+        Wait (up to the policy timeout) for the buffer to drain, before the connection is closed.
+        """
+        if len(self.buffer):
+            self._wait(lambda: not len(self.buffer))
+
+        if len(self.buffer):
+            log.warning(
+                f"[red]Broker is still blocking publishers, {len(self.buffer)} buffered messages were not published"
+            )
+
+    def _wait_for_room(self):
+        if not self._wait(lambda: not self.buffer.full()):
+            raise PublishError(
+                f"Broker blocked publishing for over {self.policy.timeout}s and the buffer is full"
+            )
+
+    def _wait(self, condition: Callable[[], bool]) -> bool:
+        """Process broker events, draining whenever possible, until a condition is met or the policy times out
+
+        Args:
+            condition (Callable[[], bool]): The condition to wait for
+
+        Returns:
+            bool: True if the condition was met
+        """
+        deadline = (
+            time.monotonic() + self.policy.timeout
+            if self.policy.timeout is not None
+            else None
+        )
+
+        while not condition():
+            remaining = deadline - time.monotonic() if deadline is not None else 1
+
+            if remaining <= 0:
+                return False
+
+            self.connection.process_data_events(time_limit=min(remaining, 0.1))
+            self.drain()
+
+        return True
+
+    def _on_blocked(self, connection, frame):
+        log.warning("[red]Broker is blocking publishers, buffering messages locally")
+        self.blocked = True
+        self._blocked_since = time.monotonic()
+
+    def _on_unblocked(self, connection, frame):
+        if self._blocked_since is None:
+            return
+
+        blocked_for = time.monotonic() - self._blocked_since
+        self._blocked_seconds += blocked_for
+        self._blocked_since = None
+        self.blocked = False
+
+        log.info(
+            f"[green]Broker unblocked publishers after {blocked_for:.1f}s, draining {len(self.buffer)} buffered messages"
+        )
@@ -0,0 +1,30 @@
+from enum import Enum
+from dataclasses import dataclass
+from typing import Optional
+
+
+class Overflow(Enum):
+    # Wait for room in the buffer, raising a PublishError after the timeout
+    BLOCK = 0
+    # Discard the oldest buffered message to make room
+    DROP_OLDEST = 1
+    # Write messages that don't fit in memory to a file on disk
+    SPILL = 2
+
+
+@dataclass
+class FlowPolicy:
+    """
+    This stores how a Publisher buffers messages while the broker is blocking publishers.
+    """
+
+    # What to do once the in-memory buffer is full
+    overflow: Overflow = Overflow.BLOCK
+    # The most messages held in memory
+    max_messages: int = 10000
+    # The most body bytes held in memory
+    max_bytes: int = 64 * 1024 * 1024
+    # How long Overflow.BLOCK waits for room before raising, None waits forever
+    timeout: Optional[float] = 30
+    # Where Overflow.SPILL writes its file, None uses the system temp directory
+    spill_directory: Optional[str] = None
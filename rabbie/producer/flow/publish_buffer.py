@@ -0,0 +1,112 @@
+import pickle
+import struct
+import tempfile
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from .flow_policy import FlowPolicy, Overflow
+
+# (exchange, routing_key, body, properties, mandatory)
+Message = Tuple[str, str, bytes, object, bool]
+
+# Each spilled message is prefixed with its length as an unsigned 32 bit big-endian int
+_LENGTH = struct.Struct(">I")
+
+
+class PublishBuffer:
+    """
+    PublishBuffer holds messages waiting to be published, in the order they were published.
+
+    Messages are held in memory up to the policy's limits. With Overflow.SPILL, anything past those limits
+    is appended to a temporary file and read back once memory has been drained.
+    """
+
+    def __init__(self, policy: FlowPolicy) -> None:
+        self.policy = policy
+
+        self._memory: Deque[Message] = deque()
+        self.bytes = 0
+        self.dropped = 0
+
+        self._spill_file = None
+        self._spill_read = 0
+        self.spilled = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + self.spilled
+
+    def full(self) -> bool:
+        """Check whether the in-memory buffer has hit either of its limits
+
+        Returns:
+            bool: True if there is no room in memory
+        """
+        return (
+            len(self._memory) >= self.policy.max_messages
+            or self.bytes >= self.policy.max_bytes
+        )
+
+    def append(self, message: Message):
+        """Add a message to the back of the buffer
+
+        Args:
+            message (Message): The message to buffer
+        """
+        # Once anything is on disk, new messages must follow it there to keep their order
+        if self.policy.overflow == Overflow.SPILL and (self.spilled or self.full()):
+            self._spill(message)
+            return
+
+        self._memory.append(message)
+        self.bytes += len(message[2])
+
+    def popleft(self) -> Optional[Message]:
+        """Take the oldest message from the buffer
+
+        Returns:
+            Optional[Message]: The oldest message, or None if the buffer is empty
+        """
+        if self._memory:
+            message = self._memory.popleft()
+            self.bytes -= len(message[2])
+            return message
+
+        if self.spilled:
+            return self._unspill()
+
+        return None
+
+    def drop_oldest(self):
+        """
+        Discard the oldest message held in memory.
+        """
+        if self._memory:
+            self.bytes -= len(self._memory.popleft()[2])
+            self.dropped += 1
+
+    def _spill(self, message: Message):
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(
+                prefix="rabbie-spill-", dir=self.policy.spill_directory
+            )
+
+        record = pickle.dumps(message)
+
+        self._spill_file.seek(0, 2)
+        self._spill_file.write(_LENGTH.pack(len(record)) + record)
+        self.spilled += 1
+
+    def _unspill(self) -> Message:
+        self._spill_file.seek(self._spill_read)
+        (length,) = _LENGTH.unpack(self._spill_file.read(_LENGTH.size))
+        message = pickle.loads(self._spill_file.read(length))
+
+        self._spill_read += _LENGTH.size + length
+        self.spilled -= 1
+
+        # Reclaim the disk space once everything spilled has been read back
+        if not self.spilled:
+            self._spill_file.truncate(0)
+            self._spill_read = 0
+
+        return message
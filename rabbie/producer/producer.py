@@ -1,11 +1,20 @@
-from typing import Optional
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Union
 
 import pika
-
+from pika import BasicProperties as Properties
+from pika.connection import Parameters
 
 from ..connection import Details
+from ..decoder import Decoder, AutoDecoder
 from ..encoder import Encoder, AutoEncoder
+from ..broker_types import stamp
+from ..packing import PackingPolicy
+from ..cluster import Cluster
+from ..claimcheck import ClaimCheckPolicy
+from .flow import FlowPolicy
 from .publisher import Publisher
+from .rpc import RpcClient
 
 
 class Producer:
@@ -25,6 +34,10 @@ class Producer:
         password: Optional[str] = Details.PASSWORD,
         encoder: Optional[Encoder] = AutoEncoder(),
         connection_type: pika.BaseConnection = pika.BlockingConnection,
+        flow_control: Optional[FlowPolicy] = None,
+        deadline: Optional[float] = None,
+        hosts: Optional[List[str]] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
         **kwargs,
     ):
         """
@@ -47,6 +60,19 @@ class Producer:
         server. It is set to `pika.BlockingConnection` by default, which means that the connection will
         block the execution of the program until it is established. Other options include
         `pika.SelectConnection` and `pika.AsyncioConnection
+          flow_control (Optional[FlowPolicy]): Track when the broker blocks publishers (on a memory or disk
+        alarm), buffering messages locally rather than hanging inside `publish()`. The policy decides what
+        happens once the buffer is full. Defaults to None (publishing blocks until the broker unblocks).
+          deadline (Optional[float]): Seconds every published message stays useful for. Messages are always
+        stamped with when they were sent, and with this deadline if given, so listeners can drop them
+        unprocessed once they're stale. Defaults to None (no deadline).
+          hosts (Optional[List[str]]): The nodes of a broker cluster, as 'host' or 'host:port', used instead
+        of host. Each connection prefers the next node in turn, so a pool of producers is balanced across
+        the cluster, and fails over to the other nodes when its node can't be reached. Only supported with a
+        BlockingConnection, use the AsyncProducer for a cluster without blocking. Defaults to None.
+          claim_check (Optional[ClaimCheckPolicy]): Keep payloads bigger than the policy's threshold in a
+        blob store, sending only a reference to them through the broker. Listeners must be given the same
+        policy. Defaults to None.
         """
         self._host = host
         self._port = port
@@ -54,15 +80,37 @@ class Producer:
         self._password = password
 
         self.encoder = encoder
+        self.flow_control = flow_control
+        self.deadline = deadline
+        self.claim_check = claim_check
+
+        # Only a BlockingConnection tries a list of parameters in turn, the others take a single node
+        if hosts and not issubclass(connection_type, pika.BlockingConnection):
+            raise ValueError(
+                f"hosts needs a BlockingConnection, {connection_type.__name__} connects to a single host"
+            )
 
         credentials = pika.PlainCredentials(self._username, self._password)
 
+        # Connections are balanced across the nodes of a cluster, when given one
+        self.cluster = (
+            Cluster.from_endpoints(
+                hosts, port=self._port, credentials=credentials, **kwargs
+            )
+            if hosts
+            else None
+        )
+
         # Create the parameters for connection to the Queue
-        self.connection_parameters = pika.ConnectionParameters(
-            port=self._port,
-            host=self._host,
-            credentials=credentials,
-            **kwargs,
+        self.connection_parameters = (
+            self.cluster.nodes[0]
+            if self.cluster
+            else pika.ConnectionParameters(
+                port=self._port,
+                host=self._host,
+                credentials=credentials,
+                **kwargs,
+            )
         )
 
         self.connection_type = connection_type
@@ -70,11 +118,25 @@ class Producer:
         # Assume that when connection is None we are not connected
         self.connection: pika.BlockingConnection = None
 
+        # The RPC client is only started on the first RPC call
+        self._rpc_client: RpcClient = None
+
+    def _parameters(self) -> Union[Parameters, Sequence[Parameters]]:
+        """Get the parameters for a new connection, every node of the cluster in the order to try them"""
+        return self.cluster.next_order() if self.cluster else self.connection_parameters
+
     def _is_connected(self):
         if self.connection is None or self.connection.is_closed:
-            self.connection = self.connection_type(self.connection_parameters)
+            self.connection = self.connection_type(self._parameters())
 
-    def connect(self, queue: str = None, exchange: str = None, encoder: Encoder = None):
+    def connect(
+        self,
+        queue: str = None,
+        exchange: str = None,
+        encoder: Encoder = None,
+        shards: int = 0,
+        packing: PackingPolicy = None,
+    ):
         """
         Connect to a message broker. This does NOT open a connection, unless you are using a context manager.
 
@@ -91,6 +153,12 @@ class Producer:
         format to be used for the messages being published. It is an instance of the Encoder class, which is
         responsible for serializing the message data into a format that can be transmitted over the network.
         If no encoder is specified, the default encoder for
+          shards (int): The amount of shards the default queue is split across, this should match the
+        `shards` given to the listener. Messages are spread across 'queue.0'..'queue.N-1'. Defaults to 0
+        (unsharded).
+          packing (PackingPolicy): Opt in to packing, where published messages are buffered and sent to the
+        broker as one envelope message once the policy's size, count or linger threshold is hit. Listeners
+        unpack envelopes transparently. Defaults to None (every message is sent individually).
 
         Returns:
           A Publisher object is being returned.
@@ -102,4 +170,69 @@ class Producer:
             default_queue=queue,
             default_exchange=exchange,
             default_encoder=encoder,
+            shards=shards,
+            packing=packing,
+            flow_control=self.flow_control,
+            deadline=self.deadline,
+            claim_check=self.claim_check,
         )
+
+    def rpc(
+        self,
+        body,
+        queue: str,
+        exchange: str = None,
+        timeout: Optional[float] = 30,
+        encoder: Encoder = None,
+        decoder: Optional[Decoder] = AutoDecoder(),
+        properties: Properties = None,
+    ) -> Future:
+        """
+        Call a listener and get a future for its reply. The listener's return value is sent back as the reply.
+
+        Requests are sent over a single shared connection using RabbitMQ's direct reply-to, so any number of
+        calls can be in flight at once, from any thread.
+
+        Args:
+          body: The request body, encoded with the given encoder.
+          queue (str): The queue of the listener to call.
+          exchange (str): The exchange to publish the request to. Defaults to the default exchange.
+          timeout (Optional[float]): Seconds to wait for a reply before the future raises a TimeoutError.
+        Defaults to 30, None waits forever.
+          encoder (Encoder): The encoder for the request body. Defaults to the Producer's encoder.
+          decoder (Optional[Decoder]): The decoder for the reply body. Defaults to AutoDecoder, None leaves
+        the reply as bytes.
+          properties (Properties): Any extra properties to send with the request. The request is stamped
+        with the timeout as its deadline, so listeners drop it if it arrives after the caller gave up.
+
+        Returns:
+          A Future resolved with the decoded reply. If the listener raised, the future raises an `RpcError`.
+        """
+        encoder = encoder or self.encoder
+
+        # Stamping copies the properties, so the caller's are left as they were
+        properties = stamp(properties, timeout)
+
+        if encoder:
+            body = encoder.encode(body)
+            properties.content_type = encoder.content_type()
+
+        if self._rpc_client is None:
+            self._rpc_client = RpcClient(self._parameters())
+
+        return self._rpc_client.call(
+            body=body,
+            queue=queue,
+            exchange=exchange or "",
+            properties=properties,
+            timeout=timeout,
+            decoder=decoder,
+        )
+
+    def close(self):
+        """
+        Close the RPC client, if one was started. Any calls still awaiting a reply will fail.
+        """
+        if self._rpc_client is not None:
+            self._rpc_client.close()
+            self._rpc_client = None
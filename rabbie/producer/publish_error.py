@@ -0,0 +1,5 @@
+class PublishError(Exception):
+    """
+    Raised by a confirm future when the broker rejected (nacked) the message, or the connection was lost
+    before it was confirmed.
+    """
@@ -1 +1,10 @@
 from .publisher import Publisher
+
+
+def __getattr__(name):
+    # AsyncPublisher pulls in asyncio & pika's asyncio adapter, so only import it on first use.
+    if name == "AsyncPublisher":
+        from .async_publisher import AsyncPublisher
+
+        return AsyncPublisher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
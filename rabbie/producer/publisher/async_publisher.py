@@ -0,0 +1,392 @@
+import asyncio
+import uuid
+from copy import copy
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import pika
+from pika import BasicProperties as Properties
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from ..publish_error import PublishError
+from ..rpc import DIRECT_REPLY_TO, decode_reply
+from ...broker_types import stamp
+from ...decoder import Decoder
+from ...encoder import Encoder
+from ...sharding import ShardSelector
+from ...claimcheck import ClaimCheckPolicy, check_in
+
+
+class AsyncPublisher:
+    """
+    AsyncPublisher allows publishing messages from asyncio code without blocking the event loop.
+
+    Publishes are pipelined: `publish()` only waits while the in-flight window is full or the broker has
+    blocked the connection, and returns a future that resolves once the broker confirms the message.
+    """
+
+    def __init__(
+        self,
+        connection_parameters: Union[
+            pika.ConnectionParameters, Sequence[pika.ConnectionParameters]
+        ],
+        default_queue: str = None,
+        default_exchange: str = None,
+        default_encoder: Encoder = None,
+        shards: int = 0,
+        confirm: bool = True,
+        max_in_flight: int = 1000,
+        deadline: Optional[float] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
+    ) -> None:
+        self.connection_parameters = connection_parameters
+        self.default_queue = default_queue or ""
+        self.default_exchange = default_exchange or ""
+        self.default_encoder = default_encoder
+
+        # When the default queue is sharded, pick which physical queue each message goes to
+        self._shard_selector = (
+            ShardSelector(self.default_queue, shards) if shards else None
+        )
+
+        self.confirm = confirm
+        self.max_in_flight = max_in_flight
+
+        # Seconds a message stays useful for, listeners drop messages that arrive later than this
+        self.deadline = deadline
+
+        # When given, payloads too big for the broker are kept in a blob store
+        self.claim_check = claim_check
+
+        self.connection: AsyncioConnection = None
+        self.channel = None
+
+        # Delivery tag -> confirm future for every message the broker hasn't confirmed yet
+        self._confirms: "OrderedDict[int, asyncio.Future]" = OrderedDict()
+        self._delivery_tag = 0
+
+        # correlation_id -> future for every RPC call awaiting a reply
+        self._replies: Dict[str, Tuple[asyncio.Future, Optional[Decoder]]] = {}
+        # Resolved once the broker confirms the reply consumer, shared by every call so it's only set up once
+        self._consuming_replies: Optional[asyncio.Future] = None
+
+        # Created on open, as they must belong to the running event loop
+        self._window: asyncio.Semaphore = None
+        self._unblocked: asyncio.Event = None
+        self._closed: asyncio.Future = None
+
+    async def open(self):
+        """
+        This function opens a connection & channel to the broker.
+        """
+        loop = asyncio.get_running_loop()
+
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._unblocked = asyncio.Event()
+        self._unblocked.set()
+        self._closed = loop.create_future()
+
+        # Given the nodes of a cluster, try each in turn
+        nodes = self.connection_parameters
+
+        if isinstance(nodes, pika.connection.Parameters):
+            nodes = [nodes]
+
+        for position, node in enumerate(nodes):
+            opened = loop.create_future()
+
+            self.connection = AsyncioConnection(
+                parameters=node,
+                on_open_callback=lambda connection: opened.set_result(connection),
+                on_open_error_callback=lambda connection, exc: opened.set_exception(
+                    exc if isinstance(exc, BaseException) else PublishError(exc)
+                ),
+                on_close_callback=self._on_connection_closed,
+                custom_ioloop=loop,
+            )
+
+            try:
+                await opened
+                break
+            except Exception:
+                if position == len(nodes) - 1:
+                    raise
+
+        # The broker blocks publishers when it raises a memory or disk alarm
+        self.connection.add_on_connection_blocked_callback(
+            lambda connection, frame: self._unblocked.clear()
+        )
+        self.connection.add_on_connection_unblocked_callback(
+            lambda connection, frame: self._unblocked.set()
+        )
+
+        channel_opened = loop.create_future()
+        self.connection.channel(on_open_callback=channel_opened.set_result)
+        self.channel = await channel_opened
+
+        if self.confirm:
+            confirming = loop.create_future()
+            self.channel.confirm_delivery(
+                self._on_confirm, callback=lambda frame: confirming.set_result(frame)
+            )
+            await confirming
+
+    async def close(self):
+        """
+        This function waits for outstanding confirms, then closes the channel & connection.
+        """
+        await self.flush()
+
+        if self.connection.is_open:
+            self.connection.close()
+
+        await self._closed
+
+    async def flush(self):
+        """
+        This function waits until every message published so far has been confirmed.
+
+        Raises a `PublishError` if any of them were rejected by the broker.
+        """
+        if not self._confirms:
+            return
+
+        results = await asyncio.gather(*self._confirms.values(), return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def publish(
+        self,
+        body: Any,
+        queue: str = None,
+        properties: Properties = None,
+        encoder: Encoder = None,
+        exchange: str = None,
+        mandatory: bool = False,
+        shard_key=None,
+        deadline: Optional[float] = None,
+    ) -> asyncio.Future:
+        """
+        This function publishes a body to a specified queue or exchange, without waiting for the broker.
+
+        Args:
+          body (Any): The body to be published to the queue or exchange.
+          queue (str): The name of the queue to which the body will be published. If not specified, the
+        body will be published to the default queue.
+          properties (Properties): An optional parameter that allows you to set additional properties for
+        the body being published, such as body headers or delivery mode.
+          encoder (Encoder): The encoder for the body. If not specified, the default encoder is used.
+          exchange (str): The exchange to which the body will be published. If not specified, the default
+        exchange will be used.
+          mandatory (bool): A boolean value indicating whether the body is mandatory or not.
+          shard_key: When publishing to a sharded default queue, messages with the same key always go to
+        the same shard. If not specified, messages are spread across the shards round-robin.
+          deadline (Optional[float]): Seconds this message stays useful for, overriding the publisher's
+        deadline. Listeners drop messages that arrive later than this.
+
+        Returns:
+          A future that resolves to True once the broker has confirmed the message, or raises a
+        `PublishError` if the broker rejected it. Awaiting it is optional.
+        """
+        # Apply backpressure, rather than buffering an unbounded amount of messages in memory
+        await self._unblocked.wait()
+        await self._window.acquire()
+
+        # Waiters are woken when the connection closes, so they don't wait forever
+        if self._closed.done():
+            self._window.release()
+            raise PublishError(f"Connection closed: {self._closed.result()}")
+
+        # Attempt to assign an encoder if the given is None
+        encoder = encoder or self.default_encoder
+
+        # If the encoder is not None, we need to reassign body to an 'Encoded' version
+        if encoder:
+            body = encoder.encode(body)
+
+        # Payloads over the threshold go to the blob store (off the event loop), the message only carries a reference
+        if self.claim_check and len(body) > self.claim_check.threshold:
+            body, properties = await asyncio.get_running_loop().run_in_executor(
+                None, check_in, self.claim_check, body, properties
+            )
+
+        # We also want to override the content_type, if properties are given
+        if encoder and properties:
+            properties.content_type = encoder.content_type()
+
+        routing_key = queue or self.default_queue
+
+        # Messages for the sharded default queue are routed to one of its physical queues
+        if self._shard_selector and routing_key == self.default_queue:
+            routing_key = self._shard_selector.select(shard_key)
+
+        properties = stamp(
+            properties, deadline if deadline is not None else self.deadline
+        )
+
+        confirmed = asyncio.get_running_loop().create_future()
+
+        # Confirms don't have to be awaited, so don't warn about failures nobody retrieved, flush() raises them
+        confirmed.add_done_callback(
+            lambda future: future.cancelled() or future.exception()
+        )
+
+        try:
+            self.channel.basic_publish(
+                exchange=exchange or self.default_exchange,
+                routing_key=routing_key,
+                body=body,
+                properties=properties,
+                mandatory=mandatory,
+            )
+        except Exception:
+            self._window.release()
+            raise
+
+        if self.confirm:
+            self._delivery_tag += 1
+            self._confirms[self._delivery_tag] = confirmed
+        else:
+            confirmed.set_result(True)
+            self._window.release()
+
+        return confirmed
+
+    async def rpc(
+        self,
+        body: Any,
+        queue: str,
+        exchange: str = None,
+        timeout: Optional[float] = 30,
+        encoder: Encoder = None,
+        decoder: Optional[Decoder] = None,
+        properties: Properties = None,
+    ) -> Any:
+        """
+        This function calls a listener and waits for its reply, using RabbitMQ's direct reply-to.
+
+        Args:
+          body (Any): The request body.
+          queue (str): The queue of the listener to call.
+          exchange (str): The exchange to publish the request to. Defaults to the default exchange.
+          timeout (Optional[float]): Seconds to wait for a reply before raising asyncio.TimeoutError.
+        Defaults to 30, None waits forever.
+          encoder (Encoder): The encoder for the request body. If not specified, the default encoder is used.
+          decoder (Optional[Decoder]): The decoder for the reply body. Defaults to None (bytes).
+          properties (Properties): Any extra properties to send with the request.
+
+        Returns:
+          The decoded reply. If the listener raised, an `RpcError` is raised.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Direct reply-to must be consumed from before any request is published, and only once per channel
+        if self._consuming_replies is None:
+            consuming = self._consuming_replies = loop.create_future()
+            self.channel.basic_consume(
+                queue=DIRECT_REPLY_TO,
+                on_message_callback=self._on_reply,
+                auto_ack=True,
+                callback=lambda frame: consuming.set_result(frame),
+            )
+
+        # Shielded, so one caller being cancelled doesn't cancel the setup for the others
+        await asyncio.shield(self._consuming_replies)
+
+        correlation_id = uuid.uuid4().hex
+        reply = loop.create_future()
+        self._replies[correlation_id] = (reply, decoder)
+
+        # Concurrent calls may share the caller's properties, so each call gets its own copy
+        properties = copy(properties) if properties is not None else Properties()
+        properties.reply_to = DIRECT_REPLY_TO
+        properties.correlation_id = correlation_id
+
+        try:
+            await self.publish(
+                body,
+                queue=queue,
+                properties=properties,
+                encoder=encoder,
+                exchange=exchange,
+                deadline=timeout,
+            )
+
+            return await asyncio.wait_for(reply, timeout)
+        finally:
+            self._replies.pop(correlation_id, None)
+
+    def _on_reply(self, channel, method, properties: Properties, body: bytes):
+        pending = self._replies.pop(properties.correlation_id, None)
+
+        # Replies that arrive after their request timed out are dropped
+        if pending is None:
+            return
+
+        reply, decoder = pending
+
+        if reply.done():
+            return
+
+        try:
+            reply.set_result(decode_reply(properties, body, decoder))
+        except Exception as exc:
+            reply.set_exception(exc)
+
+    def _on_confirm(self, frame):
+        """Resolve the confirm futures for an ack or nack from the broker
+
+        Args:
+            frame: The Basic.Ack or Basic.Nack method frame
+        """
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+
+        if method.multiple:
+            tags = [tag for tag in self._confirms if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            confirmed = self._confirms.pop(tag, None)
+
+            if confirmed is None:
+                continue
+
+            self._window.release()
+
+            if confirmed.done():
+                continue
+
+            if acked:
+                confirmed.set_result(True)
+            else:
+                confirmed.set_exception(PublishError(f"Broker rejected message {tag}"))
+
+    def _on_connection_closed(self, connection, exc):
+        if not self._closed.done():
+            self._closed.set_result(exc)
+
+        # Anything unconfirmed or unanswered can never be resolved now
+        for pending in list(self._confirms.values()) + [
+            reply for reply, _ in self._replies.values()
+        ]:
+            if not pending.done():
+                pending.set_exception(PublishError(f"Connection closed: {exc}"))
+
+        # Wake every publish waiting on backpressure, which then raises as the connection is closed
+        for _ in self._confirms:
+            self._window.release()
+
+        self._confirms.clear()
+        self._replies.clear()
+        self._unblocked.set()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
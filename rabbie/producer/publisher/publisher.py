@@ -1,8 +1,34 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
 import pika
 
 from pika import BasicProperties as Properties
 
+from ..flow import FlowController, FlowPolicy, FlowStats
 from ...encoder import Encoder
+from ...broker_types import stamp
+from ...packing import PackingPolicy, PACKED_HEADER, PACKED_CONTENT_TYPE, pack
+from ...sharding import ShardSelector
+from ...claimcheck import ClaimCheckPolicy, check_in
+
+
+class _PackBuffer:
+    """
+    Messages waiting to be packed into a single envelope for one exchange & routing key.
+    """
+
+    def __init__(self) -> None:
+        self.bodies: List[bytes] = []
+        self.size = 0
+        self.started = time.monotonic()
+
+    def add(self, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        self.bodies.append(body)
+        self.size += len(body)
 
 
 class Publisher:
@@ -16,22 +42,64 @@ class Publisher:
         default_queue: str = None,
         default_exchange: str = None,
         default_encoder: Encoder = None,
+        shards: int = 0,
+        packing: PackingPolicy = None,
+        flow_control: FlowPolicy = None,
+        deadline: Optional[float] = None,
+        claim_check: Optional[ClaimCheckPolicy] = None,
     ) -> None:
         self.connection = connection
         self.default_queue = default_queue or ""
         self.default_exchange = default_exchange or ""
         self.default_encoder = default_encoder
 
+        # When the default queue is sharded, pick which physical queue each message goes to
+        self._shard_selector = (
+            ShardSelector(self.default_queue, shards) if shards else None
+        )
+
+        # When packing, messages are buffered per (exchange, routing key) and sent as one envelope
+        self.packing = packing
+        self._buffers: Dict[Tuple[str, str], _PackBuffer] = {}
+        self._linger_scheduled = False
+
+        # When given, messages are buffered locally while the broker is blocking publishers
+        self.flow_control = flow_control
+        self._flow: FlowController = None
+
+        # Seconds a message stays useful for, listeners drop messages that arrive later than this
+        self.deadline = deadline
+
+        # When given, payloads too big for the broker are kept in a blob store
+        self.claim_check = claim_check
+
+    @property
+    def flow_stats(self) -> Optional[FlowStats]:
+        """
+        Buffer occupancy and time spent blocked, if flow control is enabled.
+        """
+        return self._flow.stats if self._flow else None
+
     def open(self):
         """
         This function opens a channel for communication in a connection.
         """
         self.channel = self.connection.channel()
 
+        if self.flow_control:
+            self._flow = FlowController(
+                self.connection, self.flow_control, self._basic_publish
+            )
+
     def close(self):
         """
-        This function closes the channel.
+        This function closes the channel, after sending any messages still waiting to be packed or buffered.
         """
+        self.flush()
+
+        if self._flow:
+            self._flow.close()
+
         self.channel.close()
         self.channel = None
         self.connection.close()
@@ -44,6 +112,8 @@ class Publisher:
         encoder: Encoder = None,
         exchange: str = None,
         mandatory: bool = False,
+        shard_key=None,
+        deadline: Optional[float] = None,
     ):
         """
         This function publishes a body to a specified queue or exchange using the RabbitMQ channel.
@@ -61,6 +131,10 @@ class Publisher:
         True, the body will be returned to the sender if it cannot be delivered to any queue. If set to
         False, the body will be silently dropped if it cannot be delivered to any queue. Defaults to
         False
+          shard_key: When publishing to a sharded default queue, messages with the same key always go to
+        the same shard. If not specified, messages are spread across the shards round-robin.
+          deadline (Optional[float]): Seconds this message stays useful for, overriding the publisher's
+        deadline. Listeners drop messages that arrive later than this.
         """
 
         # Attempt to assign an encoder if the given is None
@@ -70,14 +144,170 @@ class Publisher:
         if encoder:
             body = encoder.encode(body)
 
-            # We also want to override the content_type, if properties are given
-            if properties:
-                properties.content_type = encoder.content_type()
+        # Payloads over the threshold go to the blob store, and the message only carries a reference
+        if self.claim_check:
+            body, properties = check_in(self.claim_check, body, properties)
+
+        # We also want to override the content_type, if properties are given
+        if encoder and properties:
+            properties.content_type = encoder.content_type()
+
+        routing_key = queue or self.default_queue
+
+        # Messages for the sharded default queue are routed to one of its physical queues
+        if self._shard_selector and routing_key == self.default_queue:
+            routing_key = self._shard_selector.select(shard_key)
+
+        exchange = exchange or self.default_exchange
+
+        if self.packing:
+            # Per-message properties and mandatory returns can't survive packing, so those are sent alone
+            if properties is None and not mandatory and deadline is None:
+                self._pack(exchange, routing_key, body)
+                return
+
+            # Make sure this message doesn't overtake the ones already buffered for the same route
+            self._flush_route(exchange, routing_key)
+
+        if deadline is not None:
+            properties = stamp(properties, deadline)
 
         # Finally, publish the given body to the exchange with all parameters
+        self._publish(exchange, routing_key, body, properties, mandatory)
+
+    def flush(self):
+        """
+        This function sends every message still waiting to be packed, and drains the flow control buffer
+        if the broker is accepting messages.
+        """
+        for exchange, routing_key in list(self._buffers):
+            self._flush_route(exchange, routing_key)
+
+        if self._flow:
+            self._flow.drain()
+
+    def _pack(self, exchange: str, routing_key: str, body):
+        """Buffer a message, then flush any buffers that have hit a packing threshold
+
+        Args:
+            exchange (str): The exchange to publish to
+            routing_key (str): The routing key to publish with
+            body: The encoded body
+        """
+        buffer = self._buffers.get((exchange, routing_key))
+
+        if buffer is None:
+            buffer = self._buffers[(exchange, routing_key)] = _PackBuffer()
+            self._schedule_linger(self.packing.linger)
+
+        buffer.add(body)
+
+        if (
+            len(buffer.bodies) >= self.packing.max_messages
+            or buffer.size >= self.packing.max_bytes
+        ):
+            self._flush_route(exchange, routing_key)
+
+        # Buffers for other routes may have been waiting since their last publish
+        self._flush_lingering()
+
+    def _schedule_linger(self, delay: float):
+        """Flush buffers once they've lingered, even if nothing else is published. One timer is kept at a time
+
+        The timer runs on the connection, so a blocking connection only fires it while pika is processing
+        events: during a publish, `connection.process_data_events()` or `connection.sleep()`. Call `flush`
+        before leaving a publisher idle for long.
+
+        Args:
+            delay (float): Seconds until the timer fires
+        """
+        if self._linger_scheduled:
+            return
+
+        call_later = getattr(self.connection, "call_later", None) or getattr(
+            getattr(self.connection, "ioloop", None), "call_later", None
+        )
+
+        if call_later is not None:
+            call_later(delay, self._on_linger)
+            self._linger_scheduled = True
+
+    def _on_linger(self):
+        """
+        Flush the buffers that have lingered, then wait for the oldest of the rest.
+        """
+        self._linger_scheduled = False
+        self._flush_lingering()
+
+        if self._buffers:
+            oldest = min(buffer.started for buffer in self._buffers.values())
+            self._schedule_linger(
+                max(self.packing.linger - (time.monotonic() - oldest), 0)
+            )
+
+    def _flush_lingering(self):
+        """
+        Send every buffer whose oldest message has waited for the linger period.
+        """
+        now = time.monotonic()
+
+        for route, buffer in list(self._buffers.items()):
+            if now - buffer.started >= self.packing.linger:
+                self._flush_route(*route)
+
+    def _flush_route(self, exchange: str, routing_key: str):
+        """Send the buffered messages for a route as one envelope
+
+        Args:
+            exchange (str): The exchange to publish to
+            routing_key (str): The routing key to publish with
+        """
+        buffer = self._buffers.pop((exchange, routing_key), None)
+
+        if buffer is None:
+            return
+
+        self._publish(
+            exchange,
+            routing_key,
+            pack(buffer.bodies),
+            Properties(
+                content_type=PACKED_CONTENT_TYPE,
+                headers={PACKED_HEADER: len(buffer.bodies)},
+            ),
+            False,
+        )
+
+    def _publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body,
+        properties: Optional[Properties],
+        mandatory: bool,
+    ):
+        """
+        Publish a message, through the flow control buffer if there is one.
+        """
+        # Stamped before buffering, so time spent waiting on the broker counts towards the message's age
+        properties = stamp(properties, self.deadline)
+
+        if self._flow:
+            self._flow.publish(exchange, routing_key, body, properties, mandatory)
+        else:
+            self._basic_publish(exchange, routing_key, body, properties, mandatory)
+
+    def _basic_publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body,
+        properties: Optional[Properties],
+        mandatory: bool,
+    ):
         self.channel.basic_publish(
-            exchange=exchange or self.default_exchange,
-            routing_key=queue or self.default_queue,
+            exchange=exchange,
+            routing_key=routing_key,
             body=body,
             properties=properties,
             mandatory=mandatory,
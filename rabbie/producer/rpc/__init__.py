@@ -0,0 +1,3 @@
+from .rpc_client import RpcClient, DIRECT_REPLY_TO  # noqa: F401
+from .rpc_error import RpcError  # noqa: F401
+from .reply import decode_reply  # noqa: F401
@@ -0,0 +1,34 @@
+from typing import Any, Optional
+
+from pika import BasicProperties as Properties
+
+from .rpc_error import RpcError
+from ...broker_types import RPC_ERROR_HEADER
+from ...decoder import Decoder
+
+
+def decode_reply(
+    properties: Properties, body: bytes, decoder: Optional[Decoder]
+) -> Any:
+    """Turn an RPC reply into the value the caller receives
+
+    Args:
+        properties (Properties): The properties of the reply
+        body (bytes): The reply body
+        decoder (Optional[Decoder]): The decoder for the body, None leaves it as bytes
+
+    Raises:
+        RpcError: If the remote handler raised an exception
+
+    Returns:
+        Any: The decoded reply, None if the handler returned nothing
+    """
+    headers = properties.headers or {}
+
+    if RPC_ERROR_HEADER in headers:
+        raise RpcError(headers[RPC_ERROR_HEADER])
+
+    if not body:
+        return None
+
+    return decoder.decode(body) if decoder else body
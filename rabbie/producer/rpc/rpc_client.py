@@ -0,0 +1,183 @@
+import heapq
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import pika
+from pika import BasicProperties as Properties
+from pika.exceptions import AMQPError
+
+from .reply import decode_reply
+from ...decoder import Decoder
+from ...logger import logger as log
+
+# RabbitMQ's pseudo-queue for replies, no reply queue has to be declared or cleaned up
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+
+class RpcClient:
+    """
+    RpcClient sends requests to listeners and resolves a future with each reply.
+
+    A single connection & channel is owned by a background thread, and every request in flight is
+    multiplexed over it using RabbitMQ's direct reply-to, matched back up by `correlation_id`.
+    Requests can be made from any thread.
+    """
+
+    def __init__(self, connection_parameters: pika.ConnectionParameters) -> None:
+        self.connection_parameters = connection_parameters
+
+        # correlation_id -> (future, decoder) for every request awaiting a reply
+        self._pending: Dict[str, Tuple[Future, Optional[Decoder]]] = {}
+        # (deadline, correlation_id) for every request that can time out
+        self._deadlines: List[Tuple[float, str]] = []
+
+        self._connection: pika.BlockingConnection = None
+        self._channel = None
+
+        self._connected = threading.Event()
+        self._closing = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def call(
+        self,
+        body: bytes,
+        queue: str,
+        exchange: str = "",
+        properties: Optional[Properties] = None,
+        timeout: Optional[float] = None,
+        decoder: Optional[Decoder] = None,
+    ) -> Future:
+        """Send a request, returning a future resolved with the decoded reply
+
+        Args:
+            body (bytes): The already encoded request body
+            queue (str): The queue (routing key) of the listener to call
+            exchange (str, optional): The exchange to publish to. Defaults to the default exchange.
+            properties (Optional[Properties], optional): Any extra properties for the request. Defaults to None.
+            timeout (Optional[float], optional): Seconds to wait for a reply before the future raises TimeoutError, including any wait for the connection. Defaults to None (wait forever).
+            decoder (Optional[Decoder], optional): The decoder for the reply body. Defaults to None (raw bytes).
+
+        Returns:
+            Future: Resolved with the reply, or raises RpcError if the remote handler failed
+        """
+        future = Future()
+        correlation_id = uuid.uuid4().hex
+
+        # One deadline covers both connecting and the reply, so the caller never waits longer than asked
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        properties = properties or Properties()
+        properties.reply_to = DIRECT_REPLY_TO
+        properties.correlation_id = correlation_id
+
+        def publish():
+            self._pending[correlation_id] = (future, decoder)
+
+            if deadline is not None:
+                heapq.heappush(self._deadlines, (deadline, correlation_id))
+
+            try:
+                self._channel.basic_publish(
+                    exchange=exchange,
+                    routing_key=queue,
+                    body=body,
+                    properties=properties,
+                )
+            except Exception as exc:
+                self._pending.pop(correlation_id, None)
+                if not future.done():
+                    future.set_exception(exc)
+
+        if not self._connected.wait(timeout):
+            future.set_exception(TimeoutError("RPC client could not connect to broker"))
+            return future
+
+        try:
+            # The connection belongs to the background thread, so the publish has to happen there too
+            self._connection.add_callback_threadsafe(publish)
+        except Exception as exc:
+            future.set_exception(exc)
+
+        return future
+
+    def close(self):
+        """
+        Stop the background thread, failing any requests still awaiting a reply.
+        """
+        self._closing = True
+        self._thread.join()
+
+    def _connect(self):
+        self._connection = pika.BlockingConnection(self.connection_parameters)
+        self._channel = self._connection.channel()
+
+        # Direct reply-to must be consumed with auto_ack, before any request is published
+        self._channel.basic_consume(
+            queue=DIRECT_REPLY_TO,
+            on_message_callback=self._on_reply,
+            auto_ack=True,
+        )
+
+        self._connected.set()
+
+    def _run(self):
+        while not self._closing:
+            try:
+                if not self._connected.is_set():
+                    self._connect()
+
+                self._connection.process_data_events(time_limit=0.1)
+                self._expire()
+            except AMQPError as exc:
+                # Replies for anything in flight went with the connection, so those can never be resolved
+                log.error(f"[red]RPC connection to broker failed, reconnecting: {exc}")
+                self._connected.clear()
+                self._fail_pending(exc)
+                time.sleep(2)
+
+        if self._connected.is_set():
+            self._connection.close()
+
+        self._fail_pending(ConnectionError("RPC client closed"))
+
+    def _on_reply(self, channel, method, properties: Properties, body: bytes):
+        pending = self._pending.pop(properties.correlation_id, None)
+
+        # Replies that arrive after their request timed out are dropped
+        if pending is None:
+            return
+
+        future, decoder = pending
+
+        if future.cancelled():
+            return
+
+        try:
+            future.set_result(decode_reply(properties, body, decoder))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    def _expire(self):
+        now = time.monotonic()
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, correlation_id = heapq.heappop(self._deadlines)
+            pending = self._pending.pop(correlation_id, None)
+
+            if pending and not pending[0].done():
+                pending[0].set_exception(
+                    TimeoutError(f"No reply to RPC request {correlation_id}")
+                )
+
+    def _fail_pending(self, exc: Exception):
+        pending, self._pending = self._pending, {}
+        self._deadlines.clear()
+
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(exc)
@@ -0,0 +1,4 @@
+class RpcError(Exception):
+    """
+    Raised by an RPC future when the remote handler raised an exception.
+    """
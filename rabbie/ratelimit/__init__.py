@@ -0,0 +1 @@
+from .token_bucket import RateLimit, TokenBucket  # noqa: F401
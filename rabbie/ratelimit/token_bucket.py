@@ -0,0 +1,68 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RateLimit:
+    """
+    This stores how often a listener's function can be called, across all of its workers.
+    """
+
+    # Calls per second
+    rate: float
+    # The most calls that can be made at once after being idle, None allows one second's worth
+    burst: Optional[float] = None
+
+    @property
+    def capacity(self) -> float:
+        return self.burst if self.burst is not None else max(1.0, self.rate)
+
+
+class TokenBucket:
+    """
+    TokenBucket hands out tokens at a fixed rate, shared between every worker of a listener.
+
+    The bucket is two doubles in shared memory, the tokens left and when they were last topped up, so
+    taking a token is a few arithmetic operations under one lock, rather than any messaging between
+    workers.
+
+    This must be created in the parent before the workers are started, so they inherit it.
+    """
+
+    def __init__(self, limit: RateLimit) -> None:
+        from multiprocess import Lock, RawArray
+
+        self.limit = limit
+
+        # tokens, last topped up (time.monotonic() is system wide, so every process agrees on it)
+        self._state = RawArray("d", [limit.capacity, time.monotonic()])
+        self._lock = Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Take tokens from the bucket, if there are enough
+
+        Taking more tokens than the bucket can hold is allowed once it's full, leaving it in debt.
+
+        Args:
+            tokens (float, optional): How many tokens to take. Defaults to 1.
+
+        Returns:
+            float: 0 if the tokens were taken, else the seconds until there will be enough
+        """
+        needed = min(tokens, self.limit.capacity)
+
+        with self._lock:
+            now = time.monotonic()
+            available = min(
+                self.limit.capacity,
+                self._state[0] + (now - self._state[1]) * self.limit.rate,
+            )
+            self._state[1] = now
+
+            if available >= needed:
+                self._state[0] = available - tokens
+                return 0
+
+            self._state[0] = available
+            return (needed - available) / self.limit.rate
@@ -0,0 +1,3 @@
+from .record_policy import RecordPolicy  # noqa: F401
+from .record_log import Recorder, Record, read_log, read_segment  # noqa: F401
+from .replayer import Replayer, ReplayMode, ReplayReport  # noqa: F401
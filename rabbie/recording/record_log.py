@@ -0,0 +1,232 @@
+import os
+import re
+import heapq
+import struct
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from pika.spec import BasicProperties as Properties
+
+from .record_policy import RecordPolicy
+
+# Every segment starts with its magic, format version & the offset its records end at
+_HEADER = struct.Struct("<4sHHQ")
+_MAGIC = b"RBRL"
+_VERSION = 1
+
+# Each record is length prefixed: body, properties & routing key lengths, then when it arrived
+_RECORD = struct.Struct("<IIHd")
+
+SEGMENT_SUFFIX = ".rec"
+
+
+@dataclass
+class Record:
+    """
+    A message as it was consumed.
+    """
+
+    # When the message arrived, in seconds since the epoch
+    arrived: float
+    routing_key: str
+    properties: Properties
+    body: bytes
+
+
+class Recorder:
+    """
+    Recorder appends every message a listener's worker consumes to memory mapped segment files.
+
+    Each worker writes its own segments ('<queue>-<pid>-<sequence>.rec'), so no locking is needed, and a
+    new segment is started once one is full. Segments left by an earlier process with the same pid are
+    never overwritten, the worker carries on from the sequence after them. Records are copied straight into the mapping, and the end
+    offset in the segment's header is only moved past a record once it's complete, so the log can be read
+    while it's written and survives the worker being killed.
+
+    This can be created in the parent, each worker opens its own segment on first use.
+    """
+
+    def __init__(self, policy: RecordPolicy, queue: str) -> None:
+        self.policy = policy
+        self.queue = queue
+
+        os.makedirs(policy.path, exist_ok=True)
+
+        self._pid = None
+        self._sequence = 0
+        self._segments: List[str] = []
+
+        self._file = None
+        self._buffer = None
+        self._end = 0
+
+    def append(self, routing_key: str, properties: Properties, body: bytes):
+        """Record a message, as it arrived now
+
+        Args:
+            routing_key (str): The routing key the message was delivered with
+            properties (Properties): The message properties
+            body (bytes): The raw message body
+        """
+        encoded_key = routing_key.encode()
+        encoded_properties = b"".join(properties.encode())
+
+        record = (
+            _RECORD.pack(
+                len(body), len(encoded_properties), len(encoded_key), time.time()
+            )
+            + encoded_key
+            + encoded_properties
+            + body
+        )
+
+        # A forked worker must not write to its parent's segment
+        if self._pid != os.getpid():
+            self._reset()
+            self._rotate(len(record))
+        elif self._end + len(record) > len(self._buffer):
+            self._rotate(len(record))
+
+        self._buffer[self._end : self._end + len(record)] = record
+        self._end += len(record)
+
+        _HEADER.pack_into(self._buffer, 0, _MAGIC, _VERSION, 0, self._end)
+
+    def close(self):
+        """Finish the current segment, trimming it to the records it holds"""
+        if self._buffer is None or self._pid != os.getpid():
+            return
+
+        self._buffer.flush()
+        self._buffer.close()
+        self._file.truncate(self._end)
+        self._file.close()
+
+        self._buffer = None
+        self._file = None
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._sequence = 0
+        self._segments = []
+        self._file = None
+        self._buffer = None
+
+    def _rotate(self, needed: int):
+        """Finish the current segment and start the next, big enough for at least one record
+
+        Args:
+            needed (int): The size of the record that has to fit
+        """
+        import mmap
+
+        self.close()
+
+        # Pids are reused, so the segments of an earlier worker may already be there
+        while True:
+            path = os.path.join(
+                self.policy.path,
+                f"{self.queue}-{self._pid}-{self._sequence:06d}{SEGMENT_SUFFIX}",
+            )
+            self._sequence += 1
+
+            try:
+                self._file = open(path, "x+b")
+                break
+            except FileExistsError:
+                continue
+
+        size = max(self.policy.segment_size, _HEADER.size + needed)
+
+        self._file.truncate(size)
+        self._buffer = mmap.mmap(self._file.fileno(), size)
+        self._end = _HEADER.size
+
+        _HEADER.pack_into(self._buffer, 0, _MAGIC, _VERSION, 0, self._end)
+
+        self._segments.append(path)
+
+        while (
+            self.policy.max_segments is not None
+            and len(self._segments) > self.policy.max_segments
+        ):
+            os.unlink(self._segments.pop(0))
+
+
+def read_segment(path: str) -> Iterator[Record]:
+    """Read every complete record of a segment, in the order they arrived
+
+    Args:
+        path (str): The segment file
+
+    Yields:
+        Record: Each record
+    """
+    import mmap
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < _HEADER.size:
+            return
+
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, _, end = _HEADER.unpack_from(data)
+
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"{path} isn't a rabbie record segment")
+
+    offset = _HEADER.size
+
+    while offset < end:
+        body_length, properties_length, key_length, arrived = _RECORD.unpack_from(
+            data, offset
+        )
+        offset += _RECORD.size
+
+        routing_key = data[offset : offset + key_length].decode()
+        offset += key_length
+
+        properties = Properties()
+        properties.decode(data[offset : offset + properties_length])
+        offset += properties_length
+
+        body = data[offset : offset + body_length]
+        offset += body_length
+
+        yield Record(arrived, routing_key, properties, body)
+
+
+def read_log(path: str, queue: Optional[str] = None) -> Iterator[Record]:
+    """Read every record in a directory of segments, merged in the order they arrived across workers
+
+    Args:
+        path (str): The directory a RecordPolicy wrote to
+        queue (Optional[str], optional): Only read the segments of this queue's listener. Defaults to None.
+
+    Yields:
+        Record: Each record
+    """
+    # Only '<queue>-<pid>-<sequence>.rec', so a queue's name being the start of another's doesn't match both
+    pattern = re.compile(
+        f"{re.escape(queue) if queue else '.+'}-[0-9]+-[0-9]+{re.escape(SEGMENT_SUFFIX)}"
+    )
+    segments = sorted(
+        os.path.join(path, name) for name in os.listdir(path) if pattern.fullmatch(name)
+    )
+
+    # Each worker's segments are in order already, so merging them only needs one segment open per worker
+    streams = {}
+
+    for segment in segments:
+        writer = segment.rsplit("-", 1)[0]
+        streams.setdefault(writer, []).append(segment)
+
+    def stream(paths: List[str]) -> Iterator[Record]:
+        for segment in paths:
+            yield from read_segment(segment)
+
+    yield from heapq.merge(
+        *(stream(paths) for paths in streams.values()),
+        key=lambda record: record.arrived,
+    )
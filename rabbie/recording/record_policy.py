@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RecordPolicy:
+    """
+    This stores where & how a listener records the messages it consumes, see `Replayer`.
+    """
+
+    # The directory segment files are written to
+    path: str
+    # The size of each segment file, a new segment is started once one is full
+    segment_size: int = 64 * 1024 * 1024
+    # The most segments each worker keeps, the oldest are deleted past this. None keeps every segment
+    max_segments: Optional[int] = 16
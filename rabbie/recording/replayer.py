@@ -0,0 +1,241 @@
+import time
+from enum import Enum
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+import pika
+from pika.spec import Basic
+
+from .record_log import Record, read_log
+from ..broker_types import Channel, DEADLINE_HEADER
+from ..packing import is_packed, unpack
+
+if TYPE_CHECKING:
+    from ..consumer import Consumer, Listener
+
+
+class ReplayMode(Enum):
+    # Decode each message and call the listener's function, nothing else
+    DIRECT = 0
+    # Run each message through the listener's whole pipeline (shedding, unpacking, the function, outputs) in this process
+    LOCAL = 1
+    # Publish each message to the broker, for the consumer's running workers to take
+    BROKER = 2
+
+
+@dataclass
+class ReplayReport:
+    """
+    How a replay went. Latencies are how long each message took to handle (or publish), in seconds.
+    """
+
+    messages: int
+    failures: int
+    elapsed: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    @property
+    def throughput(self) -> float:
+        """Messages replayed per second"""
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.messages} messages ({self.failures} failed) in {self.elapsed:.2f}s, "
+            f"{self.throughput:.1f}/s. Latency p50 {self.p50 * 1000:.2f}ms, "
+            f"p90 {self.p90 * 1000:.2f}ms, p99 {self.p99 * 1000:.2f}ms, max {self.max * 1000:.2f}ms"
+        )
+
+
+class _Sink:
+    """
+    Stands in for a worker's channel while replaying in-process, dropping acknowledgements & outputs.
+    """
+
+    def __init__(self) -> None:
+        self.outputs = 0
+
+    def basic_ack(self, *args, **kwargs):
+        pass
+
+    def basic_nack(self, *args, **kwargs):
+        pass
+
+    def basic_publish(self, *args, **kwargs):
+        self.outputs += 1
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+    def basic_cancel(self, consumer_tag):
+        return []
+
+
+def _percentile(latencies: List[float], percentile: float) -> float:
+    if not latencies:
+        return 0.0
+
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+
+class Replayer:
+    """
+    Replayer feeds messages recorded by a listener (see RecordPolicy) back into it, to see how a change
+    to its function copes with real traffic.
+
+    Messages are replayed at the speed they were recorded, a multiple of it, or as fast as possible, and
+    their timestamps & deadlines are moved forward to the time they're replayed, so they aren't shed as
+    stale.
+    """
+
+    def __init__(self, path: str, queue: Optional[str] = None) -> None:
+        """
+        Args:
+            path (str): The directory the listener recorded to
+            queue (Optional[str], optional): Only replay the messages of this queue's listener. Defaults to None.
+        """
+        self.path = path
+        self.queue = queue
+
+    def run(
+        self,
+        consumer: "Consumer",
+        queue: str,
+        mode: ReplayMode = ReplayMode.LOCAL,
+        speed: Optional[float] = 1.0,
+        limit: Optional[int] = None,
+    ) -> ReplayReport:
+        """Replay the log into a listener
+
+        Args:
+            consumer (Consumer): The consumer the listener belongs to
+            queue (str): The queue of the listener
+            mode (ReplayMode, optional): How messages reach the listener. Defaults to ReplayMode.LOCAL.
+            speed (Optional[float], optional): A multiple of the recorded speed, None replays as fast as possible. Defaults to 1.0.
+            limit (Optional[int], optional): The most messages to replay. Defaults to None (all of them).
+
+        Returns:
+            ReplayReport: The throughput & latencies
+        """
+        listener = consumer._listeners_for(queue)[0]
+        listener.prepare()
+
+        if mode == ReplayMode.BROKER:
+            connection = pika.BlockingConnection(consumer.connection_parameters)
+            send = self._publisher(connection.channel())
+        else:
+            connection = None
+            send = self._handler(listener, mode)
+
+        # Replays measure the listener, not its rate limit
+        bucket, listener._bucket = listener._bucket, None
+
+        latencies: List[float] = []
+        failures = 0
+        first, started = None, time.monotonic()
+
+        try:
+            for record in read_log(self.path, self.queue):
+                if limit is not None and len(latencies) >= limit:
+                    break
+
+                if first is None:
+                    first = record.arrived
+
+                if speed:
+                    wait = (record.arrived - first) / speed - (
+                        time.monotonic() - started
+                    )
+
+                    if wait > 0:
+                        time.sleep(wait)
+
+                _rebase(record)
+
+                began = time.perf_counter()
+                succeeded = send(record)
+                latencies.append(time.perf_counter() - began)
+
+                if succeeded is False:
+                    failures += 1
+        finally:
+            listener._bucket = bucket
+
+            if connection is not None:
+                connection.close()
+
+        elapsed = time.monotonic() - started
+        latencies.sort()
+
+        return ReplayReport(
+            messages=len(latencies),
+            failures=failures,
+            elapsed=elapsed,
+            p50=_percentile(latencies, 0.5),
+            p90=_percentile(latencies, 0.9),
+            p99=_percentile(latencies, 0.99),
+            max=latencies[-1] if latencies else 0.0,
+        )
+
+    def _handler(self, listener: "Listener", mode: ReplayMode):
+        sink = _Sink()
+
+        def handle(record: Record) -> Optional[bool]:
+            method = Basic.Deliver(delivery_tag=0, routing_key=record.routing_key)
+
+            if mode == ReplayMode.LOCAL:
+                return listener._handle(sink, method, record.properties, record.body)
+
+            bodies = (
+                unpack(record.body) if is_packed(record.properties) else [record.body]
+            )
+
+            return all(
+                listener._dispatch(
+                    Channel(sink), method, record.properties, listener._decode(body)
+                )
+                for body in bodies
+            )
+
+        return handle
+
+    def _publisher(self, channel):
+        from ..consumer.listener.local_route import SENT_HEADER
+
+        def publish(record: Record) -> bool:
+            # Stamped so the consumer's metrics show how long each message took to reach its workers
+            record.properties.headers = {
+                **(record.properties.headers or {}),
+                SENT_HEADER: time.time_ns(),
+            }
+
+            channel.basic_publish(
+                exchange="",
+                routing_key=record.routing_key,
+                body=record.body,
+                properties=record.properties,
+            )
+            return True
+
+        return publish
+
+
+def _rebase(record: Record):
+    """Move a record's timestamp & deadline forward to now, keeping how long it had left
+
+    Args:
+        record (Record): The record being replayed
+    """
+    shift = time.time() - record.arrived
+    properties = record.properties
+
+    if properties.timestamp is not None:
+        properties.timestamp += int(shift)
+
+    deadline = (properties.headers or {}).get(DEADLINE_HEADER)
+
+    if deadline is not None:
+        properties.headers[DEADLINE_HEADER] = deadline + int(shift * 1000)
@@ -0,0 +1 @@
+from .recycle_policy import RecyclePolicy, current_rss  # noqa: F401
@@ -0,0 +1,56 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RecyclePolicy:
+    """
+    This stores when a listener's workers are replaced with fresh processes.
+    """
+
+    # Replace a worker after it has handled this many messages
+    max_messages: Optional[int] = None
+    # Replace a worker once its resident memory grows past this many bytes
+    max_rss: Optional[int] = None
+    # Replace a worker after it has been running for this many seconds
+    max_age: Optional[float] = None
+
+    def reason(self, messages: int, rss: int, age: float) -> Optional[str]:
+        """Check whether a worker is due to be replaced
+
+        Args:
+            messages (int): The amount of messages the worker has handled
+            rss (int): The worker's resident memory, in bytes
+            age (float): Seconds the worker has been running for
+
+        Returns:
+            Optional[str]: Why the worker is due, None if it isn't
+        """
+        if self.max_messages is not None and messages >= self.max_messages:
+            return f"handled {messages} messages"
+
+        if self.max_rss is not None and rss >= self.max_rss:
+            return f"using {rss // (1024 * 1024)}MiB of memory"
+
+        if self.max_age is not None and age >= self.max_age:
+            return f"running for {int(age)}s"
+
+        return None
+
+
+def current_rss() -> int:
+    """Get the resident memory of the current process
+
+    Returns:
+        int: The resident memory in bytes
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Only the peak is available here, in kilobytes on Linux & bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
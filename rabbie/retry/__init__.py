@@ -0,0 +1,10 @@
+from .retry_policy import RetryPolicy  # noqa: F401
+from .retrier import (
+    ATTEMPT_HEADER,
+    RETRY_ERROR_HEADER,
+    ROUTING_KEY_HEADER,
+    Retrier,
+    attempt_of,
+    retry_queue_name,
+    routing_key_of,
+)  # noqa: F401
@@ -0,0 +1,165 @@
+import copy
+from typing import Optional
+
+from pika.adapters.blocking_connection import BlockingChannel
+
+from ..broker_types import Method, Properties
+from ..packing import PACKED_HEADER
+from .retry_policy import RetryPolicy
+
+# Header carrying how many times a message has been handled, absent on the first delivery
+ATTEMPT_HEADER = "x-rabbie-attempt"
+# Header carrying what the last attempt raised
+RETRY_ERROR_HEADER = "x-rabbie-retry-error"
+# Header carrying the routing key a retried message was first published with, as the delay queues replace it
+ROUTING_KEY_HEADER = "x-rabbie-routing-key"
+
+
+def attempt_of(properties: Optional[Properties]) -> int:
+    """Get which attempt a delivery is
+
+    Args:
+        properties (Optional[Properties]): The message properties
+
+    Returns:
+        int: The attempt, starting at 1
+    """
+    headers = getattr(properties, "headers", None) or {}
+    return int(headers.get(ATTEMPT_HEADER, 1))
+
+
+def routing_key_of(method: Method, properties: Optional[Properties]) -> str:
+    """Get the routing key a message was published with, which a retried message carries in a header
+
+    Args:
+        method (Method): The delivery method of the message
+        properties (Optional[Properties]): The message properties
+
+    Returns:
+        str: The original routing key
+    """
+    headers = getattr(properties, "headers", None) or {}
+    return headers.get(ROUTING_KEY_HEADER, method.routing_key)
+
+
+def retry_queue_name(queue: str, delay: float) -> str:
+    """Get the name of the queue that holds messages for a queue during a delay
+
+    Args:
+        queue (str): The queue the messages return to
+        delay (float): The delay in seconds
+
+    Returns:
+        str: The delay queue name, e.g. 'queue.retry.2000ms'
+    """
+    return f"{queue}.retry.{_milliseconds(delay)}ms"
+
+
+class Retrier:
+    """
+    Retrier moves failed messages out of the way, rather than requeuing them for immediate redelivery.
+
+    Every delay a policy can wait for gets its own queue per consumed queue, with a message TTL of that
+    delay and the consumed queue as its dead letter route. A failed message is published into the queue
+    for its delay and sits there until it expires, at which point the broker routes it back to be
+    handled again. Once every attempt has failed the message is published to the dead letter queue.
+
+    The retrier publishes on a channel of its own in confirm mode, so the broker has taken a message
+    before the delivery it came from is acknowledged.
+    """
+
+    def __init__(
+        self,
+        channel: BlockingChannel,
+        queue_name: str,
+        policy: RetryPolicy,
+        durable: bool = False,
+    ) -> None:
+        self.policy = policy
+        self.dead_letter_queue = policy.dead_letter_queue or f"{queue_name}.dlq"
+
+        self._channel = channel
+        self._durable = durable
+
+        self._channel.confirm_delivery()
+        self._channel.queue_declare(self.dead_letter_queue, durable=durable)
+
+    def declare(self, queue: str):
+        """Declare the delay queues for a consumed queue
+
+        Args:
+            queue (str): The consumed queue
+        """
+        for delay in self.policy.delays():
+            self._channel.queue_declare(
+                retry_queue_name(queue, delay),
+                durable=self._durable,
+                arguments={
+                    "x-message-ttl": _milliseconds(delay),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": queue,
+                },
+            )
+
+    def retry(
+        self,
+        queue: str,
+        properties: Optional[Properties],
+        body: bytes,
+        error: Exception,
+        packed: bool = False,
+        routing_key: Optional[str] = None,
+    ) -> bool:
+        """Schedule a failed message for another attempt, or dead letter it if it has none left
+
+        Args:
+            queue (str): The queue the message was consumed from
+            properties (Optional[Properties]): The message properties
+            body (bytes): The raw message body
+            error (Exception): What the function raised
+            packed (bool, optional): Whether the body is still a packed envelope. Defaults to False.
+            routing_key (Optional[str], optional): The routing key the message was delivered with. Defaults to None.
+
+        Returns:
+            bool: True if the message will be retried, False if it was dead lettered
+
+        Raises:
+            AMQPError: If the broker didn't take the message, which then still has to be settled
+        """
+        attempt = attempt_of(properties)
+
+        properties = copy.copy(properties) if properties else Properties()
+        headers = dict(properties.headers or {})
+
+        # A single message out of an envelope is retried on its own
+        if not packed:
+            headers.pop(PACKED_HEADER, None)
+
+        headers[ATTEMPT_HEADER] = attempt + 1
+        headers[RETRY_ERROR_HEADER] = repr(error)
+
+        # Only the first retry sees the original routing key, later ones arrive keyed by the delay queue
+        if routing_key is not None:
+            headers.setdefault(ROUTING_KEY_HEADER, routing_key)
+
+        properties.headers = headers
+
+        if attempt < self.policy.max_attempts:
+            destination = retry_queue_name(queue, self.policy.delay_for(attempt))
+        else:
+            destination = self.dead_letter_queue
+
+        # Blocks until the broker confirms, raising if it nacks the message or can't route it
+        self._channel.basic_publish(
+            exchange="",
+            routing_key=destination,
+            body=body,
+            properties=properties,
+            mandatory=True,
+        )
+
+        return destination != self.dead_letter_queue
+
+
+def _milliseconds(delay: float) -> int:
+    return max(1, int(round(delay * 1000)))
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class RetryPolicy:
+    """
+    This stores how a listener retries messages whose function raised.
+    """
+
+    # How many times a message is handled in total, including the first delivery
+    max_attempts: int = 5
+    # Seconds to wait before the first retry
+    delay: float = 1
+    # How much the delay grows by on every further retry
+    multiplier: float = 2
+    # The longest delay between retries
+    max_delay: float = 300
+    # Where messages go once every attempt has failed, None uses '<queue>.dlq'
+    dead_letter_queue: Optional[str] = None
+
+    def delay_for(self, attempt: int) -> float:
+        """Get the delay before retrying a message that failed on an attempt
+
+        Args:
+            attempt (int): The attempt that failed, starting at 1
+
+        Returns:
+            float: The delay in seconds
+        """
+        return min(self.delay * self.multiplier ** (attempt - 1), self.max_delay)
+
+    def delays(self) -> List[float]:
+        """Get every distinct delay a message can wait for
+
+        Returns:
+            List[float]: The delays in seconds, shortest first
+        """
+        return sorted(
+            {self.delay_for(attempt) for attempt in range(1, self.max_attempts)}
+        )
@@ -0,0 +1,2 @@
+from .route_trie import RouteTrie  # noqa: F401
+from .router import Route, Router, DEFAULT_ROUTE  # noqa: F401
@@ -0,0 +1,89 @@
+from typing import Dict, List, Optional, Set
+
+
+class _Node:
+    __slots__ = ("words", "star", "hash", "routes")
+
+    def __init__(self) -> None:
+        self.words: Dict[str, "_Node"] = {}
+        self.star: Optional["_Node"] = None
+        self.hash: Optional["_Node"] = None
+        self.routes: List[int] = []
+
+
+class RouteTrie:
+    """
+    RouteTrie matches routing keys against topic patterns, as a topic exchange would: words are separated
+    by '.', '*' matches exactly one word and '#' matches zero or more words.
+
+    Patterns are compiled into a trie of their words, so matching a key walks it once word by word rather
+    than testing every pattern in turn. Only '#' branches the walk.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def add(self, pattern: str, route: int):
+        """Add a pattern
+
+        Args:
+            pattern (str): The topic pattern, e.g. 'orders.*.created'
+            route (int): The index of the route the pattern belongs to
+        """
+        node = self._root
+
+        for word in pattern.split("."):
+            if word == "*":
+                node.star = node.star or _Node()
+                node = node.star
+            elif word == "#":
+                node.hash = node.hash or _Node()
+                node = node.hash
+            else:
+                node = node.words.setdefault(word, _Node())
+
+        node.routes.append(route)
+
+    def match(self, routing_key: str) -> Set[int]:
+        """Find every route with a pattern matching a routing key
+
+        Args:
+            routing_key (str): The routing key of the message
+
+        Returns:
+            Set[int]: The indexes of the matching routes
+        """
+        words = routing_key.split(".")
+        matched: Set[int] = set()
+
+        # Each entry is a node, and the index of the next word it has to match
+        pending = [(self._root, 0)]
+        visited = set()
+
+        while pending:
+            node, position = pending.pop()
+
+            # Consecutive '#'s can reach the same node & position along many paths
+            if (id(node), position) in visited:
+                continue
+            visited.add((id(node), position))
+
+            # A '#' can match nothing at all, including at the end of the key
+            if node.hash is not None:
+                pending.extend(
+                    (node.hash, at) for at in range(position, len(words) + 1)
+                )
+
+            if position == len(words):
+                matched.update(node.routes)
+                continue
+
+            child = node.words.get(words[position])
+
+            if child is not None:
+                pending.append((child, position + 1))
+
+            if node.star is not None:
+                pending.append((node.star, position + 1))
+
+        return matched
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from inspect import unwrap
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .route_trie import RouteTrie
+
+# The name per-route metrics give messages handled by the listener's own function
+DEFAULT_ROUTE = "default"
+
+
+@dataclass
+class Route:
+    """
+    This stores which messages of a queue a function handles.
+    """
+
+    callback: Callable
+    # A topic pattern the routing key must match, e.g. 'orders.*.created'
+    routing_key: Optional[str] = None
+    # Headers the message must carry, with these exact values
+    headers: Optional[Dict[str, Any]] = None
+
+    @property
+    def name(self) -> str:
+        return self.callback.__qualname__
+
+    def same_function(self, function: Callable) -> bool:
+        return (
+            self.callback.__module__ == function.__module__
+            and self.callback.__qualname__ == function.__qualname__
+        )
+
+
+class Router:
+    """
+    Router picks the function a message goes to, out of the routes registered on a listener.
+
+    Routing keys are matched with a RouteTrie, and headers through an index of each (name, value) pair to
+    the routes wanting it, so picking a route costs the length of the key and the amount of headers, not
+    the amount of routes. When several routes match, the one registered first wins.
+    """
+
+    def __init__(self) -> None:
+        self.routes: List[Route] = []
+
+        self._trie = RouteTrie()
+        self._headers: Dict[Tuple[str, Any], List[int]] = {}
+
+    def add(self, route: Route):
+        """Add a route, after any other route of the same function (stacked decorators give a function many)
+
+        A hot reloaded module registers its routes again with new function objects, so routes of an older
+        definition of the function are replaced, the new routes taking the place of the first of them.
+
+        Args:
+            route (Route): The route
+
+        Raises:
+            ValueError: If the route has neither a routing key nor headers to match
+        """
+        if route.routing_key is None and not route.headers:
+            raise ValueError(
+                f"The route for '{route.name}' needs a routing key or headers to match"
+            )
+
+        # Stacked decorators each wrap the function, so compare what they wrap
+        original = unwrap(route.callback)
+        position = len(self.routes)
+        kept: List[Route] = []
+
+        for existing in self.routes:
+            if existing.same_function(route.callback):
+                if unwrap(existing.callback) is not original:
+                    position = min(position, len(kept))
+                    continue
+
+                position = len(kept) + 1
+
+            kept.append(existing)
+
+        kept.insert(min(position, len(kept)), route)
+        self.routes = kept
+
+        self._compile()
+
+    def _compile(self):
+        """Rebuild the trie & header index from the routes"""
+        self._trie = RouteTrie()
+        self._headers = {}
+
+        for index, route in enumerate(self.routes):
+            if route.routing_key is not None:
+                self._trie.add(route.routing_key, index)
+
+            for pair in (route.headers or {}).items():
+                self._headers.setdefault(pair, []).append(index)
+
+    @property
+    def names(self) -> List[str]:
+        """The name of every route, in order, followed by the default route's"""
+        return [route.name for route in self.routes] + [DEFAULT_ROUTE]
+
+    def match(
+        self, routing_key: Optional[str], headers: Optional[Dict[str, Any]]
+    ) -> Optional[int]:
+        """Pick the route for a message
+
+        Args:
+            routing_key (Optional[str]): The routing key the message was published with
+            headers (Optional[Dict[str, Any]]): The message headers
+
+        Returns:
+            Optional[int]: The index of the route, None if no route matches
+        """
+        by_key = self._trie.match(routing_key) if routing_key is not None else set()
+
+        # How many of each route's headers the message carries
+        by_headers: Dict[int, int] = {}
+
+        for pair in (headers or {}).items():
+            try:
+                indexes = self._headers.get(pair, ())
+            except TypeError:
+                # Tables & arrays can't be indexed, and no route can ask for them
+                continue
+
+            for index in indexes:
+                by_headers[index] = by_headers.get(index, 0) + 1
+
+        for index in sorted(by_key | by_headers.keys()):
+            route = self.routes[index]
+
+            if route.routing_key is not None and index not in by_key:
+                continue
+
+            if route.headers and by_headers.get(index, 0) < len(route.headers):
+                continue
+
+            return index
+
+        return None
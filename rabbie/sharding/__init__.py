@@ -0,0 +1 @@
+from .sharding import shard_name, shard_names, ShardSelector  # noqa: F401
@@ -0,0 +1,60 @@
+import zlib
+from itertools import count
+from typing import Any, List, Optional
+
+
+def shard_name(queue: str, shard: int) -> str:
+    """Get the physical queue name for a given shard of a logical queue
+
+    Args:
+        queue (str): The logical queue name
+        shard (int): The index of the shard
+
+    Returns:
+        str: The physical queue name, i.e. 'orders.0'
+    """
+    return f"{queue}.{shard}"
+
+
+def shard_names(queue: str, shards: int) -> List[str]:
+    """Get every physical queue name for a logical queue
+
+    Args:
+        queue (str): The logical queue name
+        shards (int): The amount of shards the queue is split across
+
+    Returns:
+        List[str]: The physical queue names, i.e. ['orders.0', 'orders.1']
+    """
+    return [shard_name(queue, shard) for shard in range(shards)]
+
+
+class ShardSelector:
+    """
+    ShardSelector picks which physical queue a message for a sharded queue is published to.
+
+    Messages with a key are always sent to the same shard, messages without a key are spread round-robin.
+    """
+
+    def __init__(self, queue: str, shards: int) -> None:
+        self.queue = queue
+        self.shards = shards
+
+        self._counter = count()
+
+    def select(self, key: Optional[Any] = None) -> str:
+        """Select the physical queue to publish to
+
+        Args:
+            key (Optional[Any], optional): The key to hash into a shard. Defaults to None (round-robin).
+
+        Returns:
+            str: The physical queue name
+        """
+        if key is None:
+            shard = next(self._counter) % self.shards
+        else:
+            # Python's hash() is salted per process, crc32 keeps the mapping stable across producers
+            shard = zlib.crc32(str(key).encode("utf-8")) % self.shards
+
+        return shard_name(self.queue, shard)
@@ -1 +1,2 @@
 from .supervisor import Supervisor as Supervisor
+from .reloading import ModuleGraph, latest  # noqa: F401
@@ -0,0 +1,241 @@
+import ast
+import os
+import sys
+import sysconfig
+import importlib
+import importlib.util
+from inspect import unwrap
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set
+
+# Modules living in these directories are never the user's, so are never reloaded
+_EXCLUDED_DIRECTORIES = [
+    os.path.abspath(path)
+    for path in {
+        sysconfig.get_paths()["stdlib"],
+        sysconfig.get_paths()["purelib"],
+        sysconfig.get_paths()["platlib"],
+        os.path.dirname(os.path.dirname(__file__)),
+    }
+]
+
+
+class ModuleGraph:
+    """
+    ModuleGraph maps which of the user's modules import which, so a change to one file only reloads the
+    module it belongs to and the modules that depend on it.
+
+    Only modules already imported from within the root directory are included, the standard library,
+    installed packages and Rabbie itself are left alone.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._root = os.path.abspath(root)
+
+        # Module name -> the user modules it imports
+        self.imports: Dict[str, Set[str]] = {}
+        # Module name -> the user modules that import it
+        self.dependents: Dict[str, Set[str]] = {}
+        # Absolute file path -> module name
+        self._files: Dict[str, str] = {}
+
+        self.build()
+
+    def build(self):
+        """
+        (Re)build the graph from the currently imported modules.
+        """
+        self._files = {
+            path: name
+            for name, path in (
+                (name, self._module_path(module))
+                for name, module in list(sys.modules.items())
+            )
+            if path is not None
+        }
+
+        modules = set(self._files.values())
+        self.imports = {
+            name: self._parse_imports(name, path) & modules
+            for path, name in self._files.items()
+        }
+
+        self.dependents = {name: set() for name in modules}
+        for name, imported in self.imports.items():
+            for dependency in imported:
+                self.dependents[dependency].add(name)
+
+    def module_for(self, path: str) -> Optional[str]:
+        """Get the name of the user module loaded from a file
+
+        Args:
+            path (str): The path of the file
+
+        Returns:
+            Optional[str]: The module name, or None if the file isn't an imported user module
+        """
+        return self._files.get(os.path.abspath(path))
+
+    @property
+    def paths(self) -> List[str]:
+        """
+        The source files of every user module in the graph.
+        """
+        return list(self._files)
+
+    def affected(self, *modules: str) -> List[str]:
+        """Get the given modules and every module that depends on them, in the order they should be reloaded
+
+        Dependencies always come before the modules importing them, so each reloaded module sees the
+        fresh version of what it imports.
+
+        Args:
+            modules (str): The modules that changed
+
+        Returns:
+            List[str]: The module names to reload
+        """
+        affected = set(modules)
+        pending = deque(modules)
+
+        while pending:
+            for dependent in self.dependents.get(pending.popleft(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+
+        # Topologically sort the affected modules, any import cycles are broken by name order
+        remaining = {
+            name: self.imports.get(name, set()) & affected for name in affected
+        }
+        ordered = []
+
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps) or [
+                min(remaining)
+            ]
+
+            for name in ready:
+                ordered.append(name)
+                remaining.pop(name)
+
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+        return ordered
+
+    def reload(self, *modules: str) -> List[str]:
+        """Reload the given modules and everything depending on them, each only once
+
+        `__main__` can't be reloaded without re-running the program, so it is skipped.
+
+        Args:
+            modules (str): The modules that changed
+
+        Returns:
+            List[str]: The names of the modules that were reloaded
+        """
+        reloaded = []
+
+        for name in self.affected(*modules):
+            if name == "__main__":
+                continue
+
+            importlib.reload(sys.modules[name])
+            reloaded.append(name)
+
+        # Imports may have changed along with the code
+        self.build()
+
+        return reloaded
+
+    def _module_path(self, module) -> Optional[str]:
+        """Get the source file of a module, if it's one of the user's
+
+        Args:
+            module (ModuleType): The module
+
+        Returns:
+            Optional[str]: The absolute source path, or None if this isn't a user module
+        """
+        path = getattr(module, "__file__", None)
+
+        if not path or not path.endswith(".py"):
+            return None
+
+        path = os.path.abspath(path)
+
+        if not path.startswith(self._root + os.sep):
+            return None
+
+        if any(
+            path.startswith(excluded + os.sep) for excluded in _EXCLUDED_DIRECTORIES
+        ):
+            return None
+
+        return path
+
+    def _parse_imports(self, name: str, path: str) -> Set[str]:
+        """Find every module a source file imports, without executing it
+
+        Args:
+            name (str): The name of the module
+            path (str): The source file of the module
+
+        Returns:
+            Set[str]: The names of every module (and parent package) imported
+        """
+        try:
+            with open(path, "rb") as file:
+                tree = ast.parse(file.read(), path)
+        except (OSError, SyntaxError, ValueError):
+            return set()
+
+        module = sys.modules.get(name)
+        package = getattr(module, "__package__", None) or ""
+
+        imported = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                targets = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = "." * node.level + (node.module or "")
+
+                try:
+                    base = importlib.util.resolve_name(base, package)
+                except (ImportError, ValueError):
+                    continue
+
+                # 'from package import module' imports a module, 'from module import name' does not
+                targets = [base] + [f"{base}.{alias.name}" for alias in node.names]
+            else:
+                continue
+
+            for target in targets:
+                # Importing 'a.b.c' also imports 'a' and 'a.b'
+                parts = target.split(".")
+                imported.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+        imported.discard(name)
+        return imported
+
+
+def latest(function: Callable) -> Callable:
+    """Find the current version of a function after its module has been reloaded
+
+    Args:
+        function (Callable): The function as it was before reloading
+
+    Returns:
+        Callable: The reloaded function, or the original if it can no longer be found
+    """
+    target = sys.modules.get(function.__module__)
+
+    for attribute in function.__qualname__.split("."):
+        target = getattr(target, attribute, None)
+
+    if not callable(target):
+        return function
+
+    # Listener decorators wrap the function, the handler itself is the innermost one
+    return unwrap(target)
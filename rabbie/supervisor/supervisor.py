@@ -1,30 +1,54 @@
-# Brainstorm
-
-# Register a FileWatcher for all files in given directory
-# Create an event callback that filters out Regex files (ones that don't end in .py)
-# Take the main thread function as an argument in init
-# After Supervisor has setup all above, run the main thread function in a process
-# The main thread can be halted.
-# The event handler should reload the given file in the event
-# The event handler should then call the Supervisor and say reload
-# The supervisor should then join the current process
-# When the current process is finished, plainly start the process again like it did before
 import os
 import re
-from typing import Callable
-from types import ModuleType
+import time
+import hashlib
+import threading
+import traceback
+from fnmatch import fnmatch
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
 from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver, ObservedWatch
 from watchdog.observers.polling import PollingObserverVFS
 
-import importlib
-from pydoc import importfile
-
+from .reloading import ModuleGraph
 from ..logger import logger as log
 
-import sys
+# Files & directories that never hold code worth reloading
+DEFAULT_IGNORE = [
+    ".git",
+    ".hg",
+    "__pycache__",
+    "*.pyc",
+    ".venv",
+    "venv",
+    "env",
+    ".tox",
+    ".nox",
+    "site-packages",
+    "node_modules",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+]
 
 
 class Supervisor:
+    """
+    Supervisor watches a directory for changes, and reloads only the modules affected by a change.
+
+    The modules that were reloaded are passed to the reload function, which is expected to restart only
+    the listeners whose handlers live in them, leaving every other worker (and its connection) running.
+
+    Changes are picked up with the platform's native file watcher (inotify on Linux), falling back to
+    polling when that isn't available. Bursts of changes (such as an editor saving) are debounced into a
+    single reload, and files whose content hasn't actually changed are skipped.
+
+    Each directory is watched on its own, skipping ignored directories (and everything under them), so
+    neither inotify watches nor polling are spent on version control, virtualenvs or node_modules.
+    """
+
     def __init__(
         self,
         path: str,
@@ -32,6 +56,10 @@ class Supervisor:
         recursive: bool = True,
         start_function: Callable = None,
         stop_function: Callable = None,
+        reload_function: Callable[[List[str]], int] = None,
+        ignore: Iterable[str] = DEFAULT_IGNORE,
+        debounce: float = 0.2,
+        polling: bool = False,
     ) -> None:
         # Function to run when the Supervisor has started
         self._start_function = start_function
@@ -39,13 +67,102 @@ class Supervisor:
         # Function to call when the supervisor is stopping/restarting
         self._stop_function = stop_function
 
-        self._event_handler = FileChangeEvent(regex, self)
-        self._observer = PollingObserverVFS(
-            stat=os.stat, listdir=os.scandir, polling_interval=0.1
-        )
+        # Function to call with the reloaded module names, returns how many listeners it restarted
+        self._reload_function = reload_function
 
         self._path = path
-        self._observer.schedule(self._event_handler, self._path, recursive=recursive)
+        self._recursive = recursive
+
+        self._event_handler = FileChangeEvent(regex, list(ignore), self)
+
+        # The watch of each watched directory, by its absolute path
+        self._watches: Dict[str, ObservedWatch] = {}
+        self._observer = self._create_observer(polling)
+
+        # Changed files wait here until no more changes have arrived for the debounce period
+        self._debounce = debounce
+        self._changed: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+
+        # Content hashes of every watched module, so saving without changes doesn't reload
+        self._hashes: Dict[str, bytes] = {}
+
+        # The graph is built when we start listening, once the user's modules have all been imported
+        self._graph: ModuleGraph = None
+        self._lock = threading.Lock()
+
+    def _create_observer(self, polling: bool) -> BaseObserver:
+        """Create an observer watching our path
+
+        Args:
+            polling (bool): Use a polling observer rather than the native one
+
+        Returns:
+            BaseObserver: The observer
+        """
+        if polling:
+            observer = PollingObserverVFS(
+                stat=os.stat, listdir=os.scandir, polling_interval=1
+            )
+        else:
+            observer = Observer()
+
+        self._observer = observer
+        self._watches = {}
+        self.watch(self._path)
+
+        return observer
+
+    def watch(self, directory: str):
+        """Watch a directory, and every directory under it that isn't ignored when watching recursively
+
+        Args:
+            directory (str): The path of the directory
+        """
+        if not self._recursive:
+            self._schedule(directory)
+            return
+
+        for path, subdirectories, _ in os.walk(directory):
+            # Pruning ignored directories here keeps the walk out of them too
+            subdirectories[:] = [
+                name
+                for name in subdirectories
+                if not self._event_handler.ignored(os.path.join(path, name))
+            ]
+            self._schedule(path)
+
+    def unwatch(self, directory: str):
+        """Stop watching a directory that was removed, along with every directory under it
+
+        Args:
+            directory (str): The path of the directory
+        """
+        directory = os.path.abspath(directory)
+
+        for path in [
+            path
+            for path in self._watches
+            if path == directory or path.startswith(directory + os.sep)
+        ]:
+            try:
+                self._observer.unschedule(self._watches.pop(path))
+            except KeyError:
+                # The observer already dropped the watch along with the directory
+                pass
+
+    def _schedule(self, directory: str):
+        """Watch a single directory, unless it's watched already
+
+        Args:
+            directory (str): The path of the directory
+        """
+        directory = os.path.abspath(directory)
+
+        if directory not in self._watches:
+            self._watches[directory] = self._observer.schedule(
+                self._event_handler, directory, recursive=False
+            )
 
     def stop(self):
         log.debug("Stopping runner")
@@ -60,68 +177,173 @@ class Supervisor:
         log.debug("Starting runner")
         self._start_function()
 
+    def notify(self, path: str):
+        """Record a changed file, reloading once the changes have settled
+
+        Args:
+            path (str): The path of the changed file
+        """
+        with self._lock:
+            self._changed.add(os.path.abspath(path))
+
+            if self._timer:
+                self._timer.cancel()
+
+            self._timer = threading.Timer(self._debounce, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        """
+        Reload every file that has changed since the last reload.
+        """
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            self._timer = None
+
+        self.reload(*[path for path in changed if self._content_changed(path)])
+
+    def _content_changed(self, path: str) -> bool:
+        """Check whether a file's content differs from when we last saw it
+
+        Args:
+            path (str): The path of the file
+
+        Returns:
+            bool: True if the content changed, False if it's the same (or the file is gone)
+        """
+        try:
+            with open(path, "rb") as file:
+                digest = hashlib.blake2b(file.read(), digest_size=16).digest()
+        except OSError:
+            return False
+
+        if self._hashes.get(path) == digest:
+            log.debug(f"{path} content unchanged, skipping reload")
+            return False
+
+        self._hashes[path] = digest
+        return True
+
+    def reload(self, *paths: str):
+        """Reload the modules the changed files belong to, along with their dependents
+
+        Args:
+            paths (str): The paths of the changed files
+        """
+        with self._lock:
+            modules = {self._graph.module_for(path) for path in paths}
+            modules.discard(None)
+
+            if "__main__" in modules:
+                log.warning(
+                    "Changes to the entry script can't be hot reloaded, restart to apply them"
+                )
+                modules.discard("__main__")
+
+            if not modules:
+                return
+
+            started = time.perf_counter()
+
+            try:
+                reloaded = self._graph.reload(*sorted(modules))
+            except Exception:
+                traceback.print_exc()
+                log.error(
+                    f"[red]Failed to reload {', '.join(sorted(modules))}, listeners will keep running the previous code"
+                )
+                return
+
+            restarted = self._reload_function(reloaded) if self._reload_function else 0
+
+            log.info(
+                f"[green]Reloaded {len(reloaded)} {'module' if len(reloaded) == 1 else 'modules'} "
+                f"and restarted {restarted} {'listener' if restarted == 1 else 'listeners'} "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+
     def listen(self):
         log.info(f"Listening for changes in '{self._path}'")
-        self._observer.start()
+        self._graph = ModuleGraph(self._path)
+
+        for path in self._graph.paths:
+            self._content_changed(path)
+
+        try:
+            self._observer.start()
+        except OSError as exc:
+            # Most often the inotify watch limit has been hit
+            log.warning(
+                f"Native file watching unavailable ({exc}), falling back to polling"
+            )
+            self._observer = self._create_observer(polling=True)
+            self._observer.start()
+
         self.start()
 
 
 class FileChangeEvent(FileSystemEventHandler):
-    def __init__(self, regex: str, supervisor: Supervisor) -> None:
+    def __init__(self, regex: str, ignore: List[str], supervisor: Supervisor) -> None:
         super().__init__()
 
         self.pattern = regex
+        self.ignore = ignore
         self.supervisor = supervisor
 
+        # Only the part of a path below the watched directory is matched, wherever the project itself lives
+        self.root = os.path.abspath(supervisor._path)
+
     def on_any_event(self, event):
-        # Under no circumstances do we want to reload a directory
+        # Under no circumstances do we want to reload a directory, but new ones need watching
         if event.is_directory:
+            self._on_directory_event(event)
+            return
+
+        # Only events that can leave a file with new content matter, not opens, reads or deletes
+        if event.event_type not in ("created", "modified", "moved", "closed"):
             return
 
-        path: str = event.src_path
+        path: str = event.dest_path if event.event_type == "moved" else event.src_path
+
+        if self.ignored(path):
+            return
 
         log.debug(f"Detected change in {path}")
         # This should counteract the directory check anyways, but check that our file path matches our regex
         if re.search(pattern=self.pattern, string=path):
-            # module = importfile(path)
-            # log.warning(f"Detected changes in {module.__name__}, listeners will reload...")
-
-            # Stop the supervisor listeners
-            self.supervisor.stop()
+            self.supervisor.notify(path)
 
-            log.critical("[bold red]STOPPED")
+    def _on_directory_event(self, event):
+        """Keep the watches in step with directories being created, moved & removed
 
-            # Reload the module so it loads up when nothing is running.
-            # self.reloadModuleWithChildren(module)
-            # Get a list of all imported modules
-            log.debug(sys.modules)
-            modules = [m for m in sys.modules.values() if m is not None]
+        Args:
+            event: The watchdog event for the directory
+        """
+        if event.event_type in ("deleted", "moved"):
+            self.supervisor.unwatch(event.src_path)
 
-            # Reload all modules that were imported from __main__
-            for module in modules:
-                if hasattr(module, "__name__"):
-                    log.debug(f"Reloading {module.__name__}")
-                    importlib.reload(module)
+        if event.event_type in ("created", "moved") and self.supervisor._recursive:
+            path: str = (
+                event.dest_path if event.event_type == "moved" else event.src_path
+            )
 
-            log.debug("Reloaded module")
+            if not self.ignored(path):
+                self.supervisor.watch(path)
 
-            # TODO: First empty the listeners list (keep a copy for future)
+    def ignored(self, path: str) -> bool:
+        """Check whether any part of a path, below the watched directory, matches an ignore glob
 
-            # TODO: First reload the changed module, this module could have updated logic outside of listeners
+        Args:
+            path (str): The path of the changed file or directory
 
-            # TODO: Then reload all of the known listener modules (ensure that no duplicate function from before was added)
+        Returns:
+            bool: True if the change should be ignored
+        """
+        relative = os.path.relpath(os.path.abspath(path), self.root)
 
-            # TODO: Then start the code back up again with the new listeners
-
-            # Start the supervisor listeners again
-            self.supervisor.start()
-
-    def reloadModuleWithChildren(self, mod):
-        # import inspect
-        log.debug(f"Reloading {mod.__name__}")
-        mod = importlib.reload(mod)
-        # for k, v in mod.__dict__.items():
-        #     # v = inspect.getmodule(v)
-        #     if isinstance(v, ModuleType):
-        #         reloaded_child = importlib.reload(v)
-        #         setattr(mod, k, importlib.import_module(v.__name__))
+        return any(
+            fnmatch(part, pattern)
+            for part in relative.split(os.sep)
+            for pattern in self.ignore
+        )
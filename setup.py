@@ -18,6 +18,7 @@ setup(
     license="MIT license",
     packages=find_packages(exclude=["test"]),
     install_requires=requirements,
+    python_requires=">=3.7",
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,168 @@
+import pytest
+
+from rabbie.broker_types import AckCoalescer, AckPolicy
+
+
+class FakeChannel:
+    """Settles delivery tags like the broker does, failing on a tag that's unknown or already settled"""
+
+    def __init__(self, delivered: int) -> None:
+        self.is_open = True
+        self.unsettled = set(range(1, delivered + 1))
+        self.frames = []
+
+    def _settle(self, delivery_tag: int, multiple: bool):
+        if delivery_tag not in self.unsettled:
+            raise AssertionError(f"unknown delivery tag {delivery_tag}")
+
+        if multiple:
+            self.unsettled = {tag for tag in self.unsettled if tag > delivery_tag}
+        else:
+            self.unsettled.discard(delivery_tag)
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False):
+        self.frames.append(("ack", delivery_tag, multiple))
+        self._settle(delivery_tag, multiple)
+
+    def basic_nack(self, delivery_tag: int, multiple: bool = False, requeue=True):
+        self.frames.append(("nack", delivery_tag, multiple))
+        self._settle(delivery_tag, multiple)
+
+
+class FakeConnection:
+    def call_later(self, delay, callback):
+        pass
+
+
+def _coalescer(delivered: int):
+    channel = FakeChannel(delivered)
+    # Nothing is flushed until the test says so
+    coalescer = AckCoalescer(
+        channel, FakeConnection(), AckPolicy(max_pending=1000, interval=1000)
+    )
+
+    for tag in range(1, delivered + 1):
+        coalescer.track(tag)
+
+    return coalescer, channel
+
+
+class TestAckCoalescer:
+    # Tests that tags acknowledged in order go out as one multiple acknowledgement.
+    def test_in_order(self):
+        coalescer, channel = _coalescer(5)
+
+        for tag in range(1, 6):
+            coalescer.acknowledge(tag)
+        coalescer.flush()
+
+        assert channel.frames == [("ack", 5, True)]
+        assert not channel.unsettled
+
+    # Tests that tags completed out of order are only settled once, however many flushes follow.
+    def test_out_of_order(self):
+        coalescer, channel = _coalescer(4)
+
+        coalescer.acknowledge(3)
+        coalescer.flush()
+        assert channel.frames == [("ack", 3, False)]
+
+        coalescer.acknowledge(1)
+        coalescer.acknowledge(2)
+        coalescer.flush()
+
+        # Tag 3 was already sent, so the multiple acknowledgement stops below it
+        assert channel.frames[1:] == [("ack", 2, True)]
+
+        coalescer.acknowledge(4)
+        coalescer.flush()
+        coalescer.flush()
+
+        assert channel.frames[2:] == [("ack", 4, True)]
+        assert not channel.unsettled
+
+    # Tests that a rejected tag isn't acknowledged once the floor passes it.
+    def test_reject_then_flush(self):
+        coalescer, channel = _coalescer(3)
+
+        coalescer.reject(requeue=False, delivery_tag=2)
+        coalescer.acknowledge(1)
+        coalescer.flush()
+
+        assert channel.frames == [("nack", 2, False), ("ack", 1, True)]
+
+        coalescer.acknowledge(3)
+        coalescer.flush()
+
+        assert channel.frames[2:] == [("ack", 3, True)]
+        assert not channel.unsettled
+
+    # Tests that a tag rejected while the floor sits right below it isn't acknowledged again.
+    def test_reject_at_floor(self):
+        coalescer, channel = _coalescer(3)
+
+        coalescer.acknowledge(1)
+        coalescer.reject(delivery_tag=2)
+        coalescer.flush()
+        coalescer.acknowledge(3)
+        coalescer.flush()
+
+        assert channel.frames == [
+            ("ack", 1, True),
+            ("nack", 2, False),
+            ("ack", 3, True),
+        ]
+
+    # Tests that rejecting many tags at once settles everything below them.
+    def test_reject_multiple(self):
+        coalescer, channel = _coalescer(4)
+
+        coalescer.acknowledge(3)
+        coalescer.reject(delivery_tag=2, multiple=True)
+        coalescer.acknowledge(4)
+        coalescer.flush()
+        coalescer.flush()
+
+        assert channel.frames == [
+            ("ack", 3, False),
+            ("nack", 2, True),
+            ("ack", 4, True),
+        ]
+        assert not channel.unsettled
+
+    # Tests that acknowledging 'all outstanding' covers every tracked delivery.
+    def test_acknowledge_all(self):
+        coalescer, channel = _coalescer(3)
+
+        coalescer.acknowledge(2)
+        coalescer.flush()
+        coalescer.acknowledge(0, multiple=True)
+        coalescer.flush()
+
+        assert channel.frames == [("ack", 2, False), ("ack", 3, True)]
+        assert not channel.unsettled
+
+    # Tests that the policy's pending threshold flushes without being asked.
+    def test_flushes_at_max_pending(self):
+        channel = FakeChannel(2)
+        coalescer = AckCoalescer(
+            channel, FakeConnection(), AckPolicy(max_pending=2, interval=1000)
+        )
+
+        coalescer.acknowledge(1)
+        assert channel.frames == []
+
+        coalescer.acknowledge(2)
+        assert channel.frames == [("ack", 2, True)]
+
+
+@pytest.mark.parametrize("order", [[2, 1, 3], [3, 2, 1], [1, 3, 2]])
+# Tests that every completion order settles every tag exactly once, flushing after each acknowledgement.
+def test_every_order_settles_once(order):
+    coalescer, channel = _coalescer(3)
+
+    for tag in order:
+        coalescer.acknowledge(tag)
+        coalescer.flush()
+
+    assert not channel.unsettled
@@ -0,0 +1,149 @@
+import os
+import stat
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.admin import AdminClient, AdminError, AdminServer
+
+
+class FakeConsumer:
+    """Records the commands it's given, failing for queues it doesn't know"""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def _check(self, queue):
+        if queue != "orders":
+            raise ValueError(f"No listener consumes '{queue}'")
+
+    def status(self):
+        return [{"queue": "orders"}]
+
+    def scale(self, queue, workers):
+        self._check(queue)
+        self.calls.append(("scale", queue, workers))
+
+    def set_prefetch(self, queue, count):
+        self._check(queue)
+        self.calls.append(("prefetch", queue, count))
+
+    def pause(self, queue):
+        # Stands in for anything going wrong inside the consumer
+        raise RuntimeError("Listener isn't prepared")
+
+    def resume(self, queue):
+        self.calls.append(("resume", queue))
+
+    def drain(self, queue):
+        self.calls.append(("drain", queue))
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = AdminServer(FakeConsumer(), str(tmp_path / "admin.sock"))
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+class TestAnswer:
+    # Tests that commands are carried out with their arguments, converted to numbers where needed.
+    def test_command(self):
+        server = AdminServer(FakeConsumer())
+
+        assert server.answer(
+            b'{"command": "scale", "queue": "orders", "workers": "3"}'
+        ) == {"result": None}
+        assert server.answer(b'{"command": "status"}') == {
+            "result": [{"queue": "orders"}]
+        }
+        assert server.consumer.calls == [("scale", "orders", 3)]
+
+    # Tests that requests which aren't a JSON object with a command are refused.
+    def test_malformed(self):
+        server = AdminServer(FakeConsumer())
+
+        for line in [b"not json", b"[]", b"{}"]:
+            assert "error" in server.answer(line)
+
+    # Tests that unknown commands & bad arguments are reported as errors.
+    def test_bad_request(self):
+        server = AdminServer(FakeConsumer())
+
+        assert server.answer(b'{"command": "explode"}') == {
+            "error": "Unknown command 'explode'"
+        }
+        assert "error" in server.answer(b'{"command": "scale", "queue": "orders"}')
+        assert "error" in server.answer(
+            b'{"command": "scale", "queue": "orders", "workers": "many"}'
+        )
+
+    # Tests that any exception raised by the consumer is sent back as the error.
+    def test_consumer_error(self):
+        server = AdminServer(FakeConsumer())
+
+        assert server.answer(b'{"command": "pause", "queue": "orders"}') == {
+            "error": "Listener isn't prepared"
+        }
+
+
+class TestAdminClient:
+    # Tests that commands sent by the client reach the consumer, and results come back.
+    def test_round_trip(self, server):
+        client = AdminClient(server.path)
+
+        assert client.status() == [{"queue": "orders"}]
+
+        client.scale("orders", 2)
+        client.set_prefetch("orders", 10)
+        client.resume("orders")
+        client.drain("orders")
+
+        assert server.consumer.calls == [
+            ("scale", "orders", 2),
+            ("prefetch", "orders", 10),
+            ("resume", "orders"),
+            ("drain", "orders"),
+        ]
+
+    # Tests that errors are raised as AdminError, and the server keeps answering after them.
+    def test_errors(self, server):
+        client = AdminClient(server.path)
+
+        with pytest.raises(AdminError, match="No listener consumes 'invoices'"):
+            client.scale("invoices", 2)
+
+        with pytest.raises(AdminError, match="Listener isn't prepared"):
+            client.pause("orders")
+
+        assert client.status() == [{"queue": "orders"}]
+
+    # Tests that only the consumer's user can reach the socket, which is bound in place and removed once stopped.
+    def test_socket(self, server):
+        assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+        assert os.listdir(os.path.dirname(server.path)) == ["admin.sock"]
+
+        server.stop()
+
+        assert not os.path.exists(server.path)
+
+
+class TestConsumerAdmin:
+    # Tests that the consumer removes its admin socket when it exits.
+    def test_stopped_on_exit(self, tmp_path, monkeypatch):
+        consumer = Consumer(
+            host="localhost", port=5672, admin_socket=str(tmp_path / "admin.sock")
+        )
+        monkeypatch.setattr(consumer, "_stop_listeners", lambda: None)
+
+        consumer._admin = AdminServer(consumer, consumer.admin_socket)
+        consumer._admin.start()
+
+        with pytest.raises(SystemExit):
+            consumer._exit()
+
+        assert consumer._admin is None
+        assert not os.path.exists(consumer.admin_socket)
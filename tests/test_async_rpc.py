@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from pika import BasicProperties as Properties
+
+from rabbie import AsyncProducer
+from rabbie.producer import PublishError
+from rabbie.producer.publisher import AsyncPublisher
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.consumers = 0
+
+    def basic_consume(self, queue, on_message_callback, auto_ack, callback):
+        self.consumers += 1
+        # The broker confirms the consumer a little later
+        asyncio.get_running_loop().call_later(0.01, callback, None)
+
+
+def _publisher():
+    publisher = AsyncPublisher(connection_parameters=None)
+    publisher.channel = FakeChannel()
+    sent = []
+
+    async def publish(body, properties=None, **kwargs):
+        sent.append(properties)
+        reply = Properties(correlation_id=properties.correlation_id)
+        asyncio.get_running_loop().call_soon(
+            publisher._on_reply, None, None, reply, body
+        )
+
+    publisher.publish = publish
+
+    return publisher, sent
+
+
+class TestAsyncPublisherRpc:
+    # Tests that concurrent calls share a single reply consumer.
+    def test_one_reply_consumer(self):
+        publisher, _ = _publisher()
+
+        async def main():
+            return await asyncio.gather(
+                *(publisher.rpc(f"{n}".encode(), queue="q") for n in range(5))
+            )
+
+        replies = asyncio.run(main())
+
+        assert publisher.channel.consumers == 1
+        assert replies == [b"0", b"1", b"2", b"3", b"4"]
+
+    # Tests that concurrent calls sharing properties each get their own correlation id.
+    def test_shared_properties(self):
+        publisher, sent = _publisher()
+        shared = Properties(headers={"kind": "x"})
+
+        async def main():
+            await asyncio.gather(
+                *(publisher.rpc(b"", queue="q", properties=shared) for _ in range(3))
+            )
+
+        asyncio.run(main())
+
+        assert len({properties.correlation_id for properties in sent}) == 3
+        assert shared.correlation_id is None
+
+
+class TestAsyncProducerRpc:
+    # Tests that concurrent first calls open a single RPC connection.
+    def test_one_connection(self):
+        producer = AsyncProducer(host="localhost", port=5672)
+        opened = []
+
+        class FakePublisher:
+            async def open(self):
+                opened.append(self)
+                await asyncio.sleep(0.01)
+
+            async def rpc(self, body, **kwargs):
+                return body
+
+        producer.connect = lambda *args, **kwargs: FakePublisher()
+
+        async def main():
+            return await asyncio.gather(*(producer.rpc(n, queue="q") for n in range(5)))
+
+        assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+        assert len(opened) == 1
+
+
+class PublishingChannel:
+    def __init__(self) -> None:
+        self.published = []
+
+    def basic_publish(self, **kwargs):
+        self.published.append(kwargs["body"])
+
+
+def _opened_publisher(max_in_flight: int):
+    """A publisher as open() leaves it, without a broker"""
+    publisher = AsyncPublisher(connection_parameters=None, max_in_flight=max_in_flight)
+    publisher.channel = PublishingChannel()
+    publisher._window = asyncio.Semaphore(max_in_flight)
+    publisher._unblocked = asyncio.Event()
+    publisher._unblocked.set()
+    publisher._closed = asyncio.get_running_loop().create_future()
+
+    return publisher
+
+
+class TestAsyncPublisherClose:
+    # Tests that publishes waiting for the in-flight window raise once the connection closes.
+    def test_wakes_window_waiters(self):
+        async def main():
+            publisher = _opened_publisher(max_in_flight=1)
+            confirmed = await publisher.publish(b"1")
+
+            waiting = [
+                asyncio.ensure_future(publisher.publish(f"{n}".encode()))
+                for n in range(3)
+            ]
+            await asyncio.sleep(0)
+            assert not any(task.done() for task in waiting)
+
+            publisher._on_connection_closed(None, "gone")
+            results = await asyncio.gather(*waiting, return_exceptions=True)
+
+            with pytest.raises(PublishError):
+                await confirmed
+
+            return results, publisher.channel.published
+
+        results, published = asyncio.run(main())
+
+        assert all(isinstance(result, PublishError) for result in results)
+        assert published == [b"1"]
+
+    # Tests that publishes waiting for the broker to unblock raise once the connection closes.
+    def test_wakes_blocked_waiters(self):
+        async def main():
+            publisher = _opened_publisher(max_in_flight=10)
+            publisher._unblocked.clear()
+
+            waiting = asyncio.ensure_future(publisher.publish(b"1"))
+            await asyncio.sleep(0)
+            assert not waiting.done()
+
+            publisher._on_connection_closed(None, "gone")
+
+            with pytest.raises(PublishError):
+                await waiting
+
+        asyncio.run(main())
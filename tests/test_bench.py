@@ -0,0 +1,129 @@
+import json
+import importlib
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.bench import Benchmark
+from rabbie.logger import logger
+
+bench_main = importlib.import_module("rabbie.bench.__main__")
+
+CONSUMER_MODULE = """
+from rabbie import Consumer
+
+consumer = Consumer(host="localhost", port=5672)
+consumer.listen("bench", encoder=None)(lambda body: None)
+"""
+
+
+@pytest.fixture
+def consumer_module(tmp_path, monkeypatch):
+    """A module holding a consumer, importable by name like the CLI's users would give"""
+    (tmp_path / "bench_consumer.py").write_text(CONSUMER_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    return "bench_consumer"
+
+
+class TestBenchmark:
+    # Tests that every combination of settings runs against a LocalBroker, handling every message.
+    def test_run_local(self):
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.listen("bench", encoder=None)(lambda body: None)
+
+        benchmark = Benchmark(
+            consumer, "bench", messages=20, size=8, local=True, timeout=10
+        )
+        results = benchmark.run(workers=[1, 2], prefetch=[5], publishers=[1])
+
+        assert [(r.workers, r.prefetch, r.publishers) for r in results] == [
+            (1, 5, 1),
+            (2, 5, 1),
+        ]
+        assert all(result.messages == 20 for result in results)
+        assert all(result.throughput > 0 for result in results)
+        assert all(result.p50 <= result.p99 <= result.max for result in results)
+
+    # Tests that a queue without a listener is rejected.
+    def test_unknown_queue(self):
+        consumer = Consumer(host="localhost", port=5672)
+
+        with pytest.raises(ValueError):
+            Benchmark(consumer, "missing")
+
+
+class TestMain:
+    # Tests that the CLI's arguments reach the benchmark, with comma separated settings split up.
+    def test_arguments(self, consumer_module, monkeypatch):
+        runs = []
+
+        class RecordingBenchmark:
+            def __init__(self, consumer, queue, **options):
+                runs.append((consumer, queue, options))
+
+            def run(self, workers, prefetch, publishers):
+                runs.append((workers, prefetch, publishers))
+                return []
+
+        monkeypatch.setattr(bench_main, "Benchmark", RecordingBenchmark)
+
+        assert (
+            bench_main.main(
+                [
+                    f"{consumer_module}:consumer",
+                    "--workers",
+                    "1,2,4",
+                    "--prefetch",
+                    "10",
+                    "--publishers",
+                    "1,2",
+                    "--messages",
+                    "500",
+                    "--size",
+                    "64",
+                    "--rate",
+                    "100",
+                    "--encoder",
+                    "raw",
+                    "--local",
+                    "--timeout",
+                    "5",
+                ]
+            )
+            == 0
+        )
+
+        (consumer, queue, options), settings = runs
+
+        assert consumer is importlib.import_module(consumer_module).consumer
+        assert queue == "bench"
+        assert options == {
+            "messages": 500,
+            "size": 64,
+            "rate": 100.0,
+            "encoder": None,
+            "local": True,
+            "timeout": 5.0,
+        }
+        assert settings == ([1, 2, 4], [10], [1, 2])
+
+    # Tests that a queue the consumer doesn't listen to fails with a message, rather than a traceback.
+    def test_unknown_queue(self, consumer_module, capsys):
+        assert bench_main.main([consumer_module, "--queue", "missing"]) == 1
+        assert "no listener for missing" in capsys.readouterr().err
+
+    # Tests a whole local run from the command line, printing its results as JSON.
+    def test_local_json(self, consumer_module, capsys, monkeypatch):
+        # The logger prints to stdout too, keep it to the results
+        monkeypatch.setattr(logger, "disabled", True)
+
+        code = bench_main.main(
+            [consumer_module, "--local", "--messages", "10", "--size", "8", "--json"]
+        )
+
+        [result] = json.loads(capsys.readouterr().out)
+
+        assert code == 0
+        assert result["messages"] == 10
+        assert result["throughput"] > 0
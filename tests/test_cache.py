@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+from pika.spec import Basic, BasicProperties as Properties
+
+from rabbie import Consumer
+from rabbie.cache import (
+    MISS,
+    CachePolicy,
+    LocalCache,
+    SharedCache,
+    cache_key,
+    create_cache,
+)
+from rabbie.cache import result_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes the caches' monotonic clock, moved on by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    return now
+
+
+def _keys(amount):
+    return [cache_key(str(index).encode()) for index in range(amount)]
+
+
+@pytest.fixture(params=[LocalCache, SharedCache])
+def cache_type(request):
+    return request.param
+
+
+class TestCache:
+    # Tests that outputs are returned until evicted, including None for functions that returned nothing.
+    def test_get_set(self, cache_type):
+        cache = cache_type(CachePolicy())
+        first, second, missing = _keys(3)
+
+        assert not cache.set(first, b"output")
+        assert not cache.set(second, None)
+
+        assert cache.get(first) == b"output"
+        assert cache.get(second) is None
+        assert cache.get(missing) is MISS
+
+    # Tests that the least recently used output is evicted once the cache is full.
+    def test_lru_eviction(self, cache_type, clock):
+        # A single set of the shared cache, so every key competes for the same slots
+        cache = cache_type(CachePolicy(max_entries=SharedCache.WAYS))
+        keys = _keys(SharedCache.WAYS + 1)
+
+        for key in keys[:-1]:
+            clock[0] += 1
+            assert not cache.set(key, key)
+
+        # Using the oldest makes the second oldest the least recently used
+        clock[0] += 1
+        assert cache.get(keys[0]) == keys[0]
+
+        clock[0] += 1
+        assert cache.set(keys[-1], keys[-1])
+
+        assert cache.get(keys[1]) is MISS
+        assert all(cache.get(key) == key for key in [keys[0], *keys[2:]])
+
+    # Tests that outputs expire once their TTL passes, and are kept forever without one.
+    def test_ttl(self, cache_type, clock):
+        expiring = cache_type(CachePolicy(ttl=10))
+        forever = cache_type(CachePolicy(ttl=None))
+        [key] = _keys(1)
+
+        for cache in [expiring, forever]:
+            cache.set(key, b"output")
+
+        clock[0] += 9.9
+        assert expiring.get(key) == b"output"
+
+        clock[0] += 0.2
+        assert expiring.get(key) is MISS
+        assert forever.get(key) == b"output"
+
+    # Tests that the shared cache skips outputs too big for its slots.
+    def test_shared_max_value_bytes(self):
+        cache = SharedCache(CachePolicy(max_value_bytes=4))
+        small, big = _keys(2)
+
+        cache.set(small, b"1234")
+        cache.set(big, b"12345")
+
+        assert cache.get(small) == b"1234"
+        assert cache.get(big) is MISS
+
+    # Tests that the policy picks the cache type.
+    def test_create_cache(self):
+        assert isinstance(create_cache(CachePolicy()), LocalCache)
+        assert isinstance(create_cache(CachePolicy(shared=True)), SharedCache)
+
+
+class FakeChannel:
+    def basic_publish(self, *args, **kwargs):
+        pass
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+
+class TestCacheMetrics:
+    # Tests that the listener counts hits, misses & evictions.
+    def test_counters(self):
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.listen(
+            "target",
+            encoder=None,
+            return_queue="next",
+            cache=CachePolicy(max_entries=1),
+        )(lambda body: body)
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+        listener._cache = create_cache(listener.details.cache)
+
+        for body in [b"a", b"a", b"b", b"a"]:
+            listener._callback(
+                FakeChannel(),
+                Basic.Deliver(delivery_tag=1, routing_key="target"),
+                Properties(),
+                body,
+            )
+
+        metrics = listener.metrics.snapshot()
+
+        assert metrics["cache_hits"] == 1
+        assert metrics["cache_misses"] == 3
+        assert metrics["cache_evictions"] == 2
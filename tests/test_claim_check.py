@@ -0,0 +1,93 @@
+import pytest
+from pika.spec import BasicProperties as Properties
+
+from rabbie.claimcheck import (
+    CLAIM_HEADER,
+    ClaimCheckPolicy,
+    FileBlobStore,
+    check_in,
+    claim_of,
+)
+
+
+@pytest.fixture
+def policy(tmp_path):
+    return ClaimCheckPolicy(threshold=10, path=str(tmp_path))
+
+
+class TestCheckIn:
+    # Tests that payloads under the threshold stay in the message.
+    def test_small_payload_is_sent_inline(self, policy):
+        body, properties = check_in(policy, "hello", None)
+
+        assert body == b"hello"
+        assert properties is None
+
+    # Tests that payloads over the threshold are stored, leaving only a reference in the message.
+    def test_large_payload_is_stored(self, policy):
+        body, properties = check_in(policy, b"x" * 100, None)
+        reference = claim_of(properties)
+
+        assert body == b""
+        assert reference is not None
+
+        with policy.store.open(reference) as blob:
+            assert bytes(blob.view) == b"x" * 100
+
+    # Tests that the caller's properties are left alone, so reusing them doesn't carry an old reference.
+    def test_reused_properties_are_not_changed(self, policy):
+        shared = Properties(headers={"kind": "upload"}, content_type="text/plain")
+
+        _, large = check_in(policy, b"x" * 100, shared)
+        _, small = check_in(policy, b"12345", shared)
+
+        assert CLAIM_HEADER in large.headers
+        assert large.headers["kind"] == "upload"
+        assert large.content_type == "text/plain"
+        assert shared.headers == {"kind": "upload"}
+        assert claim_of(small) is None
+
+    # Tests that messages without headers have no claim.
+    def test_claim_of_without_headers(self):
+        assert claim_of(None) is None
+        assert claim_of(Properties()) is None
+
+
+class TestFileBlobStore:
+    # Tests that a stored payload reads back the same, and is gone once deleted.
+    def test_put_open_delete(self, tmp_path):
+        store = FileBlobStore(str(tmp_path))
+        reference = store.put(b"payload")
+
+        with store.open(reference) as blob:
+            assert len(blob) == 7
+            assert bytes(blob.view) == b"payload"
+
+        store.delete(reference)
+
+        with pytest.raises(KeyError):
+            store.open(reference)
+
+    # Tests that empty payloads can be opened, although they can't be mapped.
+    def test_empty_payload(self, tmp_path):
+        store = FileBlobStore(str(tmp_path))
+
+        with store.open(store.put(b"")) as blob:
+            assert len(blob) == 0
+
+    # Tests that references which aren't the store's can't reach outside its directory.
+    def test_foreign_reference(self, tmp_path):
+        store = FileBlobStore(str(tmp_path))
+
+        with pytest.raises(KeyError):
+            store.open("../../etc/passwd")
+
+        store.delete("../../etc/passwd")
+
+    # Tests that deleting a payload twice is harmless.
+    def test_delete_missing(self, tmp_path):
+        store = FileBlobStore(str(tmp_path))
+        reference = store.put(b"payload")
+
+        store.delete(reference)
+        store.delete(reference)
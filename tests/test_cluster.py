@@ -0,0 +1,166 @@
+import pika
+import pytest
+from pika.exceptions import AMQPConnectionError
+
+from rabbie import Producer
+
+from rabbie.cluster import cluster as cluster_module
+from rabbie.cluster import Cluster, parse_endpoint
+
+
+def _cluster(**leaders):
+    return Cluster.from_endpoints(
+        ["one:5672", "two:5673", "three"], port=5674, leaders=leaders
+    )
+
+
+def _hosts(nodes):
+    return [node.host for node in nodes]
+
+
+class TestParseEndpoint:
+    # Tests that hosts without a port are given the default.
+    def test_host(self):
+        assert parse_endpoint("rabbit", 5672) == ("rabbit", 5672)
+        assert parse_endpoint("rabbit", None) == ("rabbit", None)
+
+    # Tests that a port in the endpoint is used over the default.
+    def test_host_port(self):
+        assert parse_endpoint("rabbit:5673", 5672) == ("rabbit", 5673)
+
+    # Tests that bracketed IPv6 addresses are split from their port, if they have one.
+    def test_ipv6_brackets(self):
+        assert parse_endpoint("[::1]:5673", 5672) == ("::1", 5673)
+        assert parse_endpoint("[fe80::1]", 5672) == ("fe80::1", 5672)
+
+    # Tests that a bare IPv6 address isn't mistaken for a host & port.
+    def test_ipv6_bare(self):
+        assert parse_endpoint("fe80::1", 5672) == ("fe80::1", 5672)
+        assert parse_endpoint("::1", None) == ("::1", None)
+
+
+class TestCluster:
+    # Tests that endpoints become nodes, with the given port where they have none.
+    def test_from_endpoints(self):
+        cluster = _cluster()
+
+        assert [(node.host, node.port) for node in cluster.nodes] == [
+            ("one", 5672),
+            ("two", 5673),
+            ("three", 5674),
+        ]
+
+    # Tests that a cluster can't be empty.
+    def test_empty(self):
+        with pytest.raises(ValueError):
+            Cluster([])
+
+    # Tests that consecutive connections prefer consecutive nodes, falling back to the rest in turn.
+    def test_order_rotates(self):
+        cluster = _cluster()
+
+        assert _hosts(cluster.order(0)) == ["one", "two", "three"]
+        assert _hosts(cluster.order(1)) == ["two", "three", "one"]
+        assert _hosts(cluster.order(5)) == ["three", "one", "two"]
+
+    # Tests that a queue's leader is tried first, however it's named.
+    @pytest.mark.parametrize("leader", ["three", "three:5674", "rabbit@three"])
+    def test_order_leader_first(self, leader):
+        cluster = _cluster(orders=leader)
+
+        assert _hosts(cluster.order(1, "orders")) == ["three", "two", "one"]
+        assert _hosts(cluster.order(1, "invoices")) == ["two", "three", "one"]
+
+    # Tests that a leader on a port no node has is ignored.
+    def test_unknown_leader(self):
+        cluster = _cluster(orders="three:1234")
+
+        assert cluster.leader("orders") is None
+        assert _hosts(cluster.order(0, "orders")) == ["one", "two", "three"]
+
+    # Tests that the next connection of a pool starts one node on from the last.
+    def test_next_order(self):
+        cluster = _cluster()
+        first = _hosts(cluster.next_order())
+
+        assert _hosts(cluster.next_order()) == first[1:] + first[:1]
+
+
+class FakeBlockingConnection:
+    """Fails to connect to the hosts it's told are down, recording every attempt"""
+
+    down = set()
+    attempts = []
+
+    def __init__(self, parameters) -> None:
+        self.attempts.append(parameters.host)
+
+        if parameters.host in self.down:
+            raise AMQPConnectionError(parameters.host)
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    FakeBlockingConnection.down = set()
+    FakeBlockingConnection.attempts = []
+    monkeypatch.setattr(
+        cluster_module.pika, "BlockingConnection", FakeBlockingConnection
+    )
+
+    return FakeBlockingConnection
+
+
+class TestConnect:
+    # Tests that the preferred node is connected to when it's up.
+    def test_preferred(self, connections):
+        _, node = _cluster().connect(1)
+
+        assert node.host == "two"
+        assert connections.attempts == ["two"]
+
+    # Tests that unreachable nodes are passed over in order.
+    def test_falls_back(self, connections):
+        connections.down = {"two", "three"}
+
+        _, node = _cluster().connect(1)
+
+        assert node.host == "one"
+        assert connections.attempts == ["two", "three", "one"]
+
+    # Tests that a node that just failed is only tried once the others have been.
+    def test_avoid(self, connections):
+        cluster = _cluster(orders="two")
+        failed = cluster.nodes[1]
+
+        _, node = cluster.connect(0, "orders", avoid=failed)
+        assert node.host == "one"
+
+        connections.down = {"one", "three"}
+        connections.attempts.clear()
+
+        _, node = cluster.connect(0, "orders", avoid=failed)
+        assert node.host == "two"
+        assert connections.attempts == ["one", "three", "two"]
+
+    # Tests that the last error is raised when no node can be reached.
+    def test_all_down(self, connections):
+        connections.down = {"one", "two", "three"}
+
+        with pytest.raises(AMQPConnectionError, match="three"):
+            _cluster().connect(0)
+
+
+class TestProducer:
+    # Tests that a producer only takes a cluster with a connection type that tries each node in turn.
+    def test_non_blocking_rejected(self):
+        assert Producer(hosts=["one", "two"]).cluster is not None
+
+        with pytest.raises(ValueError, match="SelectConnection"):
+            Producer(hosts=["one", "two"], connection_type=pika.SelectConnection)
+
+        assert (
+            Producer(
+                host="localhost", port=5672, connection_type=pika.SelectConnection
+            ).cluster
+            is None
+        )
@@ -0,0 +1,89 @@
+from pika.spec import BasicProperties as Properties
+
+from rabbie.broker_types import DEADLINE_HEADER, is_stale, stamp
+
+NOW = 1_700_000_000.0
+
+
+class TestStamp:
+    # Tests that new properties are created, stamped with the time sent.
+    def test_stamps_new_properties(self, monkeypatch):
+        monkeypatch.setattr("time.time", lambda: NOW)
+
+        properties = stamp(None, deadline=5)
+
+        assert properties.timestamp == int(NOW)
+        assert properties.headers[DEADLINE_HEADER] == int((NOW + 5) * 1000)
+
+    # Tests that anything already set is left alone.
+    def test_keeps_existing_values(self, monkeypatch):
+        monkeypatch.setattr("time.time", lambda: NOW)
+
+        properties = stamp(
+            Properties(timestamp=10, headers={DEADLINE_HEADER: 42, "kind": "x"}),
+            deadline=5,
+        )
+
+        assert properties.timestamp == 10
+        assert properties.headers == {DEADLINE_HEADER: 42, "kind": "x"}
+
+    # Tests that reused properties aren't changed, so later messages get stamps of their own.
+    def test_reused_properties(self, monkeypatch):
+        shared = Properties(headers={"kind": "x"})
+
+        monkeypatch.setattr("time.time", lambda: NOW)
+        first = stamp(shared, deadline=5)
+
+        monkeypatch.setattr("time.time", lambda: NOW + 60)
+        second = stamp(shared, deadline=5)
+
+        assert shared.timestamp is None
+        assert shared.headers == {"kind": "x"}
+        assert second.timestamp == first.timestamp + 60
+        assert (
+            second.headers[DEADLINE_HEADER] == first.headers[DEADLINE_HEADER] + 60_000
+        )
+
+    # Tests that the deadline header is only added when there's a deadline.
+    def test_without_deadline(self):
+        assert stamp(Properties()).headers is None
+
+
+class TestIsStale:
+    # Tests that messages without properties or a timestamp are never stale.
+    def test_unstamped(self):
+        assert not is_stale(None, max_age=1)
+        assert not is_stale(Properties(), max_age=1)
+
+    # Tests that the deadline header decides on its own.
+    def test_deadline(self):
+        properties = Properties(headers={DEADLINE_HEADER: int(NOW * 1000)})
+
+        assert not is_stale(properties, now=NOW - 1)
+        assert is_stale(properties, now=NOW + 1)
+
+    # Tests that ages are rounded down, as the timestamp is truncated to the second.
+    def test_max_age(self):
+        properties = Properties(timestamp=int(NOW))
+
+        assert not is_stale(properties, max_age=10, now=NOW + 11)
+        assert is_stale(properties, max_age=10, now=NOW + 11.5)
+
+    # Tests that the AMQP expiration (in milliseconds) is honoured without a max age.
+    def test_expiration(self):
+        properties = Properties(timestamp=int(NOW), expiration="2000")
+
+        assert not is_stale(properties, now=NOW + 3)
+        assert is_stale(properties, now=NOW + 3.5)
+
+    # Tests that a message stamped from reused properties isn't shed because of an earlier stamp.
+    def test_reused_properties_are_fresh(self, monkeypatch):
+        shared = Properties()
+
+        monkeypatch.setattr("time.time", lambda: NOW)
+        stamp(shared, deadline=5)
+
+        monkeypatch.setattr("time.time", lambda: NOW + 60)
+        later = stamp(shared, deadline=5)
+
+        assert not is_stale(later, now=NOW + 61)
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+from pika.spec import BasicProperties as Properties
+
+from rabbie.dedup import Backend, DedupIndex, DedupPolicy, create_index, dedup_key
+from rabbie.dedup import dedup_index
+from rabbie.dedup.dedup_index import DiskDedupIndex
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes the indexes' wall clock, moved on by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(dedup_index, "time", SimpleNamespace(time=lambda: now[0]))
+
+    return now
+
+
+def _key(name):
+    return dedup_key(Properties(message_id=name), b"", by_body=False)
+
+
+class TestDedupKey:
+    # Tests that messages are keyed on their message_id, or their body when asked, and scoped when given one.
+    def test_keys(self):
+        assert _key("a") == _key("a") != _key("b")
+        assert dedup_key(Properties(), b"body", by_body=False) is None
+        assert dedup_key(Properties(), b"body", by_body=True) == dedup_key(
+            Properties(message_id="a"), b"body", by_body=True
+        )
+        assert dedup_key(Properties(message_id="a"), b"", False, b"route") != _key("a")
+
+
+class TestDedupIndex:
+    # Tests that a key is remembered through one rotation of the filter, and forgotten after the next.
+    def test_rotation(self, clock):
+        index = DedupIndex(DedupPolicy(window=10, trust_filter=True))
+        key = _key("a")
+
+        assert not index.seen(key)
+        index.add(key)
+
+        clock[0] += 4
+        assert index.seen(key)
+
+        # Half a window in, the other generation takes over and the key is still in the older one
+        clock[0] += 1
+        assert index.seen(key)
+
+        # Another half window retires the generation holding the key
+        clock[0] += 5
+        assert not index.seen(key)
+
+    # Tests that an idle index past a whole window forgets everything at once.
+    def test_idle_window(self, clock):
+        index = DedupIndex(DedupPolicy(window=10))
+        index.add(_key("a"))
+
+        clock[0] += 25
+        assert not index.seen(_key("a"))
+
+    # Tests that without trusting the filter, only keys still held exactly count as duplicates.
+    def test_exact_confirmation(self, clock):
+        index = DedupIndex(DedupPolicy(window=10, recent=4, trust_filter=False))
+        keys = [_key(str(i)) for i in range(5)]
+
+        for key in keys:
+            clock[0] += 0.1
+            index.add(key)
+
+        # The oldest was evicted from the single set of exact slots, though the filter still matches it
+        assert not index.seen(keys[0])
+        assert all(index.seen(key) for key in keys[1:])
+
+    # Tests that the policy picks the backend.
+    def test_create_index(self, tmp_path):
+        assert isinstance(create_index(DedupPolicy()), DedupIndex)
+        assert isinstance(
+            create_index(
+                DedupPolicy(backend=Backend.DISK, path=str(tmp_path / "index"))
+            ),
+            DiskDedupIndex,
+        )
+
+
+class TestDiskDedupIndex:
+    # Tests that processed keys survive the index being opened again, as they would a restart.
+    def test_persistence(self, tmp_path, clock):
+        policy = DedupPolicy(
+            backend=Backend.DISK, path=str(tmp_path / "dedup" / "index")
+        )
+
+        DiskDedupIndex(policy).add(_key("a"))
+        reopened = DiskDedupIndex(policy)
+
+        assert reopened.seen(_key("a"))
+        assert not reopened.seen(_key("b"))
+
+    # Tests that an index file laid out for a different policy is started afresh.
+    def test_reshaped(self, tmp_path, clock):
+        path = str(tmp_path / "index")
+
+        DiskDedupIndex(DedupPolicy(backend=Backend.DISK, path=path)).add(_key("a"))
+        resized = DiskDedupIndex(
+            DedupPolicy(backend=Backend.DISK, path=path, capacity=10)
+        )
+
+        assert not resized.seen(_key("a"))
+
+    # Tests that the disk backend needs a path.
+    def test_needs_path(self):
+        with pytest.raises(ValueError):
+            DiskDedupIndex(DedupPolicy(backend=Backend.DISK))
@@ -0,0 +1,140 @@
+import pytest
+
+from rabbie.producer.flow import FlowController, FlowPolicy, Overflow
+from rabbie.producer.publish_error import PublishError
+
+
+class FakeConnection:
+    """Delivers the broker's blocked & unblocked notifications the next time events are processed"""
+
+    def __init__(self) -> None:
+        self.events = []
+
+    def add_on_connection_blocked_callback(self, callback):
+        self._on_blocked = callback
+
+    def add_on_connection_unblocked_callback(self, callback):
+        self._on_unblocked = callback
+
+    def block(self):
+        self.events.append(self._on_blocked)
+
+    def unblock(self):
+        self.events.append(self._on_unblocked)
+
+    def process_data_events(self, time_limit=0):
+        events, self.events = self.events, []
+
+        for event in events:
+            event(self, None)
+
+
+def _controller(**policy):
+    connection = FakeConnection()
+    sent = []
+
+    controller = FlowController(
+        connection,
+        FlowPolicy(**policy),
+        lambda *message: sent.append(message[2]),
+    )
+
+    return controller, connection, sent
+
+
+def _publish(controller, body):
+    controller.publish("", "queue", body, None, False)
+
+
+class TestFlowController:
+    # Tests that messages are sent straight away while the broker allows it.
+    def test_unblocked(self):
+        controller, _, sent = _controller()
+
+        _publish(controller, b"1")
+
+        assert sent == [b"1"]
+        assert not controller.stats.blocked
+
+    # Tests that a block is noticed on the next publish, buffering messages until the broker unblocks.
+    def test_buffer(self):
+        controller, connection, sent = _controller(overflow=Overflow.BLOCK)
+
+        _publish(controller, b"1")
+        connection.block()
+        _publish(controller, b"2")
+        _publish(controller, b"3")
+
+        assert sent == [b"1"]
+        assert controller.stats.buffered == 2
+
+        connection.unblock()
+        _publish(controller, b"4")
+
+        assert sent == [b"1", b"2", b"3", b"4"]
+        assert controller.stats.buffered == 0
+
+    # Tests that a full buffer waits for the broker to unblock, and gives up after the timeout.
+    def test_block_waits(self):
+        controller, connection, sent = _controller(
+            overflow=Overflow.BLOCK, max_messages=1, timeout=0.05
+        )
+
+        connection.block()
+        _publish(controller, b"1")
+
+        with pytest.raises(PublishError):
+            _publish(controller, b"2")
+
+        connection.unblock()
+        _publish(controller, b"3")
+
+        assert sent == [b"1", b"3"]
+
+    # Tests that the oldest messages are dropped while blocked, and dropping stops once unblocked.
+    def test_drop_oldest(self):
+        controller, connection, sent = _controller(
+            overflow=Overflow.DROP_OLDEST, max_messages=2
+        )
+
+        connection.block()
+        for body in [b"1", b"2", b"3"]:
+            _publish(controller, body)
+
+        assert controller.stats.dropped == 1
+
+        connection.unblock()
+        _publish(controller, b"4")
+        _publish(controller, b"5")
+
+        assert sent == [b"2", b"3", b"4", b"5"]
+        assert controller.stats.dropped == 1
+
+    # Tests that messages past the memory limit are spilled to disk, and published in order once unblocked.
+    def test_spill(self, tmp_path):
+        controller, connection, sent = _controller(
+            overflow=Overflow.SPILL, max_messages=1, spill_directory=str(tmp_path)
+        )
+
+        connection.block()
+        for body in [b"1", b"2", b"3"]:
+            _publish(controller, body)
+
+        assert controller.stats.spilled == 2
+
+        connection.unblock()
+        _publish(controller, b"4")
+
+        assert sent == [b"1", b"2", b"3", b"4"]
+        assert controller.stats.spilled == 0
+
+    # Tests that close waits for the broker to unblock, draining what's buffered.
+    def test_close_drains(self):
+        controller, connection, sent = _controller()
+
+        connection.block()
+        _publish(controller, b"1")
+        connection.unblock()
+        controller.close()
+
+        assert sent == [b"1"]
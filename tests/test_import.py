@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+
+# Subsystems that must only load on first use. pika.adapters imports its own asyncio adapter, so that
+# can't be kept out, only Rabbie's asyncio producer
+LAZY_MODULES = [
+    "rich",
+    "watchdog",
+    "multiprocess",
+    "dill",
+    "rabbie.producer.async_producer",
+    "rabbie.producer.publisher.async_publisher",
+    "rabbie.supervisor",
+    "rabbie.bench",
+]
+
+
+def _imported_by(statement: str) -> set:
+    """Run an import in a fresh interpreter, returning every module loaded afterwards"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys; {statement}; print(json.dumps(list(sys.modules)))",
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+    return set(json.loads(result.stdout))
+
+
+class TestImport:
+    # Tests that importing rabbie doesn't pull in the heavy optional subsystems.
+    def test_lazy_modules_not_imported(self):
+        modules = _imported_by("import rabbie")
+
+        assert "rabbie" in modules
+        for module in LAZY_MODULES:
+            assert module not in modules
+
+    # Tests that AsyncProducer & AsyncPublisher still resolve from their packages on first use.
+    def test_async_producer_resolves_lazily(self):
+        from rabbie import AsyncProducer
+        from rabbie.producer.async_producer import AsyncProducer as Defined
+        from rabbie.producer.publisher import AsyncPublisher
+        from rabbie.producer.publisher.async_publisher import (
+            AsyncPublisher as Published,
+        )
+
+        assert AsyncProducer is Defined
+        assert AsyncPublisher is Published
+
+        assert "rabbie.producer.async_producer" in _imported_by(
+            "from rabbie import AsyncProducer"
+        )
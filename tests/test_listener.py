@@ -0,0 +1,398 @@
+import time
+
+from pika.spec import Basic, BasicProperties as Properties
+
+from rabbie import Channel, Consumer, HandlerTimeout
+from rabbie.broker_types import DEADLINE_HEADER
+from rabbie.cache import CachePolicy, create_cache
+from rabbie.dedup import DedupPolicy, create_index
+from rabbie.packing import PACKED_HEADER, pack
+from rabbie.ratelimit import RateLimit
+from rabbie.consumer.listener.local_route import LocalRoute
+from rabbie.consumer.listener.watchdog import TIMEOUT_HEADER
+
+
+class FakeChannel:
+    """Stands in for a worker's BlockingChannel, recording what the listener sends"""
+
+    def __init__(self) -> None:
+        self.frames = []
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.frames.append(("ack", delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self.frames.append(("nack", delivery_tag, multiple, requeue))
+
+    def basic_publish(self, *args, **kwargs):
+        self.frames.append(("publish",))
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+
+def _listener(function, **settings):
+    consumer = Consumer(host="localhost", port=5672)
+    consumer.listen("target", encoder=None, **settings)(function)
+
+    listener = consumer.listeners[0]
+    listener.prepare()
+
+    return listener
+
+
+class TestRunLocal:
+    # Tests that calls handed over in-process don't touch the watchdog slot of the target's own workers.
+    def test_watchdog_slot_untouched(self):
+        seen = []
+
+        def target(body):
+            seen.append(listener._watchdog._started[3])
+
+        listener = _listener(target, timeout=5)
+        listener._control.workers = 1
+        listener._slot = 3
+
+        assert listener.run_local(Channel(FakeChannel()), "body", depth=1, sent=0)
+        assert seen == [0]
+
+    # Tests that outputs aren't handed to a paused listener, so they wait on the broker instead.
+    def test_paused(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+
+        listener = _listener(target)
+        listener._control.workers = 1
+        listener.pause()
+
+        assert not listener.run_local(Channel(FakeChannel()), "body", depth=1, sent=0)
+
+        listener.resume()
+
+        assert listener.run_local(Channel(FakeChannel()), "body", depth=1, sent=0)
+        assert seen == ["body"]
+
+    # Tests that outputs aren't handed to a listener that isn't running any workers, or was drained.
+    def test_without_workers(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+
+        listener = _listener(target)
+
+        assert not listener.run_local(Channel(FakeChannel()), "body", depth=1, sent=0)
+
+        listener._control.workers = 1
+        listener.drain({})
+
+        assert not listener.run_local(Channel(FakeChannel()), "body", depth=1, sent=0)
+        assert seen == []
+
+
+class TestLocalRoute:
+    # Tests that the cap on hand-offs follows the amount of workers the target has.
+    def test_cap_follows_workers(self):
+        listener = _listener(lambda body: None)
+        route = LocalRoute(listener)
+
+        listener._control.workers = 1
+        assert route.acquire()
+        assert not route.acquire()
+
+        listener._control.workers = 2
+        assert route.acquire()
+
+        listener._control.workers = 0
+        route.release()
+        route.release()
+        assert not route.acquire()
+
+
+class TestRelease:
+    def _deliver(self, listener, channel, delivery_tag):
+        listener._callback(
+            channel, Basic.Deliver(delivery_tag=delivery_tag), Properties(), b"body"
+        )
+
+    # Tests that set aside messages are nacked on their own once a message was started, leaving it be.
+    def test_after_started(self):
+        channel = FakeChannel()
+        listener = _listener(lambda body: None, auto_acknowledge=False)
+
+        self._deliver(listener, channel, 1)
+        listener._draining = True
+        self._deliver(listener, channel, 2)
+        self._deliver(listener, channel, 3)
+        listener._release(channel)
+
+        assert ("nack", 1, True, True) not in channel.frames
+        assert channel.frames[-2:] == [
+            ("nack", 2, False, True),
+            ("nack", 3, False, True),
+        ]
+
+    # Tests that set aside messages go back in a single nack when nothing was started.
+    def test_nothing_started(self):
+        channel = FakeChannel()
+        listener = _listener(lambda body: None, auto_acknowledge=False)
+
+        listener._draining = True
+        self._deliver(listener, channel, 1)
+        self._deliver(listener, channel, 2)
+        listener._release(channel)
+
+        assert channel.frames == [("nack", 2, True, True)]
+
+
+class TestRpc:
+    # Tests that a request whose handler failed is settled once the error is sent back.
+    def test_failed_request_is_settled(self):
+        channel = FakeChannel()
+
+        def target(body):
+            raise ValueError(body)
+
+        listener = _listener(target, auto_acknowledge=False)
+        listener._callback(
+            channel,
+            Basic.Deliver(delivery_tag=1),
+            Properties(reply_to="caller", correlation_id="1"),
+            b"body",
+        )
+
+        assert channel.frames == [("publish",), ("ack", 1, False)]
+
+
+def _deliver(listener, channel, body=b"body", delivery_tag=1, **properties):
+    listener._callback(
+        channel,
+        Basic.Deliver(delivery_tag=delivery_tag, routing_key="target"),
+        Properties(**properties),
+        body,
+    )
+
+
+class TestPipeline:
+    # Tests that messages past their max age are moved to the shed queue without calling the function.
+    def test_shed(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+
+        channel = FakeChannel()
+        listener = _listener(
+            target, auto_acknowledge=False, max_age=10, shed_queue="shed"
+        )
+
+        _deliver(listener, channel, timestamp=int(time.time()) - 60)
+
+        assert seen == []
+        assert channel.frames == [("publish",), ("ack", 1, False)]
+        assert listener.metrics.snapshot()["shed"] == 1
+
+    # Tests that only listeners that opted in drop messages past their deadline.
+    def test_shed_opt_in(self):
+        seen = []
+        expired = {DEADLINE_HEADER: int((time.time() - 60) * 1000)}
+
+        def target(body):
+            seen.append(body)
+
+        for shed in [False, True]:
+            channel = FakeChannel()
+            listener = _listener(target, auto_acknowledge=False, shed=shed)
+
+            _deliver(listener, channel, headers=expired)
+
+        assert seen == ["body"]
+        assert listener.metrics.snapshot()["shed"] == 1
+
+    # Tests that a redelivered message that was already processed is acknowledged without calling the function.
+    def test_dedup(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+            return None
+
+        channel = FakeChannel()
+        listener = _listener(target, auto_acknowledge=False, dedup=DedupPolicy())
+        listener._dedup = create_index(listener.details.dedup)
+
+        _deliver(listener, channel, delivery_tag=1, message_id="a")
+        _deliver(listener, channel, delivery_tag=2, message_id="a")
+
+        assert seen == ["body"]
+        assert ("ack", 2, False) in channel.frames
+        assert listener.metrics.snapshot()["duplicates"] == 1
+
+    # Tests that a cached output is sent without decoding the body or calling the function again.
+    def test_cache(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+            return "output"
+
+        channel = FakeChannel()
+        listener = _listener(target, return_queue="next", cache=CachePolicy())
+        listener._cache = create_cache(listener.details.cache)
+
+        _deliver(listener, channel)
+        _deliver(listener, channel)
+
+        assert seen == ["body"]
+        assert channel.frames == [("publish",), ("publish",)]
+
+    # Tests that the same body routed to different functions is neither served from the other's cache nor deduplicated.
+    def test_cache_and_dedup_scoped_by_route(self):
+        seen = []
+
+        def created(body):
+            seen.append(("created", body))
+            return "created"
+
+        def deleted(body):
+            seen.append(("deleted", body))
+            return "deleted"
+
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.listen(
+            "target",
+            encoder=None,
+            return_queue="next",
+            cache=CachePolicy(),
+            dedup=DedupPolicy(by_body=True),
+        )(None)
+        consumer.route("target", routing_key="orders.created")(created)
+        consumer.route("target", routing_key="orders.deleted")(deleted)
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+        listener._cache = create_cache(listener.details.cache)
+        listener._dedup = create_index(listener.details.dedup)
+
+        channel = FakeChannel()
+        for routing_key in ["orders.created", "orders.deleted", "orders.created"]:
+            listener._callback(
+                channel,
+                Basic.Deliver(delivery_tag=1, routing_key=routing_key),
+                Properties(),
+                b"body",
+            )
+
+        assert seen == [("created", "body"), ("deleted", "body")]
+
+    # Tests that messages over the rate limit are handed back to the broker, and the worker pauses.
+    def test_rate_limit(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+
+        channel = FakeChannel()
+        listener = _listener(
+            target, auto_acknowledge=False, rate_limit=RateLimit(rate=1, burst=1)
+        )
+
+        _deliver(listener, channel, delivery_tag=1)
+        _deliver(listener, channel, delivery_tag=2)
+
+        assert seen == ["body"]
+        assert ("nack", 2, False, True) in channel.frames
+        assert listener._paused_for > 0
+
+    # Tests that every message of a packed envelope is handed to the function.
+    def test_packed(self):
+        seen = []
+
+        def target(body):
+            seen.append(body)
+
+        listener = _listener(target)
+
+        _deliver(
+            listener,
+            FakeChannel(),
+            body=pack([b"one", b"two"]),
+            headers={PACKED_HEADER: 2},
+        )
+
+        assert seen == ["one", "two"]
+
+    # Tests that an output is handed to the listener consuming the return queue in-process.
+    def test_local_hand_off(self):
+        seen = []
+
+        def first(body):
+            return body + "!"
+
+        def second(body):
+            seen.append(body)
+
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.listen("first", encoder=None, return_queue="second")(first)
+        consumer.listen("second", encoder=None)(second)
+
+        for listener in consumer.listeners:
+            listener.prepare()
+        consumer._link_local_routes()
+
+        upstream, downstream = consumer.listeners
+        downstream._control.workers = 1
+        channel = FakeChannel()
+
+        _deliver(upstream, channel)
+
+        assert seen == ["body!"]
+        assert channel.frames == []
+        assert downstream.metrics.snapshot()["local_hops"] == 1
+
+        # Once the target is drained, outputs go through the broker
+        downstream._control.workers = 0
+        _deliver(upstream, channel)
+
+        assert seen == ["body!"]
+        assert channel.frames == [("publish",)]
+        assert upstream.metrics.snapshot()["local_fallbacks"] == 1
+
+
+class TestTimeout:
+    def _deliver(self, listener, channel, redelivered=False, headers=None):
+        listener._callback(
+            channel,
+            Basic.Deliver(
+                delivery_tag=1, routing_key="target", redelivered=redelivered
+            ),
+            Properties(headers=headers),
+            b"body",
+        )
+
+    # Tests that a message that timed out is republished counting its timeouts, even if it was redelivered.
+    def test_requeued_once(self, monkeypatch):
+        published = []
+
+        def target(body):
+            raise HandlerTimeout()
+
+        channel = FakeChannel()
+        monkeypatch.setattr(
+            channel, "basic_publish", lambda **kwargs: published.append(kwargs)
+        )
+        listener = _listener(target, auto_acknowledge=False)
+
+        self._deliver(listener, channel, redelivered=True)
+
+        assert channel.frames == [("ack", 1, False)]
+        assert published[0]["routing_key"] == "target"
+        assert published[0]["properties"].headers[TIMEOUT_HEADER] == 1
+
+        # Timing out again drops it (to the dead letter exchange, if there is one)
+        self._deliver(listener, channel, headers=published[0]["properties"].headers)
+
+        assert channel.frames[-1] == ("nack", 1, False, False)
+        assert len(published) == 1
@@ -0,0 +1,171 @@
+from pika import BasicProperties
+
+from rabbie.packing import (
+    PACKED_CONTENT_TYPE,
+    PACKED_HEADER,
+    PackedChannel,
+    PackingPolicy,
+    pack,
+    unpack,
+)
+from rabbie.producer.publisher import Publisher
+
+
+class FakeChannel:
+    """Records what's published, acknowledged & rejected"""
+
+    def __init__(self) -> None:
+        self.published = []
+        self.frames = []
+
+    def basic_publish(self, exchange, routing_key, body, properties, mandatory):
+        self.published.append((routing_key, body, properties))
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.frames.append(("ack", delivery_tag))
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self.frames.append(("nack", delivery_tag, requeue))
+
+
+class FakeConnection:
+    """Hands out a FakeChannel, holding timers until they're fired by hand"""
+
+    def __init__(self) -> None:
+        self.timers = []
+
+    def channel(self):
+        return FakeChannel()
+
+    def call_later(self, delay, callback):
+        self.timers.append((delay, callback))
+
+    def fire(self):
+        timers, self.timers = self.timers, []
+
+        for _, callback in timers:
+            callback()
+
+
+def _publisher(**policy):
+    connection = FakeConnection()
+    publisher = Publisher(
+        connection, default_queue="events", packing=PackingPolicy(**policy)
+    )
+    publisher.open()
+
+    return publisher, connection
+
+
+class TestPack:
+    # Tests that bodies come back out of an envelope as they went in, in order.
+    def test_round_trip(self):
+        bodies = [b"one", b"", "three", b"\x00" * 1000]
+
+        assert unpack(pack(bodies)) == [b"one", b"", b"three", b"\x00" * 1000]
+        assert unpack(pack([])) == []
+
+
+class TestPublisherPacking:
+    # Tests that an envelope is sent once enough messages are buffered, marked as packed.
+    def test_max_messages(self):
+        publisher, _ = _publisher(max_messages=3, linger=60)
+
+        for body in [b"1", b"2"]:
+            publisher.publish(body)
+
+        assert publisher.channel.published == []
+
+        publisher.publish(b"3")
+        [(routing_key, body, properties)] = publisher.channel.published
+
+        assert routing_key == "events"
+        assert unpack(body) == [b"1", b"2", b"3"]
+        assert properties.headers[PACKED_HEADER] == 3
+        assert properties.content_type == PACKED_CONTENT_TYPE
+
+    # Tests that an envelope is sent once the buffered bodies reach the size threshold.
+    def test_max_bytes(self):
+        publisher, _ = _publisher(max_bytes=10, linger=60)
+
+        publisher.publish(b"12345")
+        assert publisher.channel.published == []
+
+        publisher.publish(b"67890")
+        assert unpack(publisher.channel.published[0][1]) == [b"12345", b"67890"]
+
+    # Tests that a buffer is sent by the connection's timer once it has lingered, without another publish.
+    def test_linger(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(
+            "rabbie.producer.publisher.publisher.time.monotonic", lambda: now[0]
+        )
+        publisher, connection = _publisher(linger=0.05)
+
+        publisher.publish(b"1")
+        publisher.publish(b"2")
+
+        assert [delay for delay, _ in connection.timers] == [0.05]
+
+        # Fired early (the buffer is younger than the linger), nothing is sent
+        connection.fire()
+        assert publisher.channel.published == []
+
+        publisher.publish(b"3")
+        now[0] += 0.1
+        connection.fire()
+
+        assert unpack(publisher.channel.published[0][1]) == [b"1", b"2", b"3"]
+
+    # Tests that messages with their own properties skip packing, after the messages buffered before them.
+    def test_properties_not_packed(self):
+        publisher, _ = _publisher(linger=60)
+
+        publisher.publish(b"1")
+        publisher.publish(b"2", properties=BasicProperties(priority=1))
+
+        packed, alone = publisher.channel.published
+
+        assert unpack(packed[1]) == [b"1"]
+        assert alone[1] == b"2"
+
+
+class TestPackedChannel:
+    # Tests that the envelope is acknowledged once, after every message inside it was acknowledged.
+    def test_acknowledged_once(self):
+        channel = FakeChannel()
+        packed = PackedChannel(channel, 7, 3)
+
+        for _ in range(2):
+            packed.acknowledge(7)
+
+        packed.settle()
+        assert channel.frames == []
+
+        packed = PackedChannel(channel, 7, 3)
+        for _ in range(3):
+            packed.acknowledge(7)
+
+        packed.settle()
+        assert channel.frames == [("ack", 7)]
+
+    # Tests that any rejection rejects the whole envelope, only requeueing if every rejection asked to.
+    def test_rejected(self):
+        channel = FakeChannel()
+        packed = PackedChannel(channel, 7, 3)
+
+        packed.acknowledge(7)
+        packed.reject(requeue=True, delivery_tag=7)
+        packed.reject(requeue=False, delivery_tag=7)
+        packed.settle()
+
+        assert channel.frames == [("nack", 7, False)]
+
+    # Tests that other deliveries on the channel are settled as usual.
+    def test_other_deliveries(self):
+        channel = FakeChannel()
+        packed = PackedChannel(channel, 7, 1)
+
+        packed.acknowledge(8)
+
+        assert channel.frames == [("ack", 8)]
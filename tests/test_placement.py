@@ -0,0 +1,121 @@
+import importlib
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.consumer.listener import placement
+from rabbie.consumer.listener.placement import cpu_quota, plan_placement, usable_cores
+
+# The package exports the Consumer class under the module's name
+consumer_module = importlib.import_module("rabbie.consumer.consumer")
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Points the cgroup files at a temporary directory, returning a function to write them"""
+    paths = {
+        "CGROUP_V2_CPU_MAX": tmp_path / "cpu.max",
+        "CGROUP_V1_QUOTA": tmp_path / "cpu.cfs_quota_us",
+        "CGROUP_V1_PERIOD": tmp_path / "cpu.cfs_period_us",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(placement, name, str(path))
+
+    def write(name, content):
+        paths[name].write_text(content)
+
+    return write
+
+
+class TestCpuQuota:
+    # Tests that a cgroup v2 quota is read as cores' worth of time.
+    def test_v2(self, cgroup):
+        cgroup("CGROUP_V2_CPU_MAX", "150000 100000\n")
+
+        assert cpu_quota() == 1.5
+
+    # Tests that an unlimited cgroup v2 quota has no quota.
+    def test_v2_unlimited(self, cgroup):
+        cgroup("CGROUP_V2_CPU_MAX", "max 100000\n")
+
+        assert cpu_quota() is None
+
+    # Tests that cgroup v1 is read when there's no cgroup v2 quota.
+    def test_v1(self, cgroup):
+        cgroup("CGROUP_V1_QUOTA", "200000\n")
+        cgroup("CGROUP_V1_PERIOD", "100000\n")
+
+        assert cpu_quota() == 2
+
+    # Tests that an unlimited cgroup v1 quota (-1) has no quota.
+    def test_v1_unlimited(self, cgroup):
+        cgroup("CGROUP_V1_QUOTA", "-1\n")
+        cgroup("CGROUP_V1_PERIOD", "100000\n")
+
+        assert cpu_quota() is None
+
+    # Tests that a missing or unreadable cgroup has no quota.
+    def test_missing(self, cgroup):
+        assert cpu_quota() is None
+
+        cgroup("CGROUP_V2_CPU_MAX", "garbage")
+
+        assert cpu_quota() is None
+
+
+class TestUsableCores:
+    # Tests that the quota caps the cores, rounding up partial cores.
+    def test_capped_by_quota(self, cgroup):
+        cgroup("CGROUP_V2_CPU_MAX", "150000 100000\n")
+
+        assert usable_cores([0, 1, 2, 3]) == 2
+        assert usable_cores([0]) == 1
+
+
+class TestPlanPlacement:
+    # Tests that the consumer gets a core of its own when there are enough to go around.
+    def test_spare_core(self):
+        parent, placement = plan_placement([1, 2], cores=[0, 1, 2, 3])
+
+        assert parent == 0
+        assert placement == [[1], [2, 3]]
+
+    # Tests that the consumer is left unpinned, and workers share cores, when there are too few.
+    def test_shared_cores(self):
+        parent, placement = plan_placement([2, 3], cores=[4, 5])
+
+        assert parent is None
+        assert placement == [[4, 5], [4, 5, 4]]
+
+    # Tests that a single core is never kept apart.
+    def test_single_core(self):
+        assert plan_placement([0], cores=[7]) == (None, [[]])
+
+
+class TestPinning:
+    # Tests that pinning the consumer doesn't shrink the workers planned from the cores it could use.
+    def test_auto_sizing_after_pin(self, monkeypatch, cgroup):
+        # The quota leaves cores spare, so the consumer is given one of its own
+        cgroup("CGROUP_V2_CPU_MAX", "200000 100000\n")
+        cores = [0, 1, 2, 3]
+        monkeypatch.setattr(placement, "available_cores", lambda: list(cores))
+        monkeypatch.setattr(consumer_module, "available_cores", lambda: list(cores))
+
+        def pin(core):
+            cores[:] = [core]
+
+        monkeypatch.setattr(consumer_module, "pin", pin)
+
+        consumer = Consumer(host="localhost", port=5672, pin_workers=True)
+        consumer.listen("first", encoder=None, workers=1)(lambda body: None)
+        consumer.listen("second", encoder=None, workers=0)(lambda body: None)
+
+        for listener in consumer.listeners:
+            listener.allowed_cores = consumer._allowed_cores
+            listener.prepare()
+
+        before = consumer.listeners[1].planned_workers()
+        consumer._place_workers()
+
+        assert cores == [0]
+        assert consumer.listeners[1].planned_workers() == before == 2
@@ -0,0 +1,157 @@
+import os
+
+from pika.spec import BasicProperties as Properties
+
+from rabbie import Consumer
+from rabbie.recording import (
+    RecordPolicy,
+    Recorder,
+    Replayer,
+    ReplayMode,
+    read_log,
+    read_segment,
+)
+
+
+def _segments(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(".rec"))
+
+
+class TestRecorder:
+    # Tests that records read back as they were written, across segments started as each one fills.
+    def test_rotation(self, tmp_path):
+        recorder = Recorder(RecordPolicy(str(tmp_path), segment_size=200), "orders")
+
+        for n in range(10):
+            recorder.append("orders", Properties(message_id=str(n)), b"x" * 50)
+        recorder.close()
+
+        segments = _segments(tmp_path)
+        records = [
+            record
+            for segment in segments
+            for record in read_segment(os.path.join(tmp_path, segment))
+        ]
+
+        assert len(segments) > 1
+        assert [record.properties.message_id for record in records] == [
+            str(n) for n in range(10)
+        ]
+        assert all(record.body == b"x" * 50 for record in records)
+        assert all(record.routing_key == "orders" for record in records)
+
+    # Tests that only the newest segments are kept past the policy's maximum.
+    def test_max_segments(self, tmp_path):
+        recorder = Recorder(
+            RecordPolicy(str(tmp_path), segment_size=100, max_segments=2), "orders"
+        )
+
+        for n in range(10):
+            recorder.append("orders", Properties(message_id=str(n)), b"x" * 50)
+        recorder.close()
+
+        records = list(read_log(str(tmp_path)))
+
+        assert len(_segments(tmp_path)) == 2
+        assert [record.properties.message_id for record in records] == ["8", "9"]
+
+    # Tests that a segment left by an earlier process with the same pid isn't overwritten.
+    def test_existing_segment_kept(self, tmp_path):
+        earlier = Recorder(RecordPolicy(str(tmp_path)), "orders")
+        earlier.append("orders", Properties(message_id="earlier"), b"")
+        earlier.close()
+
+        later = Recorder(RecordPolicy(str(tmp_path)), "orders")
+        later.append("orders", Properties(message_id="later"), b"")
+        later.close()
+
+        records = list(read_log(str(tmp_path), "orders"))
+
+        assert len(_segments(tmp_path)) == 2
+        assert [record.properties.message_id for record in records] == [
+            "earlier",
+            "later",
+        ]
+
+
+class TestReadLog:
+    # Tests that a queue's records don't include those of a queue whose name starts with its own.
+    def test_queue_filter(self, tmp_path):
+        for queue in ["orders", "orders-eu"]:
+            recorder = Recorder(RecordPolicy(str(tmp_path)), queue)
+            recorder.append(queue, Properties(), queue.encode())
+            recorder.close()
+
+        (tmp_path / "orders-notes.rec").write_bytes(b"")
+
+        assert [record.body for record in read_log(str(tmp_path), "orders")] == [
+            b"orders"
+        ]
+        assert sorted(record.body for record in read_log(str(tmp_path))) == [
+            b"orders",
+            b"orders-eu",
+        ]
+
+    # Tests that records of different workers are merged in the order they arrived.
+    def test_merged_in_order(self, tmp_path, monkeypatch):
+        recorders = {100: Recorder(RecordPolicy(str(tmp_path)), "orders")}
+        recorders[200] = Recorder(RecordPolicy(str(tmp_path)), "orders")
+
+        # Each recorder writes as a different worker, at the time given
+        for pid, arrived in [(100, 1.0), (200, 2.0), (200, 3.0), (100, 4.0)]:
+            monkeypatch.setattr(os, "getpid", lambda: pid)
+            monkeypatch.setattr("time.time", lambda: arrived)
+            recorders[pid].append("orders", Properties(), b"")
+
+        for pid, recorder in recorders.items():
+            monkeypatch.setattr(os, "getpid", lambda: pid)
+            recorder.close()
+
+        arrived = [record.arrived for record in read_log(str(tmp_path))]
+
+        assert len(_segments(tmp_path)) == 2
+        assert arrived == [1.0, 2.0, 3.0, 4.0]
+
+
+class TestReplayer:
+    # Tests that recorded messages are fed back into the listener's function.
+    def test_direct(self, tmp_path):
+        recorder = Recorder(RecordPolicy(str(tmp_path)), "orders")
+        for n in range(3):
+            recorder.append("orders", Properties(), str(n).encode())
+        recorder.close()
+
+        seen = []
+        consumer = Consumer(host="localhost", port=5672)
+
+        @consumer.listen("orders", encoder=None)
+        def handle(body):
+            seen.append(body)
+
+        report = Replayer(str(tmp_path), "orders").run(
+            consumer, "orders", mode=ReplayMode.DIRECT, speed=None
+        )
+
+        assert seen == [0, 1, 2]
+        assert report.messages == 3
+        assert report.failures == 0
+
+    # Tests that failures are counted, and the limit caps how many messages are replayed.
+    def test_failures_and_limit(self, tmp_path):
+        recorder = Recorder(RecordPolicy(str(tmp_path)), "orders")
+        for n in range(5):
+            recorder.append("orders", Properties(), str(n).encode())
+        recorder.close()
+
+        consumer = Consumer(host="localhost", port=5672)
+
+        @consumer.listen("orders", encoder=None)
+        def handle(body):
+            raise ValueError(body)
+
+        report = Replayer(str(tmp_path), "orders").run(
+            consumer, "orders", mode=ReplayMode.DIRECT, speed=None, limit=2
+        )
+
+        assert report.messages == 2
+        assert report.failures == 2
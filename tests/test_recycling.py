@@ -0,0 +1,226 @@
+import os
+import signal
+from itertools import count
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.consumer.listener.listener_status import Status
+from rabbie.recycling import RecyclePolicy
+
+MiB = 1024 * 1024
+
+
+class FakeProcess:
+    """Stands in for a worker process, alive until told otherwise"""
+
+    pids = count(1000)
+
+    def __init__(self) -> None:
+        self.pid = next(self.pids)
+        self.alive = True
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self):
+        pass
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    sent = []
+    monkeypatch.setattr(os, "kill", lambda pid, sig: sent.append((pid, sig)))
+
+    return sent
+
+
+def _listener(workers=2, restart=True):
+    consumer = Consumer(host="localhost", port=5672)
+    consumer.listen(
+        "orders",
+        encoder=None,
+        workers=workers,
+        restart=restart,
+        recycle=RecyclePolicy(max_messages=10),
+    )(lambda body: None)
+
+    listener = consumer.listeners[0]
+    listener.prepare()
+
+    registry = {}
+
+    def spawn(index, registry):
+        worker = FakeProcess()
+        registry[worker.pid] = Status.STARTING
+        return worker
+
+    listener._spawn = spawn
+    listener.workers = [spawn(index, registry) for index in range(workers)]
+
+    for worker in listener.workers:
+        registry[worker.pid] = Status.CONNECTED
+
+    return listener, registry
+
+
+class TestRecyclePolicy:
+    # Tests that a worker isn't due until it reaches one of the limits.
+    def test_not_due(self):
+        policy = RecyclePolicy(max_messages=100, max_rss=512 * MiB, max_age=3600)
+
+        assert policy.reason(99, 511 * MiB, 3599) is None
+        assert RecyclePolicy().reason(10**9, 10**12, 10**9) is None
+
+    # Tests that each limit gives its own reason, once reached.
+    def test_reasons(self):
+        policy = RecyclePolicy(max_messages=100, max_rss=512 * MiB, max_age=3600)
+
+        assert policy.reason(100, 0, 0) == "handled 100 messages"
+        assert policy.reason(0, 600 * MiB, 0) == "using 600MiB of memory"
+        assert policy.reason(0, 0, 3600.5) == "running for 3600s"
+
+
+class TestSupervise:
+    # Tests that a worker asking to be recycled gets a replacement, and keeps consuming until it connects.
+    def test_waits_for_replacement(self, signals):
+        listener, registry = _listener()
+        old = listener.workers[0]
+        registry[old.pid] = Status.RECYCLING
+
+        listener.supervise(registry)
+        replacement = listener._replacements[0]
+
+        assert listener.workers[0] is old
+        assert registry[replacement.pid] == Status.STARTING
+
+        # Still connecting, so nothing changes
+        listener.supervise(registry)
+
+        assert listener._replacements == {0: replacement}
+        assert signals == []
+
+        registry[replacement.pid] = Status.CONNECTED
+        listener.supervise(registry)
+
+        assert listener.workers[0] is replacement
+        assert listener._replacements == {}
+        assert listener._retiring == [old]
+        assert signals == [(old.pid, signal.SIGUSR1)]
+
+    # Tests that the retired worker is forgotten once it exits.
+    def test_reaps_retired(self, signals):
+        listener, registry = _listener()
+        old = listener.workers[0]
+        registry[old.pid] = Status.RECYCLING
+
+        listener.supervise(registry)
+        registry[listener._replacements[0].pid] = Status.CONNECTED
+        listener.supervise(registry)
+
+        old.alive = False
+        listener.supervise(registry)
+
+        assert listener._retiring == []
+        assert old.pid not in registry
+
+    # Tests that a replacement dying before it connects is tried again, the old worker carrying on meanwhile.
+    def test_replacement_dies(self, signals):
+        listener, registry = _listener()
+        old = listener.workers[0]
+        registry[old.pid] = Status.RECYCLING
+
+        listener.supervise(registry)
+        replacement = listener._replacements[0]
+        replacement.alive = False
+
+        listener.supervise(registry)
+
+        assert listener.workers[0] is old
+        assert listener._replacements == {}
+        assert replacement.pid not in registry
+
+        listener.supervise(registry)
+
+        assert listener._replacements[0] is not replacement
+        assert signals == []
+
+    # Tests that workers that died are restarted, when the listener restarts them.
+    def test_restarts_dead_workers(self, signals):
+        listener, registry = _listener()
+        dead = listener.workers[1]
+        dead.alive = False
+
+        listener.supervise(registry)
+
+        assert listener.workers[1] is not dead
+        assert dead.pid not in registry
+        assert registry[listener.workers[1].pid] == Status.STARTING
+
+    # Tests that dead workers are left dead when the listener doesn't restart them.
+    def test_no_restart(self, signals):
+        listener, registry = _listener(restart=False)
+        dead = listener.workers[1]
+        dead.alive = False
+
+        listener.supervise(registry)
+
+        assert listener.workers[1] is dead
+        assert dead.pid not in registry
+
+
+class TestCheckWorker:
+    # Tests that a worker asks to be recycled once due, and only once.
+    def test_requests_recycling(self):
+        listener, registry = _listener()
+        listener._registry = registry
+        pid = os.getpid()
+
+        listener._handled = 9
+        listener._check_worker(None)
+
+        assert pid not in registry
+
+        listener._handled = 10
+        listener._check_worker(None)
+
+        assert registry[pid] == Status.RECYCLING
+
+        registry[pid] = Status.CONNECTED
+        listener._handled = 11
+        listener._check_worker(None)
+
+        assert registry[pid] == Status.CONNECTED
+
+
+class DrainingProcess(FakeProcess):
+    """A worker process that exits once it's waited on, recording when that happens"""
+
+    def __init__(self, events) -> None:
+        super().__init__()
+        self.events = events
+
+    def join(self, timeout=None):
+        self.events.append(("join", self.pid))
+        self.alive = False
+
+
+class TestStop:
+    # Tests that every listener's workers are told to drain before any of them is waited on.
+    def test_listeners_drain_at_once(self, monkeypatch):
+        events = []
+        monkeypatch.setattr(os, "kill", lambda pid, sig: events.append(("kill", pid)))
+
+        consumer = Consumer(host="localhost", port=5672)
+        for queue in ["orders", "invoices"]:
+            consumer.listen(queue, encoder=None)(lambda body: None)
+
+        for listener in consumer.listeners:
+            listener.prepare()
+            listener.workers = [DrainingProcess(events)]
+
+        consumer._stop_listeners()
+
+        assert [event for event, _ in events] == ["kill", "kill", "join", "join"]
+        assert all(not listener.workers for listener in consumer.listeners)
@@ -0,0 +1,102 @@
+import importlib
+import sys
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.supervisor import ModuleGraph
+
+MODULES = {
+    "reload_base": "VALUE = 1\n",
+    "reload_middle": "import reload_base\n",
+    "reload_top": "from reload_middle import reload_base\n\n\ndef handler(body):\n    return 1\n",
+    "reload_other": "def handler(body):\n    return 'other'\n",
+}
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    """Write & import a few modules depending on each other: top -> middle -> base"""
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    for name, source in MODULES.items():
+        (tmp_path / f"{name}.py").write_text(source)
+
+    imported = {name: importlib.import_module(name) for name in MODULES}
+
+    yield tmp_path, imported
+
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+class TestModuleGraph:
+    # Tests that a changed module is reloaded along with its dependents, dependencies first.
+    def test_dependency_order(self, modules):
+        root, _ = modules
+        graph = ModuleGraph(str(root))
+
+        assert graph.affected("reload_base") == [
+            "reload_base",
+            "reload_middle",
+            "reload_top",
+        ]
+        assert graph.affected("reload_middle") == ["reload_middle", "reload_top"]
+        assert graph.affected("reload_other") == ["reload_other"]
+
+    # Tests that files map to the modules loaded from them, and only user modules are included.
+    def test_module_for(self, modules):
+        root, _ = modules
+        graph = ModuleGraph(str(root))
+
+        assert graph.module_for(str(root / "reload_top.py")) == "reload_top"
+        assert graph.module_for(str(root / "missing.py")) is None
+        assert sorted(graph.paths) == sorted(
+            str(root / f"{name}.py") for name in MODULES
+        )
+
+    # Tests that reloading re-executes every affected module, picking up the new code.
+    def test_reload(self, modules):
+        root, _ = modules
+        graph = ModuleGraph(str(root))
+
+        (root / "reload_base.py").write_text("VALUE = 2\n")
+
+        assert graph.reload("reload_base") == [
+            "reload_base",
+            "reload_middle",
+            "reload_top",
+        ]
+        assert sys.modules["reload_top"].reload_base.VALUE == 2
+
+
+class TestReloadListeners:
+    # Tests that only listeners with functions in reloaded modules are restarted, running the new function.
+    def test_replaces_callback(self, modules, monkeypatch):
+        root, imported = modules
+
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.shared_registry = {}
+        consumer.listen("top", encoder=None)(imported["reload_top"].handler)
+        consumer.listen("other", encoder=None)(imported["reload_other"].handler)
+
+        restarted = []
+        for listener in consumer.listeners:
+            monkeypatch.setattr(
+                listener,
+                "restart",
+                lambda registry, listener=listener: restarted.append(listener),
+            )
+
+        (root / "reload_top.py").write_text(
+            "from reload_middle import reload_base\n\n\ndef handler(body):\n    return 'reloaded'\n"
+        )
+        importlib.reload(imported["reload_top"])
+
+        assert consumer._reload_listeners(["reload_top"]) == 1
+
+        top, other = consumer.listeners
+        assert restarted == [top]
+        assert top.details.callback(None) == "reloaded"
+        assert other.details.callback(None) == "other"
@@ -0,0 +1,189 @@
+from pika.exceptions import NackError
+from pika.spec import Basic, BasicProperties as Properties
+
+from rabbie import Consumer, RetryPolicy
+from rabbie.retry import (
+    ATTEMPT_HEADER,
+    RETRY_ERROR_HEADER,
+    ROUTING_KEY_HEADER,
+    Retrier,
+    retry_queue_name,
+)
+
+
+class RetryChannel:
+    """Stands in for the retrier's confirmed channel, recording what is declared & published"""
+
+    def __init__(self, nack: bool = False) -> None:
+        self.confirming = False
+        self.declared = {}
+        self.published = []
+        self.nack = nack
+
+    def confirm_delivery(self):
+        self.confirming = True
+
+    def queue_declare(self, queue, durable=False, arguments=None):
+        self.declared[queue] = arguments
+
+    def basic_publish(self, exchange, routing_key, body, properties, mandatory=False):
+        if self.nack:
+            raise NackError([])
+
+        self.published.append((routing_key, body, properties, mandatory))
+
+
+class WorkerChannel:
+    """Stands in for a worker's own channel, recording acknowledgements"""
+
+    def __init__(self) -> None:
+        self.frames = []
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.frames.append(("ack", delivery_tag))
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self.frames.append(("nack", delivery_tag, requeue))
+
+    def basic_publish(self, *args, **kwargs):
+        pass
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+
+class TestRetryPolicy:
+    # Tests that the delay grows by the multiplier on every attempt, up to the max delay.
+    def test_backoff(self):
+        policy = RetryPolicy(delay=1, multiplier=2, max_delay=5)
+
+        assert [policy.delay_for(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+    # Tests that only the distinct delays of the retries a message can have are listed, shortest first.
+    def test_delays(self):
+        assert RetryPolicy(max_attempts=4, delay=1, multiplier=2).delays() == [1, 2, 4]
+        assert RetryPolicy(max_attempts=5, delay=3, multiplier=1).delays() == [3]
+        assert RetryPolicy(max_attempts=1).delays() == []
+
+
+class TestRetrier:
+    # Tests that every delay gets a queue which dead letters back into the consumed queue once its TTL passes.
+    def test_topology(self):
+        channel = RetryChannel()
+        retrier = Retrier(channel, "emails", RetryPolicy(max_attempts=3, delay=0.5))
+        retrier.declare("emails")
+
+        assert channel.confirming
+        assert channel.declared == {
+            "emails.dlq": None,
+            "emails.retry.500ms": {
+                "x-message-ttl": 500,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": "emails",
+            },
+            "emails.retry.1000ms": {
+                "x-message-ttl": 1000,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": "emails",
+            },
+        }
+
+    # Tests that retries wait in the queue for their delay, keeping the first routing key, until they're dead lettered.
+    def test_retry_then_dead_letter(self):
+        channel = RetryChannel()
+        retrier = Retrier(channel, "emails", RetryPolicy(max_attempts=3, delay=1))
+
+        assert retrier.retry(
+            "emails", Properties(), b"body", ValueError("a"), routing_key="eu.sent"
+        )
+        queue, _, properties, mandatory = channel.published[-1]
+
+        assert queue == retry_queue_name("emails", 1)
+        assert mandatory
+        assert properties.headers == {
+            ATTEMPT_HEADER: 2,
+            RETRY_ERROR_HEADER: "ValueError('a')",
+            ROUTING_KEY_HEADER: "eu.sent",
+        }
+
+        # Redelivered from the delay queue, with its name as the routing key
+        assert retrier.retry(
+            "emails",
+            properties,
+            b"body",
+            ValueError("b"),
+            routing_key="emails.retry.1000ms",
+        )
+        queue, _, properties, _ = channel.published[-1]
+
+        assert queue == retry_queue_name("emails", 2)
+        assert properties.headers[ROUTING_KEY_HEADER] == "eu.sent"
+
+        assert not retrier.retry("emails", properties, b"body", ValueError("c"))
+        assert channel.published[-1][0] == "emails.dlq"
+
+
+def _retrying_listener(channel, function, **settings):
+    consumer = Consumer(host="localhost", port=5672)
+    consumer.listen(
+        "emails",
+        encoder=None,
+        auto_acknowledge=False,
+        retry=RetryPolicy(max_attempts=3),
+        **settings,
+    )(function)
+
+    listener = consumer.listeners[0]
+    listener.prepare()
+    listener._retrier = Retrier(channel, "emails", listener.details.retry)
+
+    return consumer, listener
+
+
+def _deliver(listener, channel, routing_key, **properties):
+    listener._callback(
+        channel,
+        Basic.Deliver(delivery_tag=1, routing_key=routing_key),
+        Properties(**properties),
+        b"body",
+    )
+
+
+def _fail(body):
+    raise ValueError(body)
+
+
+class TestListenerRetry:
+    # Tests that a failed message is only acknowledged once the broker confirmed its retry.
+    def test_acknowledged_after_confirm(self):
+        channel = WorkerChannel()
+        _, listener = _retrying_listener(RetryChannel(), _fail)
+
+        _deliver(listener, channel, "emails")
+
+        assert channel.frames == [("ack", 1)]
+        assert listener.metrics.snapshot()["retries"] == 1
+
+    # Tests that a retry the broker didn't take leaves the message requeued rather than acknowledged.
+    def test_requeued_when_not_confirmed(self):
+        channel = WorkerChannel()
+        _, listener = _retrying_listener(RetryChannel(nack=True), _fail)
+
+        _deliver(listener, channel, "emails")
+
+        assert channel.frames == [("nack", 1, True)]
+
+    # Tests that retried messages are routed by the routing key they were first published with.
+    def test_routed_by_original_key(self):
+        seen = []
+        consumer, listener = _retrying_listener(RetryChannel(), None)
+        consumer.route("emails", routing_key="eu.*")(lambda body: seen.append(body))
+
+        _deliver(
+            listener,
+            WorkerChannel(),
+            "emails.retry.1000ms",
+            headers={ROUTING_KEY_HEADER: "eu.sent", ATTEMPT_HEADER: 2},
+        )
+
+        assert seen == ["body"]
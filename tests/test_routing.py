@@ -0,0 +1,224 @@
+import pytest
+from pika.spec import Basic, BasicProperties as Properties
+
+from rabbie import Channel, Consumer, MicroConsumer
+from rabbie.routing import Route, Router, RouteTrie
+
+
+def _trie(*patterns):
+    trie = RouteTrie()
+
+    for index, pattern in enumerate(patterns):
+        trie.add(pattern, index)
+
+    return trie
+
+
+def _function(name):
+    def function(body):
+        return name
+
+    function.__qualname__ = name
+    return function
+
+
+class TestRouteTrie:
+    # Tests that words must match exactly, and '*' matches exactly one word.
+    def test_words_and_star(self):
+        trie = _trie("orders.created", "orders.*", "*.created")
+
+        assert trie.match("orders.created") == {0, 1, 2}
+        assert trie.match("orders.deleted") == {1}
+        assert trie.match("invoices.created") == {2}
+        assert trie.match("orders") == set()
+        assert trie.match("orders.eu.created") == set()
+
+    # Tests that '#' matches zero or more words, anywhere in the pattern.
+    def test_hash(self):
+        trie = _trie("orders.#", "#.created", "orders.#.created", "#")
+
+        assert trie.match("orders") == {0, 3}
+        assert trie.match("orders.eu.created") == {0, 1, 2, 3}
+        assert trie.match("orders.created") == {0, 1, 2, 3}
+        assert trie.match("created") == {1, 3}
+        assert trie.match("invoices.paid") == {3}
+
+    # Tests that consecutive '#'s still match, including nothing at all.
+    def test_consecutive_hashes(self):
+        trie = _trie("#.#.orders")
+
+        assert trie.match("orders") == {0}
+        assert trie.match("a.b.c.orders") == {0}
+        assert trie.match("orders.a") == set()
+
+
+class TestRouter:
+    # Tests that the route registered first wins when several match.
+    def test_first_registered_wins(self):
+        router = Router()
+        router.add(Route(_function("specific"), routing_key="orders.created"))
+        router.add(Route(_function("any"), routing_key="orders.#"))
+
+        assert router.match("orders.created", None) == 0
+        assert router.match("orders.deleted", None) == 1
+        assert router.match("invoices.created", None) is None
+
+    # Tests that a route asking for a routing key and headers needs both, and every header it names.
+    def test_key_and_headers(self):
+        router = Router()
+        router.add(
+            Route(
+                _function("both"),
+                routing_key="orders.*",
+                headers={"region": "eu", "priority": 1},
+            )
+        )
+        router.add(Route(_function("headers"), headers={"region": "eu"}))
+
+        assert router.match("orders.created", {"region": "eu", "priority": 1}) == 0
+        assert router.match("orders.created", {"region": "eu"}) == 1
+        assert router.match("invoices.created", {"region": "eu", "priority": 1}) == 1
+        assert router.match("orders.created", {"region": "us", "priority": 1}) is None
+        assert router.match(None, {"region": "eu"}) == 1
+
+    # Tests that header values which can't be indexed (tables & arrays) are passed over.
+    def test_unhashable_headers(self):
+        router = Router()
+        router.add(Route(_function("eu"), headers={"region": "eu"}))
+
+        assert router.match(None, {"tags": ["a"], "meta": {}, "region": "eu"}) == 0
+        assert router.match(None, {"tags": ["a"]}) is None
+
+    # Tests that a route for the same function replaces the earlier one, keeping its place.
+    def test_replaces_same_function(self):
+        router = Router()
+        router.add(Route(_function("first"), routing_key="a"))
+        router.add(Route(_function("second"), routing_key="b"))
+        router.add(Route(_function("first"), routing_key="c"))
+
+        assert router.names == ["first", "second", "default"]
+        assert router.match("a", None) is None
+        assert router.match("c", None) == 0
+
+    # Tests that several routes of one function (stacked decorators) are all kept, next to each other.
+    def test_stacked_routes(self):
+        first, second = _function("first"), _function("second")
+
+        router = Router()
+        router.add(Route(first, routing_key="a"))
+        router.add(Route(second, routing_key="b"))
+        router.add(Route(first, routing_key="c"))
+
+        assert router.names == ["first", "first", "second", "default"]
+        assert router.match("a", None) == 0
+        assert router.match("c", None) == 1
+        assert router.match("b", None) == 2
+
+    # Tests that a route must have something to match.
+    def test_needs_key_or_headers(self):
+        with pytest.raises(ValueError):
+            Router().add(Route(_function("nothing")))
+
+
+def _dispatch(listener, routing_key):
+    return listener._dispatch(
+        Channel(FakeChannel()),
+        Basic.Deliver(delivery_tag=1, routing_key=routing_key),
+        Properties(),
+        b"",
+    )
+
+
+class FakeChannel:
+    def basic_ack(self, *args, **kwargs):
+        pass
+
+    def basic_nack(self, *args, **kwargs):
+        pass
+
+    def basic_publish(self, *args, **kwargs):
+        pass
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+
+class TestConsumerRoutes:
+    def _register(self, consumer, seen, route_first):
+        def created(body):
+            seen.append("created")
+
+        def fallback(body):
+            seen.append("fallback")
+
+        if route_first:
+            consumer.route("orders", routing_key="orders.created")(created)
+            consumer.listen("orders", encoder=None, workers=3)(fallback)
+        else:
+            consumer.listen("orders", encoder=None, workers=3)(fallback)
+            consumer.route("orders", routing_key="orders.created")(created)
+
+    # Tests that routes & the listener's function share one listener, whichever is registered first.
+    @pytest.mark.parametrize("route_first", [True, False])
+    def test_route_and_listen(self, route_first):
+        seen = []
+        consumer = Consumer(host="localhost", port=5672)
+        self._register(consumer, seen, route_first)
+
+        assert len(consumer.listeners) == 1
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+
+        assert listener.details.workers == 3
+        assert _dispatch(listener, "orders.created")
+        assert _dispatch(listener, "orders.deleted")
+        assert seen == ["created", "fallback"]
+
+    # Tests that the same holds for a MicroConsumer merged into a consumer.
+    @pytest.mark.parametrize("route_first", [True, False])
+    def test_micro_consumer(self, route_first):
+        seen = []
+        micro = MicroConsumer()
+        self._register(micro, seen, route_first)
+
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.add_consumer(micro)
+
+        assert len(consumer.listeners) == 1
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+
+        assert listener.details.workers == 3
+        assert _dispatch(listener, "orders.created")
+        assert _dispatch(listener, "orders.deleted")
+        assert seen == ["created", "fallback"]
+
+    # Tests that stacked route decorators each route their messages to the function.
+    def test_stacked_decorators(self):
+        seen = []
+        consumer = Consumer(host="localhost", port=5672)
+
+        @consumer.route("orders", routing_key="orders.created")
+        @consumer.route("orders", routing_key="orders.deleted")
+        def changed(body):
+            seen.append(body)
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+
+        assert _dispatch(listener, "orders.created")
+        assert _dispatch(listener, "orders.deleted")
+        assert not _dispatch(listener, "orders.updated")
+        assert len(seen) == 2
+
+    # Tests that a listener made for routes alone rejects messages no route matches.
+    def test_routes_alone(self):
+        consumer = Consumer(host="localhost", port=5672)
+        consumer.route("orders", routing_key="orders.created")(lambda body: None)
+
+        listener = consumer.listeners[0]
+        listener.prepare()
+
+        assert not _dispatch(listener, "orders.deleted")
@@ -0,0 +1,74 @@
+import time
+
+from pika import BasicProperties as Properties
+
+from rabbie import JSONEncoder, Producer
+from rabbie.producer.rpc import rpc_client
+from rabbie.producer.rpc.rpc_client import RpcClient
+
+
+class FakeChannel:
+    def basic_consume(self, queue, on_message_callback, auto_ack):
+        pass
+
+    def basic_publish(self, **kwargs):
+        pass
+
+
+class FakeConnection:
+    """Takes a while to connect, and never replies"""
+
+    def __init__(self, parameters) -> None:
+        time.sleep(0.3)
+
+    def channel(self):
+        return FakeChannel()
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def process_data_events(self, time_limit=0):
+        time.sleep(time_limit)
+
+    def close(self):
+        pass
+
+
+class TestRpcClient:
+    # Tests that the time spent connecting comes out of the timeout, rather than being added to it.
+    def test_one_deadline(self, monkeypatch):
+        monkeypatch.setattr(rpc_client.pika, "BlockingConnection", FakeConnection)
+        client = RpcClient(None)
+
+        started = time.monotonic()
+        future = client.call(b"", queue="q", timeout=0.5)
+
+        try:
+            assert isinstance(future.exception(timeout=5), TimeoutError)
+            assert time.monotonic() - started < 0.75
+        finally:
+            client.close()
+
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def call(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+class TestProducerRpc:
+    # Tests that the caller's properties are left alone, while the request gets the encoder's content type.
+    def test_properties_copied(self):
+        producer = Producer(host="localhost", port=5672)
+        producer._rpc_client = RecordingClient()
+        properties = Properties(content_type="text/plain", priority=1)
+
+        producer.rpc({"id": 1}, queue="q", encoder=JSONEncoder(), properties=properties)
+        [call] = producer._rpc_client.calls
+
+        assert properties.content_type == "text/plain"
+        assert properties.timestamp is None
+        assert call["properties"].content_type == JSONEncoder().content_type()
+        assert call["properties"].priority == 1
@@ -0,0 +1,78 @@
+import zlib
+
+import pytest
+
+from rabbie import Consumer
+from rabbie.sharding import ShardSelector, shard_name, shard_names
+
+
+def _listener(workers, shards):
+    consumer = Consumer(host="localhost", port=5672)
+    consumer.listen("orders", encoder=None, workers=workers, shards=shards)(
+        lambda body: None
+    )
+
+    return consumer.listeners[0]
+
+
+class TestShardNames:
+    # Tests that shards are named after their logical queue and index.
+    def test_names(self):
+        assert shard_name("orders", 2) == "orders.2"
+        assert shard_names("orders", 3) == ["orders.0", "orders.1", "orders.2"]
+
+
+class TestShardSelector:
+    # Tests that a key always maps to the same shard, by crc32, so every producer agrees on it.
+    def test_keyed_stable(self):
+        selector = ShardSelector("orders", 4)
+
+        assert selector.select("customer-42") == shard_name(
+            "orders", zlib.crc32(b"customer-42") % 4
+        )
+        assert {selector.select("customer-42") for _ in range(10)} == {
+            selector.select("customer-42")
+        }
+        assert ShardSelector("orders", 4).select(42) == selector.select("42")
+
+    # Tests that messages without a key are spread round-robin, without disturbing keyed ones.
+    def test_round_robin(self):
+        selector = ShardSelector("orders", 3)
+
+        assert [selector.select() for _ in range(4)] == [
+            "orders.0",
+            "orders.1",
+            "orders.2",
+            "orders.0",
+        ]
+
+        keyed = selector.select("customer-42")
+        assert selector.select() == "orders.1"
+        assert selector.select("customer-42") == keyed
+
+
+class TestWorkerQueues:
+    # Tests that an unsharded listener's workers all consume the queue itself.
+    def test_unsharded(self):
+        listener = _listener(workers=2, shards=0)
+
+        assert listener._worker_queues(0) == ["orders"]
+        assert listener._worker_queues(1) == ["orders"]
+
+    # Tests that every shard is consumed, whether there are fewer, as many, or more workers than shards.
+    @pytest.mark.parametrize(
+        "workers, expected",
+        [
+            (2, [["orders.0", "orders.2", "orders.4"], ["orders.1", "orders.3"]]),
+            (5, [[f"orders.{shard}"] for shard in range(5)]),
+            (7, [[f"orders.{shard % 5}"] for shard in range(7)]),
+        ],
+    )
+    def test_assignment(self, workers, expected):
+        listener = _listener(workers=workers, shards=5)
+        assigned = [listener._worker_queues(index) for index in range(workers)]
+
+        assert assigned == expected
+        assert {queue for queues in assigned for queue in queues} == set(
+            shard_names("orders", 5)
+        )
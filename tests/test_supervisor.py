@@ -0,0 +1,100 @@
+import os
+import time
+
+from watchdog.events import DirCreatedEvent, DirDeletedEvent, FileModifiedEvent
+
+from rabbie.supervisor import Supervisor
+
+
+def _tree(root, *paths):
+    for path in paths:
+        os.makedirs(os.path.join(root, path), exist_ok=True)
+
+
+def _supervisor(root, **settings):
+    supervisor = Supervisor(str(root), **settings)
+    reloads = []
+    supervisor.reload = lambda *paths: reloads.append(sorted(paths))
+
+    return supervisor, reloads
+
+
+class TestWatches:
+    # Tests that ignored directories, and everything under them, are never watched.
+    def test_ignored_directories_pruned(self, tmp_path):
+        _tree(tmp_path, "app/handlers", ".git/objects", "venv/lib", "app/__pycache__")
+        supervisor, _ = _supervisor(tmp_path)
+
+        assert sorted(supervisor._watches) == [
+            str(tmp_path),
+            str(tmp_path / "app"),
+            str(tmp_path / "app" / "handlers"),
+        ]
+
+    # Tests that directories created later are watched, unless ignored, and removed ones are forgotten.
+    def test_directories_follow_changes(self, tmp_path):
+        supervisor, _ = _supervisor(tmp_path)
+        handler = supervisor._event_handler
+
+        _tree(tmp_path, "app/handlers", "node_modules/lib")
+        handler.dispatch(DirCreatedEvent(str(tmp_path / "app")))
+        handler.dispatch(DirCreatedEvent(str(tmp_path / "node_modules")))
+
+        assert str(tmp_path / "app" / "handlers") in supervisor._watches
+        assert str(tmp_path / "node_modules") not in supervisor._watches
+
+        handler.dispatch(DirDeletedEvent(str(tmp_path / "app")))
+
+        assert sorted(supervisor._watches) == [str(tmp_path)]
+
+    # Tests that only the part of a path below the watched directory is matched against the ignore globs.
+    def test_ignore_relative_to_root(self, tmp_path):
+        root = tmp_path / "env" / "project"
+        _tree(root, "app")
+        supervisor, _ = _supervisor(root)
+        handler = supervisor._event_handler
+
+        assert not handler.ignored(str(root / "app" / "handlers.py"))
+        assert handler.ignored(str(root / ".venv" / "lib" / "module.py"))
+        assert handler.ignored(str(root / "app" / "handlers.pyc"))
+
+
+class TestChanges:
+    # Tests that a burst of changes is reloaded together, once the debounce period passes.
+    def test_debounce(self, tmp_path):
+        supervisor, reloads = _supervisor(tmp_path, debounce=0.2)
+
+        for name in ["a.py", "b.py", "a.py"]:
+            (tmp_path / name).write_text(name)
+            supervisor._event_handler.dispatch(FileModifiedEvent(str(tmp_path / name)))
+
+        assert reloads == []
+
+        time.sleep(0.6)
+
+        assert reloads == [[str(tmp_path / "a.py"), str(tmp_path / "b.py")]]
+
+    # Tests that saving a file without changing it doesn't count as a change.
+    def test_content_hashing(self, tmp_path):
+        path = tmp_path / "handlers.py"
+        path.write_text("x = 1")
+        supervisor, _ = _supervisor(tmp_path)
+
+        assert supervisor._content_changed(str(path))
+        assert not supervisor._content_changed(str(path))
+
+        path.write_text("x = 2")
+
+        assert supervisor._content_changed(str(path))
+        assert not supervisor._content_changed(str(tmp_path / "missing.py"))
+
+    # Tests that files not matching the pattern, or inside ignored directories, aren't reloaded.
+    def test_filtered_files(self, tmp_path):
+        supervisor, reloads = _supervisor(tmp_path, debounce=0.01)
+
+        for path in ["notes.txt", os.path.join(".git", "hook.py")]:
+            supervisor._event_handler.dispatch(FileModifiedEvent(str(tmp_path / path)))
+
+        time.sleep(0.1)
+
+        assert reloads == []
@@ -0,0 +1,79 @@
+import pytest
+
+from rabbie.ratelimit import RateLimit, TokenBucket
+
+
+class Clock:
+    """Stands in for time.monotonic, only moving when told to"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+
+    return clock
+
+
+class TestRateLimit:
+    # Tests that the capacity defaults to a second's worth of calls, and never less than one.
+    def test_capacity(self):
+        assert RateLimit(rate=10).capacity == 10
+        assert RateLimit(rate=0.5).capacity == 1
+        assert RateLimit(rate=10, burst=3).capacity == 3
+
+
+class TestTokenBucket:
+    # Tests that a full bucket hands out its capacity at once, then says how long until the next token.
+    def test_burst_then_wait(self, clock):
+        bucket = TokenBucket(RateLimit(rate=2, burst=3))
+
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.acquire() == pytest.approx(0.5)
+
+    # Tests that tokens are topped up at the rate, but never past the capacity.
+    def test_refill(self, clock):
+        bucket = TokenBucket(RateLimit(rate=2, burst=3))
+
+        for _ in range(3):
+            bucket.acquire()
+
+        clock.now += 1
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(0.5)
+
+        clock.now += 60
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.acquire() > 0
+
+    # Tests that the wait is for the tokens still missing, counting those topped up since.
+    def test_wait_time(self, clock):
+        bucket = TokenBucket(RateLimit(rate=4, burst=4))
+
+        assert bucket.acquire(4) == 0
+
+        clock.now += 0.25
+        assert bucket.acquire(3) == pytest.approx(0.5)
+
+    # Tests that taking more tokens than the bucket holds waits for a full bucket, then leaves it in debt.
+    def test_debt(self, clock):
+        bucket = TokenBucket(RateLimit(rate=2, burst=2))
+
+        assert bucket.acquire() == 0
+        assert bucket.acquire(5) == pytest.approx(0.5)
+
+        clock.now += 0.5
+        assert bucket.acquire(5) == 0
+
+        # 3 tokens of debt, paid back at 2 a second before another token is free
+        assert bucket.acquire() == pytest.approx(2)
+
+        clock.now += 2
+        assert bucket.acquire() == 0